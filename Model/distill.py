@@ -0,0 +1,180 @@
+"""Distill lstm_cv_final into compact student models for serving
+
+The teacher (the 500-unit production LSTM) is run once over every training
+window; each student then trains on ``alpha * teacher + (1 - alpha) *
+actual`` targets, gathered lazily by ``train_lstm.make_dataset``. Students
+are a narrow LSTM, a GRU and an MLP over the flattened window. The report
+gives validation RMSE (``custom_RMSE``, in MW) for teacher and students
+next to single-window latency through the NumPy bundle path that the
+dashboard serves, parameter count and bundle size. The fastest student
+whose RMSE is within ``--tolerance`` of the teacher's is written as a
+bundle to ``--deploy`` and ``Website/current.bundle`` is pointed at it, so
+the dashboard and push service serve it from their next model load.
+
+    python distill.py --teacher ../Website/lstm_cv_final.h5 --val-start 2022-01-01 \\
+        --deploy ../Website/lstm_student.bundle
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Website'))
+import train_lstm as tl
+from custom_RMSE import RMSE_list
+from collect_inputs import import_model, FEATURE_ORDER, FORECAST_WINDOW, SCALER_MEAN, SCALER_STD
+from model_bundle import BundleModel, load_bundle, save_bundle, set_current
+
+WEBSITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Website')
+
+# Student architecture -> default width
+STUDENTS = {'lstm': 64, 'gru': 64, 'mlp': 128}
+
+def create_student(kind, units, var_num=8, hist_window=18, forecast_window=18):
+    """Compact model with the teacher's input and output shapes
+
+    Only layers ``model_bundle`` can serve are used, so every student can
+    be deployed as a bundle.
+    """
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Flatten, GRU, LSTM
+
+    model = Sequential()
+    if kind == 'lstm':
+        model.add(LSTM(units, input_shape=(var_num, hist_window)))
+    elif kind == 'gru':
+        model.add(GRU(units, input_shape=(var_num, hist_window)))
+    elif kind == 'mlp':
+        model.add(Flatten(input_shape=(var_num, hist_window)))
+        model.add(Dense(units, activation='relu'))
+    else:
+        raise ValueError(f"Unknown student {kind}; choose from {list(STUDENTS)}")
+    model.add(Dense(units // 2, activation='relu'))
+    model.add(Dense(forecast_window))
+    model.compile(loss='mean_squared_error', optimizer='adam')
+    return model
+
+def teacher_targets(teacher, series, starts, hist_window=18, forecast_window=18, chunk=8192):
+    """Teacher outputs for every window in ``starts``, in standardized units"""
+    out = np.empty((len(starts), forecast_window), dtype=np.float32)
+    for i in range(0, len(starts), chunk):
+        x, _ = tl.window_batch(series, starts[i:i + chunk], hist_window, forecast_window)
+        out[i:i + chunk] = teacher.predict(x, batch_size=1024, verbose=0)
+    return out
+
+def rmse_mw(y_true, y_pred, forecast_window=18):
+    # Standardized targets -> MW, averaged over the horizon as in hparam_search
+    return float(RMSE_list(y_true * SCALER_STD[0], y_pred * SCALER_STD[0]) / np.sqrt(forecast_window))
+
+def latency_ms(predict, x, runs=50):
+    """Mean time of one dashboard-sized forecast after warm-up"""
+    predict(x)
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        predict(x)
+    return (time.perf_counter() - t0) / runs * 1000
+
+def bundle_stats(model, directory):
+    """Bundles ``model`` (if it is not one already) and returns the loaded bundle and its size"""
+    if isinstance(model, BundleModel):
+        bundle = model
+        size = sum(w.nbytes for layer in model.weights for w in layer.values())
+    else:
+        save_bundle(model, directory, FEATURE_ORDER, SCALER_MEAN, SCALER_STD)
+        bundle = load_bundle(directory, feature_order=FEATURE_ORDER, forecast_window=FORECAST_WINDOW)
+        size = sum(os.path.getsize(os.path.join(directory, 'weights', f))
+                   for f in os.listdir(os.path.join(directory, 'weights')))
+    params = sum(int(w.size) for layer in bundle.weights for w in layer.values())
+    return bundle, {'params': params, 'size_kb': size / 1024}
+
+def distill(kind, units, series, train, val, soft_train, hist_window=18, forecast_window=18,
+            alpha=0.8, batch_size=256, epochs=20):
+    """Trains one student on blended teacher/actual targets"""
+    H, F = hist_window, forecast_window
+    model = create_student(kind, units, 8, H, F)
+    model.fit(tl.make_dataset(series, train, H, F, batch_size, soft_targets=soft_train, alpha=alpha),
+              validation_data=tl.make_dataset(series, val, H, F, batch_size, shuffle=False),
+              epochs=epochs, verbose=2,
+              callbacks=[tf.keras.callbacks.EarlyStopping(patience=3, restore_best_weights=True)])
+    return model
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teacher', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Website', 'lstm_cv_final.h5'))
+    parser.add_argument('--store', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Website', 'pages', 'history'))
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--val-start', required=True)
+    parser.add_argument('--students', nargs='+', default=list(STUDENTS), choices=list(STUDENTS))
+    parser.add_argument('--units', type=int, help="Width for every student; defaults per architecture")
+    parser.add_argument('--alpha', type=float, default=0.8, help="Weight of the teacher in the targets")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help="Largest allowed RMSE increase over the teacher, as a fraction")
+    parser.add_argument('--deploy', help="Bundle directory for the chosen student")
+    parser.add_argument('--no-activate', action='store_true',
+                        help="Write the --deploy bundle without pointing current.bundle at it")
+    parser.add_argument('--report', default='distill_report.json')
+    args = parser.parse_args(argv)
+
+    # The production model reads fixed 18-step windows
+    H = F = 18
+    series, index, starts = tl.load_training_data(args.store, args.start, args.end, H, F)
+    train, val = tl.split_starts(index, starts, args.val_start, H, F)
+    x_val, y_val = tl.window_batch(series, val, H, F)
+    x_one = x_val[:1]
+
+    teacher = import_model(args.teacher)
+    soft_train = teacher_targets(teacher, series, train, H, F)
+    soft_val = teacher.predict(x_val, batch_size=1024, verbose=0)
+    teacher_rmse = rmse_mw(y_val, soft_val, F)
+
+    scratch = tempfile.mkdtemp(prefix="distill-")
+    try:
+        bundle, stats = bundle_stats(teacher, os.path.join(scratch, 'teacher'))
+        results = [{'model': 'teacher', 'val_rmse': teacher_rmse, 'fidelity_rmse': 0.0,
+                    'latency_ms': latency_ms(bundle.predict, x_one), **stats}]
+        students = {}
+        for kind in args.students:
+            units = args.units or STUDENTS[kind]
+            model = distill(kind, units, series, train, val, soft_train, H, F,
+                            args.alpha, args.batch_size, args.epochs)
+            y_pred = model.predict(x_val, batch_size=1024, verbose=0)
+            bundle, stats = bundle_stats(model, os.path.join(scratch, kind))
+            name = f"{kind}-{units}"
+            students[name] = model
+            results.append({'model': name, 'val_rmse': rmse_mw(y_val, y_pred, F),
+                            'fidelity_rmse': rmse_mw(soft_val, y_pred, F),
+                            'latency_ms': latency_ms(bundle.predict, x_one), **stats})
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    limit = teacher_rmse * (1 + args.tolerance)
+    for r in results:
+        r['within_tolerance'] = r['val_rmse'] <= limit
+        print(f"{r['model']:>10}  rmse {r['val_rmse']:8.2f}  vs teacher {r['fidelity_rmse']:7.2f}  "
+              f"latency {r['latency_ms']:7.3f} ms  params {r['params']:>9,}  {r['size_kb']:9.1f} KB"
+              f"{'' if r['within_tolerance'] else '  (over tolerance)'}")
+
+    chosen = min((r for r in results[1:] if r['within_tolerance']), key=lambda r: r['latency_ms'], default=None)
+    if chosen is None:
+        print(f"No student within {args.tolerance:.0%} of the teacher's {teacher_rmse:.2f} MW; nothing deployed")
+    elif args.deploy:
+        manifest = save_bundle(students[chosen['model']], args.deploy, FEATURE_ORDER, SCALER_MEAN, SCALER_STD)
+        print(f"Deployed {chosen['model']} to {args.deploy} (model version {manifest['model_version']})")
+        if not args.no_activate:
+            print(f"Serving it via {set_current(args.deploy, WEBSITE_DIR)}")
+
+    with open(args.report, 'w') as f:
+        json.dump({'teacher': args.teacher, 'tolerance': args.tolerance, 'alpha': args.alpha,
+                   'results': results, 'deployed': chosen['model'] if chosen and args.deploy else None}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Parallel successive-halving search over create_LSTM_model hyperparameters
+
+Each trial samples LSTM width, dropouts and the history/forecast window
+lengths. All surviving trials train for the rung's epoch budget in a
+bounded process pool; after each rung only the best ``1 / eta`` by
+validation RMSE go on to the next, larger budget. Survivors resume from
+the weights they ended the previous rung with, so a rung only trains the
+extra epochs. Every (trial, rung) result is appended to a JSON-lines log,
+which is replayed on start-up so an interrupted search resumes where it
+stopped. A trial that raises is logged with ``status: failed`` and drops
+out; the rest of the search goes on.
+
+    python hparam_search.py --val-start 2022-01-01 --trials 27 --workers 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from custom_RMSE import RMSE_list
+
+SEARCH_SPACE = {
+    'LSTM_i': [32, 64, 128, 256, 500],
+    'dropout': [0.0, 0.05, 0.1, 0.3],
+    'recurrent_dropout': [0.0, 0.1, 0.2],
+    'hist_window': [12, 18, 24, 36],
+    'forecast_window': [18],
+}
+
+def sample_trials(n, seed=0):
+    """Draws ``n`` distinct configurations from ``SEARCH_SPACE``"""
+    rng = np.random.default_rng(seed)
+    trials, seen = [], set()
+    while len(trials) < n and len(seen) < np.prod([len(v) for v in SEARCH_SPACE.values()]):
+        params = {k: v[int(rng.integers(len(v)))] for k, v in SEARCH_SPACE.items()}
+        key = tuple(sorted(params.items()))
+        if key not in seen:
+            seen.add(key)
+            trials.append({'trial': len(trials), 'params': params})
+    return trials
+
+def rung_budgets(min_epochs, max_epochs, eta):
+    budgets = [min_epochs]
+    while budgets[-1] * eta <= max_epochs:
+        budgets.append(budgets[-1] * eta)
+    return budgets
+
+def checkpoint_path(checkpoint_dir, trial, epochs):
+    """Weights of ``trial`` after training for ``epochs`` epochs"""
+    return os.path.join(checkpoint_dir, f"trial_{trial:03d}_e{epochs}.h5")
+
+def run_trial(params, epochs, data_args, batch_size=256, latency_runs=20,
+              checkpoint=None, resume_from=None, initial_epoch=0):
+    """Trains one configuration and returns its validation RMSE and serving latency
+
+    Runs in a worker process, so TensorFlow is imported here and each
+    worker loads the history once per trial.
+
+    Parameters
+    ----------
+    checkpoint: str, optional
+        Where to save the weights after training
+    resume_from: str, optional
+        Weights from the previous rung; training continues from
+        ``initial_epoch`` up to ``epochs``
+    """
+    import tensorflow as tf
+    import train_lstm as tl
+    from collect_inputs import create_LSTM_model, SCALER_STD
+
+    H, F = params['hist_window'], params['forecast_window']
+    series, index, starts = tl.load_training_data(data_args['store'], data_args['start'],
+                                                  data_args['end'], H, F)
+    train, val = tl.split_starts(index, starts, data_args['val_start'], H, F)
+
+    model = create_LSTM_model(LSTM_i=params['LSTM_i'], dropout=params['dropout'],
+                              recurrent_dropout=params['recurrent_dropout'],
+                              var_num=8, hist_window=H, forecast_window=F)
+    if resume_from is not None:
+        model.load_weights(resume_from)
+    model.fit(tl.make_dataset(series, train, H, F, batch_size),
+              validation_data=tl.make_dataset(series, val, H, F, batch_size, shuffle=False),
+              epochs=epochs, initial_epoch=initial_epoch, verbose=0,
+              callbacks=[tf.keras.callbacks.EarlyStopping(patience=2, restore_best_weights=True)])
+    if checkpoint is not None:
+        tmp = f"{checkpoint}.{os.getpid()}.tmp.h5"
+        model.save_weights(tmp)
+        os.replace(tmp, checkpoint)
+
+    x_val, y_val = tl.window_batch(series, val, H, F)
+    y_pred = model.predict(x_val, batch_size=1024, verbose=0)
+    # Report RMSE in MW; the series is standardized by the load scaler
+    val_rmse = float(RMSE_list(y_val * SCALER_STD[0], y_pred * SCALER_STD[0]) / np.sqrt(F))
+
+    # Latency of a single dashboard-sized forecast after warm-up
+    x_one = x_val[:1]
+    model(x_one, training=False)
+    t0 = time.perf_counter()
+    for _ in range(latency_runs):
+        model(x_one, training=False)
+    latency_ms = (time.perf_counter() - t0) / latency_runs * 1000
+    return {'status': 'ok', 'val_rmse': val_rmse, 'latency_ms': latency_ms,
+            'params_count': int(model.count_params())}
+
+def load_log(path):
+    """Completed results keyed by (trial, epochs)"""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    r = json.loads(line)
+                    done[(r['trial'], r['epochs'])] = r
+    return done
+
+def _rank(r):
+    # Failed trials sort last and never survive a rung
+    return (r.get('status', 'ok') != 'ok', r.get('val_rmse') or 0.0)
+
+def run_rung(todo, rung, epochs, previous, workers, data_args, checkpoint_dir, batch_size, log, done):
+    """Trains ``todo`` for one rung and logs each result as it completes
+
+    A worker killed outright (e.g. out of memory) breaks the whole pool, so
+    the trials it took down are retried one at a time, each in its own
+    pool, and only the one that breaks again is logged as failed.
+    """
+    batches, retry = [(todo, workers)], False
+    while batches:
+        pending, n_workers = batches.pop(0)
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {}
+            for t in pending:
+                resume = checkpoint_path(checkpoint_dir, t['trial'], previous) if previous else None
+                if resume is not None and not os.path.exists(resume):
+                    resume = None
+                futures[pool.submit(run_trial, t['params'], epochs, data_args, batch_size,
+                                    checkpoint=checkpoint_path(checkpoint_dir, t['trial'], epochs),
+                                    resume_from=resume, initial_epoch=previous if resume else 0)] = t
+            for fut in as_completed(futures):
+                t = futures[fut]
+                r = {'trial': t['trial'], 'rung': rung, 'epochs': epochs, 'params': t['params']}
+                try:
+                    r.update(fut.result())
+                except BrokenProcessPool as e:
+                    if not retry:
+                        batches.append(([t], 1))
+                        continue
+                    r.update({'status': 'failed', 'error': repr(e)})
+                except Exception as e:
+                    r.update({'status': 'failed', 'error': repr(e)})
+                log.write(json.dumps(r) + '\n'); log.flush()
+                done[(t['trial'], epochs)] = r
+                if r['status'] == 'ok':
+                    print(f"trial {r['trial']:>3} rung {rung} epochs {epochs:>3} "
+                          f"rmse {r['val_rmse']:8.2f} latency {r['latency_ms']:6.2f} ms {r['params']}")
+                else:
+                    print(f"trial {r['trial']:>3} rung {rung} epochs {epochs:>3} failed: {r['error']}")
+        retry = True
+
+def search(trials, budgets, eta, workers, data_args, log_path, batch_size=256, checkpoint_dir=None):
+    """Successive halving over ``trials``; returns the results of the last rung
+
+    Weights are kept per trial and rung in ``checkpoint_dir`` (next to the
+    log by default) so survivors continue training instead of restarting.
+    """
+    done = load_log(log_path)
+    checkpoint_dir = checkpoint_dir or f"{os.path.splitext(log_path)[0]}_checkpoints"
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    alive = trials
+    results = []
+    for rung, epochs in enumerate(budgets):
+        todo = [t for t in alive if (t['trial'], epochs) not in done]
+        previous = budgets[rung - 1] if rung else 0
+        with open(log_path, 'a') as log:
+            run_rung(todo, rung, epochs, previous, workers, data_args, checkpoint_dir, batch_size, log, done)
+
+        results = sorted((done[(t['trial'], epochs)] for t in alive), key=_rank)
+        if rung < len(budgets) - 1:
+            ok = [r for r in results if r.get('status', 'ok') == 'ok']
+            keep = {r['trial'] for r in ok[:max(1, len(ok) // eta)]}
+            alive = [t for t in alive if t['trial'] in keep]
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Website', 'pages', 'history'))
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--val-start', required=True)
+    parser.add_argument('--trials', type=int, default=27)
+    parser.add_argument('--min-epochs', type=int, default=1)
+    parser.add_argument('--max-epochs', type=int, default=27)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--log', default='hparam_search.jsonl')
+    parser.add_argument('--checkpoints', help='weights per trial and rung; <log>_checkpoints by default')
+    args = parser.parse_args(argv)
+
+    data_args = {'store': args.store, 'start': args.start, 'end': args.end, 'val_start': args.val_start}
+    results = search(sample_trials(args.trials, args.seed),
+                     rung_budgets(args.min_epochs, args.max_epochs, args.eta),
+                     args.eta, args.workers, data_args, args.log, args.batch_size, args.checkpoints)
+    print('Best trials:')
+    for r in [r for r in results if r.get('status', 'ok') == 'ok'][:5]:
+        print(f"  rmse {r['val_rmse']:8.2f}  latency {r['latency_ms']:6.2f} ms  {r['params']}")
+
+if __name__ == "__main__":
+    main()
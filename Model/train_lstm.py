@@ -0,0 +1,163 @@
+"""Train the LSTM load forecaster on the historical 5 minute store
+
+Windows are never materialized: the normalized series is held once in
+memory and each batch of ``(8, hist_window)`` inputs and
+``(forecast_window,)`` targets is gathered on the fly from window start
+indices.
+
+    python train_lstm.py --start 2017-01-01 --val-start 2022-01-01 --end 2023-01-01
+"""
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from numpy.lib.stride_tricks import sliding_window_view
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Website'))
+from collect_inputs import create_LSTM_model, datetime_flags, SCALER_MEAN, SCALER_STD
+from data_store import STORE_DIR, load_history
+
+# Rows of the base series; the model's 8 inputs are gathered from these
+SERIES_ROWS = ['load', 'dni', 'temp', 'uw', 'ow', 'weekend_holiday']
+HIST_ROWS = [0, 1, 2]   # load, dni, temp over the history window
+FUTURE_ROWS = [1, 2]    # dni, temp over the forecast window
+FLAG_ROWS = [3, 4, 5]   # uw, ow, weekend_holiday over the history window
+
+def build_series(df):
+    """Normalized (6, n) float32 base series on a regular 5 minute grid
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        History with ``Timestamp``, ``Load``, ``DNI`` and ``HourlyDryBulbTemperature``
+
+    Returns
+    -------
+    np.ndarray, pd.DatetimeIndex
+        Series (NaN where data is missing) and its timestamps
+    """
+    df = df.set_index('Timestamp').sort_index()
+    df = df[~df.index.duplicated()].asfreq('5T')
+    uw, ow, weekend_holiday = datetime_flags(df.index)
+    series = np.stack([
+        (df['Load'].to_numpy(dtype=float) - SCALER_MEAN[0]) / SCALER_STD[0],
+        (df['DNI'].to_numpy(dtype=float) - SCALER_MEAN[1]) / SCALER_STD[1],
+        (df['HourlyDryBulbTemperature'].to_numpy(dtype=float) - SCALER_MEAN[2]) / SCALER_STD[2],
+        uw, ow, weekend_holiday,
+    ]).astype(np.float32)
+    return series, df.index
+
+def window_starts(series, hist_window=18, forecast_window=18):
+    """Start indices of every window whose history, future inputs and targets are complete
+
+    A window starting at ``s`` reads history ``[s, s + H)``, future weather
+    ``[s + F, s + F + H)`` and targets ``[s + H, s + H + F)``, matching
+    ``format_inputs`` where future inputs are shifted by the forecast horizon.
+    """
+    span = hist_window + forecast_window
+    n = series.shape[1] - span + 1
+    if n <= 0:
+        return np.array([], dtype=np.int64)
+    missing = np.concatenate([[0], np.cumsum(np.isnan(series).any(axis=0))])
+    complete = (missing[span:] - missing[:-span])[:n] == 0
+    return np.flatnonzero(complete)
+
+def window_batch(series, starts, hist_window=18, forecast_window=18):
+    """Gathers inputs and targets for ``starts`` from strided views of the series
+
+    ``sliding_window_view`` is zero-copy, so only the requested batch is
+    materialized.
+    """
+    H, F = hist_window, forecast_window
+    hist = sliding_window_view(series, H, axis=1)                     # (6, n - H + 1, H)
+    past, future = hist[:, starts], hist[:, starts + F]              # (6, batch, H) copies
+    x = np.concatenate([past[HIST_ROWS], future[FUTURE_ROWS], past[FLAG_ROWS]]).transpose(1, 0, 2)
+    y = sliding_window_view(series[0], F)[starts + H]                 # (batch, F)
+    return x, y
+
+def make_dataset(series, starts, hist_window=18, forecast_window=18,
+                 batch_size=256, shuffle=True, seed=0, soft_targets=None, alpha=1.0):
+    """tf.data pipeline producing ``(batch, 8, H)`` / ``(batch, F)`` batches lazily
+
+    Only the start indices are sliced into the dataset; each batch gathers
+    its windows from the single in-memory copy of the series in a parallel
+    map, so memory stays O(series) rather than O(series x window).
+
+    Parameters
+    ----------
+    soft_targets: np.ndarray, optional
+        ``(len(starts), F)`` teacher outputs for distillation; targets become
+        ``alpha * soft_targets + (1 - alpha) * actual load``
+    """
+    H, F = hist_window, forecast_window
+    data = tf.constant(series)
+    hist_offsets = tf.range(H, dtype=tf.int64)
+    target_offsets = tf.range(F, dtype=tf.int64)
+
+    def gather(s, soft=None):
+        idx = s[:, None] + hist_offsets[None, :]                      # (batch, H)
+        past = tf.gather(data, idx, axis=1)                           # (6, batch, H)
+        future = tf.gather(data, idx + F, axis=1)
+        x = tf.concat([tf.gather(past, HIST_ROWS), tf.gather(future, FUTURE_ROWS),
+                       tf.gather(past, FLAG_ROWS)], axis=0)
+        y = tf.gather(data[0], s[:, None] + H + target_offsets[None, :])
+        if soft is not None:
+            y = alpha * soft + (1 - alpha) * y
+        return tf.transpose(x, [1, 0, 2]), y
+
+    starts = starts.astype(np.int64)
+    if soft_targets is None:
+        ds = tf.data.Dataset.from_tensor_slices(starts)
+    else:
+        ds = tf.data.Dataset.from_tensor_slices((starts, np.asarray(soft_targets, dtype=np.float32)))
+    if shuffle:
+        ds = ds.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+    return (ds.batch(batch_size)
+              .map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+              .prefetch(tf.data.AUTOTUNE))
+
+def split_starts(index, starts, val_start, hist_window=18, forecast_window=18):
+    """Splits window starts so no training window reads data from ``val_start`` on"""
+    cut = index.searchsorted(pd.Timestamp(val_start))
+    return starts[starts + hist_window + forecast_window <= cut], starts[starts >= cut]
+
+def load_training_data(store_dir=STORE_DIR, start=None, end=None,
+                       hist_window=18, forecast_window=18):
+    df = load_history(store_dir, start, end,
+                      columns=['Load', 'DNI', 'HourlyDryBulbTemperature'])
+    series, index = build_series(df)
+    return series, index, window_starts(series, hist_window, forecast_window)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Website', 'pages', 'history'))
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--val-start', required=True)
+    parser.add_argument('--hist-window', type=int, default=18)
+    parser.add_argument('--forecast-window', type=int, default=18)
+    parser.add_argument('--lstm-units', type=int, default=500)
+    parser.add_argument('--dropout', type=float, default=0.05)
+    parser.add_argument('--recurrent-dropout', type=float, default=0.1)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--output', default='lstm_cv_final.h5')
+    args = parser.parse_args(argv)
+
+    H, F = args.hist_window, args.forecast_window
+    series, index, starts = load_training_data(args.store, args.start, args.end, H, F)
+    train, val = split_starts(index, starts, args.val_start, H, F)
+
+    model = create_LSTM_model(LSTM_i=args.lstm_units, dropout=args.dropout,
+                              recurrent_dropout=args.recurrent_dropout,
+                              var_num=8, hist_window=H, forecast_window=F)
+    model.fit(make_dataset(series, train, H, F, args.batch_size),
+              validation_data=make_dataset(series, val, H, F, args.batch_size, shuffle=False),
+              epochs=args.epochs,
+              callbacks=[tf.keras.callbacks.EarlyStopping(patience=3, restore_best_weights=True)])
+    model.save_weights(args.output)
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,24 @@ import pandas as pd
 import numpy as np
 import time
 import os
+import logging
 import altair as alt
 from PIL import Image
-import base64
-from datetime import datetime
+from datetime import datetime, timedelta
 from collect_inputs import *
+from forecast_cache import ForecastCache
+from live_forecast import LiveForecaster
+from feature_window import ZoneFeatures
+from zone_forecast import ZoneForecaster
+from scenarios import run_scenarios
+from attribution import occlusion
+from solcast import SolcastClient
 from vega_datasets import data
 
+# Public URL of export.py as seen from the visitor's browser; the history
+# download link is only shown when it is configured
+EXPORT_URL = os.environ.get('EXPORT_URL')
+
 
 # Page Config
 st.set_page_config(page_title ="Real-Time Electric Load Forecasting",
@@ -46,25 +57,59 @@ st.markdown(
 )
 
 # Load Input Data
-@st.cache_data
-def get_predictions():
-    '''Call API to get weather data for prediction'''
-    data = format_inputs()
-    return data 
-
-# Get inputs 
-inputs = get_predictions()
+@st.cache_resource
+def get_live_forecaster():
+    # Same step as push.py: $FORECAST_MODEL, the deployed current.bundle, or the production LSTM
+    return LiveForecaster()
+
+def get_inference_cache():
+    return get_live_forecaster().cache
+
+@st.cache_resource
+def start_solcast():
+    # Keeps solar_dni.parquet current within the daily API quota (needs SOLCAST_API_KEY)
+    return SolcastClient().start()
+
+start_solcast()
+
+@st.cache_resource
+def get_zone_forecaster():
+    return ZoneForecaster(get_inference_cache().model)
+
+@st.cache_resource
+def get_zone_features():
+    # One window per zone, advanced by the new intervals on each refresh
+    return ZoneFeatures()
+
+def compute_forecast():
+    '''Advance the input window to the latest interval and run the model'''
+    forecast = get_live_forecaster().compute() # 90 min forecast, corrected and logged
+    inputs = forecast['inputs']
+    # Which input rows moved this forecast, from one extra batched predict
+    attribution = occlusion(inputs, get_inference_cache().model)
+    try:
+        # Every NYISO zone in one batched model call
+        _, zone_inputs = get_zone_features().update()
+        zones = get_zone_forecaster().predict(zone_inputs)
+    except Exception:
+        logging.getLogger(__name__).exception("Zone forecast failed")
+        zones = None
+    return {**forecast, 'zones': zones, 'attribution': attribution}
+
+@st.cache_resource
+def get_forecast_cache():
+    return ForecastCache(compute_forecast)
+
+# Get inputs and predictions (stale-while-revalidate on NYISO 5 minute intervals)
+forecast = get_forecast_cache().get()
+inputs = forecast['inputs']
+prediction = forecast['prediction']
 prev_load = inputs[0] # N.Y.C.: NYC load from NYISO.com
 prev_dni = inputs[1] # Dni: Current DNI from solarcast
 prev_temp = inputs[2] # HourlyDryBulbTemperature: Current NOAA Temp
 future_dni = inputs[3] # Dni Future: T to T+90 future DNI from solarcast
 future_temp = inputs[4] # HourlyDryBulbTemperature Future:  T to T+90 future NOAA Temp
 
-# Fit into model and get predictions
-tranformed_data = tranform_data(inputs)
-model = import_model("lstm_cv_final.h5")
-prediction = make_prediction(np.array([tranformed_data]), model) # 90 min forecast
-
 # Plot Forecasts
 prediction_df = pd.DataFrame({'Min': list(range(5, 95, 5))})
 prediction_df['Load'] = prediction.T
@@ -88,22 +133,70 @@ line = (alt.Chart(pd.DataFrame({'Min': [0]}))
 )
 st.altair_chart((line + a), use_container_width=True)
 
+if forecast.get('zones') is not None:
+    with st.expander('Forecasts for NYISO zones'):
+        # Zones without an entry in zone_models.json run through the N.Y.C.
+        # model and scalers, so they are only shown on request
+        shown = get_zone_forecaster().calibrated()
+        if st.checkbox('Include uncalibrated zones (N.Y.C. model and scaling)'):
+            shown = NYISO_ZONES
+        if not shown:
+            st.caption('No zone has its own model in zone_models.json yet.')
+        else:
+            zone_df = pd.DataFrame(forecast['zones'], index = NYISO_ZONES, columns = list(range(5, 95, 5))).loc[shown]
+            zone_df = zone_df.rename_axis('Zone').reset_index().melt(id_vars = 'Zone', var_name = 'Min', value_name = 'Load')
+            st.altair_chart(alt.Chart(zone_df).mark_line().encode(
+                alt.X('Min', title = 'Min From Current Time'),
+                alt.Y('Load', title = 'Load [MWh]'),
+                alt.Color('Zone'),
+            ), use_container_width=True)
+
+if forecast.get('attribution') is not None:
+    with st.expander('What drove this forecast'):
+        # Mean change over the 90 minutes when each input is replaced by its training average
+        drivers = pd.DataFrame({'Input': FEATURE_ORDER, 'Effect': forecast['attribution'].mean(axis = 1)})
+        st.altair_chart(alt.Chart(drivers).mark_bar().encode(
+            alt.X('Effect', title = 'Effect on forecast [MWh]'),
+            alt.Y('Input', sort = FEATURE_ORDER, title = None),
+            color = alt.condition(alt.datum.Effect > 0, alt.value('#d62728'), alt.value('#1f77b4')),
+        ), use_container_width=True)
+
+with st.expander('What-if: weather forecast errors'):
+    offsets = st.slider('Temperature forecast error [°F]', -10, 10, (-5, 5))
+    scales = st.multiselect('DNI scale (cloud cover)', [0.0, 0.25, 0.5, 0.75, 1.0, 1.25, 1.5], default = [0.0, 0.5, 1.0, 1.25])
+    horizon = st.select_slider('Minutes ahead', options = list(range(5, 95, 5)), value = 90)
+    if scales:
+        # All scenarios are scored in one batched model call
+        scenario_df = run_scenarios(inputs, get_inference_cache().model, np.arange(offsets[0], offsets[1] + 1), sorted(scales))
+        grid = scenario_df[horizon].rename('Load').reset_index()
+        st.altair_chart(alt.Chart(grid).mark_rect().encode(
+            alt.X('temp_offset:O', title = 'Temperature offset [°F]'),
+            alt.Y('dni_scale:O', title = 'DNI scale'),
+            alt.Color('Load', title = 'Load [MWh]'),
+            tooltip = ['temp_offset', 'dni_scale', alt.Tooltip('Load', format = '.0f')],
+        ), use_container_width=True)
+
 # Export Data
 col1, col2 = st.columns(2)
 
 with col1:
-    if st.button('Export Data', key = 'electric_forecast_df'):
-        with st.spinner("Exporting..."):
-            export_forecast = combined_load.to_csv()
-            b64 = base64.b64encode(export_forecast.encode()).decode()
-            href = f'<a href="data:file/csv;base64,{b64}">Download CSV File</a>'
-            st.markdown(href, unsafe_allow_html=True)
+    st.download_button('Export Data', combined_load.to_csv(index=False), file_name='forecast.csv',
+                       mime='text/csv', key='electric_forecast_df')
+    if EXPORT_URL:
+        with st.expander('Export forecast history'):
+            dates = st.date_input('Issued between', (datetime.now().date() - timedelta(days=7), datetime.now().date()))
+            fmt = st.radio('Format', ('csv', 'parquet'), horizontal = True)
+            if len(dates) == 2:
+                # Streamed in chunks by export.py, so the range length does not affect memory
+                st.markdown(f'<a href="{EXPORT_URL}?start={dates[0]}&end={dates[1] + timedelta(days=1)}&format={fmt}">Download forecasts with temperature & DNI inputs</a>', unsafe_allow_html=True)
 
 with col2:
-    # Get time
-    now = datetime.now()
-    current_time = now.strftime("%m/%d/%Y %I:%M:%S %p")
+    # Get time of the forecast being shown
+    current_time = forecast['computed_at'].strftime("%m/%d/%Y %I:%M:%S %p")
     st.markdown(f'<div style="text-align: right;"><em>Last refreshed {current_time}</em></div>', unsafe_allow_html=True)
+    cache_stats = get_inference_cache().stats()
+    st.markdown(f'<div style="text-align: right; font-size: 12px;"><em>Model cache: {cache_stats["hit_rate"]:.0%} hit rate, '
+                f'{cache_stats["saved_seconds"]:.1f}s of inference saved</em></div>', unsafe_allow_html=True)
 
 
 # Current Weather Conditions
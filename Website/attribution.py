@@ -0,0 +1,37 @@
+import numpy as np
+from collect_inputs import tranform_data, make_prediction, SCALER_MEAN
+
+# Mean of every input row over the 2017-2022 training period. Load, DNI and
+# temperature match SCALER_MEAN; the uw/ow/weekend-holiday flags are not
+# standardized (mean 0 there), so their fraction of 5 minute intervals is
+# taken from datetime_flags over the same years.
+TRAINING_MEAN = np.concatenate([SCALER_MEAN[:5], [0.06597222222222222, 0.1111111111111111, 0.3140118667275217]])
+
+def occlusion(input_list, model, baseline=None):
+    """Change in forecast when each input row is replaced by its baseline
+
+    The original window and the eight occluded variants are scored together
+    in one batched ``predict``, so this works with any model (Keras or
+    bundle) at a small multiple of the cost of a single forecast.
+
+    Parameters
+    ----------
+    input_list: np.ndarray
+        Untransformed (8, 18) input window
+    model: keras.Model or BundleModel
+    baseline: np.ndarray, optional
+        Per-row replacement values; defaults to ``TRAINING_MEAN``
+
+    Returns
+    -------
+    np.ndarray
+        ``(8, forecast_window)`` attributions in MW: forecast minus the
+        forecast without that row
+    """
+    x = np.asarray(input_list, dtype=float)
+    baseline = TRAINING_MEAN if baseline is None else np.asarray(baseline, dtype=float)
+    batch = np.repeat(x[None], len(x) + 1, axis=0)
+    rows = np.arange(len(x))
+    batch[rows + 1, rows] = baseline[:, None]
+    prediction = make_prediction(tranform_data(batch), model)
+    return prediction[0] - prediction[1:]
@@ -0,0 +1,213 @@
+"""Backfill the historical 5 minute store from NYISO and NOAA archives
+
+For every month in the range the NYISO real-time load archive
+(``{YYYYMM}01pal_csv.zip``) and the NOAA Local Climatological Data for one
+station are downloaded by a bounded thread pool, parsed into 5 minute rows
+by a process pool and merged into a partitioned store of its own
+(``BACKFILL_STORE_DIR``), separate from the one The Data page reads. DNI is
+taken from the page's store where it has the month, and existing values are
+kept. Each month is written and checkpointed as soon as it is parsed; a
+month that fails to download or parse is logged and skipped, and the next
+run retries it. Downloads are cached and the checkpoint is kept per store,
+zone and station, so an interrupted run resumes where it stopped and
+re-running a month rewrites it to the same result.
+
+    python backfill.py 2017-01 2022-12 --workers 8
+    python ../Model/train_lstm.py --store history_backfill --val-start 2022-01-01
+
+Point ``--nyiso-url`` and ``--weather-url`` at a local file server to test.
+"""
+import os
+import json
+import zipfile
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from http_client import HttpClient
+from collect_inputs import parse_pal
+from data_store import STORE_DIR, BACKFILL_STORE_DIR, FLOAT_COLUMNS, load_history, write_partitions
+
+NYISO_URL = "http://mis.nyiso.com/public/csv/pal"
+WEATHER_URL = "https://www.ncei.noaa.gov/access/services/data/v1"
+WEATHER_STATION = "72505394728"   # New York Central Park (KNYC)
+CACHE_DIR = "backfill_cache"
+CHECKPOINT = "backfill_checkpoint.json"
+
+logger = logging.getLogger(__name__)
+
+def nyiso_url(month, base=NYISO_URL):
+    return f"{base}/{month.strftime('%Y%m')}01pal_csv.zip"
+
+def weather_url(month, base=WEATHER_URL, station=WEATHER_STATION):
+    end = (month + 1).to_timestamp() - pd.Timedelta(seconds=1)
+    return (f"{base}?dataset=local-climatological-data&stations={station}"
+            f"&startDate={month.to_timestamp():%Y-%m-%dT%H:%M:%S}&endDate={end:%Y-%m-%dT%H:%M:%S}"
+            f"&dataTypes=HourlyDryBulbTemperature&format=csv&units=standard")
+
+def download(http, url, path):
+    """Fetches ``url`` to ``path`` unless an earlier run already did"""
+    if os.path.exists(path):
+        return path
+    content = http.get(url).content
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return path
+
+def parse_load(path, zone='N.Y.C.'):
+    """5 minute load of ``zone`` from a monthly pal archive"""
+    frames = []
+    with zipfile.ZipFile(path) as z:
+        for name in sorted(z.namelist()):
+            frames.append(parse_pal(z.read(name).decode(), zones=[zone]))
+    load = pd.concat(frames)
+    return load[~load.index.duplicated(keep='last')].iloc[:, 0].rename('Load')
+
+def parse_weather(path):
+    """5 minute dry bulb temperature from an LCD CSV
+
+    LCD times are local standard time all year, so they are shifted onto
+    prevailing Eastern time to line up with NYISO.
+    """
+    df = pd.read_csv(path, usecols=['DATE', 'HourlyDryBulbTemperature'], dtype=str)
+    temp = pd.to_numeric(df['HourlyDryBulbTemperature'].str.rstrip('s'), errors='coerce')
+    lst = pd.to_datetime(df['DATE'])
+    local = (lst.dt.tz_localize('Etc/GMT+5').dt.tz_convert('US/Eastern').dt.tz_localize(None))
+    temp = pd.Series(temp.values, index=local).dropna()
+    temp = temp[~temp.index.duplicated()].sort_index()
+    hourly = temp.resample('H').mean()
+    return hourly.resample('5T').interpolate(limit=12).rename('HourlyDryBulbTemperature')
+
+def parse_month(month, load_path, weather_path, zone='N.Y.C.'):
+    """Runs in a worker process; returns the month's rows on the 5 minute grid"""
+    load = parse_load(load_path, zone)
+    temp = parse_weather(weather_path)
+    index = pd.date_range(month.to_timestamp(), (month + 1).to_timestamp(), freq='5T', inclusive='left')
+    df = pd.DataFrame({'Load': load.reindex(index), 'HourlyDryBulbTemperature': temp.reindex(index)})
+    df = df.interpolate(limit=3, limit_area='inside')
+    return df.rename_axis('Timestamp').reset_index()
+
+def merge_month(df, month, store_dir=BACKFILL_STORE_DIR, base_dir=STORE_DIR):
+    """Overlays backfilled columns on the stored month, keeping everything else (e.g. DNI)
+
+    Values already in ``store_dir`` win over those in the read-only
+    ``base_dir``; neither overrides the freshly backfilled columns.
+    """
+    for source in (store_dir, base_dir):
+        if source is None or not os.path.isdir(source):
+            continue
+        existing = load_history(source, month.to_timestamp(), (month + 1).to_timestamp())
+        if len(existing):
+            existing = existing.set_index('Timestamp')
+            merged = df.set_index('Timestamp').combine_first(existing[[c for c in FLOAT_COLUMNS if c in existing]])
+            df = merged.reset_index()
+    if 'DNI' not in df:
+        df['DNI'] = np.nan
+    return df.dropna(subset=['Load'])
+
+def checkpoint_key(store_dir, zone, station):
+    """Runs for another store, zone or station keep their own list of finished months"""
+    return f"{os.path.abspath(store_dir)}|{zone}|{station}"
+
+def load_checkpoint(path):
+    """Finished months per ``checkpoint_key``"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        state = json.load(f)
+    # Checkpoints from before keying cannot say which run they belong to
+    return {k: v for k, v in state.items() if k != 'written'}
+
+def save_checkpoint(state, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+def backfill(start, end, store_dir=BACKFILL_STORE_DIR, zone='N.Y.C.', station=WEATHER_STATION,
+             nyiso_base=NYISO_URL, weather_base=WEATHER_URL, cache_dir=CACHE_DIR,
+             checkpoint=CHECKPOINT, workers=8, processes=None, force=False):
+    """Backfills every month from ``start`` to ``end`` inclusive
+
+    Parameters
+    ----------
+    start, end: str
+        First and last month, e.g. ``'2017-01'``
+    workers: int
+        Concurrent downloads
+    processes: int, optional
+        Parser processes; defaults to the CPU count
+    force: bool
+        Rewrite months the checkpoint records as done
+
+    Returns
+    -------
+    list of str
+        Months written by this run
+    """
+    key = checkpoint_key(store_dir, zone, station)
+    state = load_checkpoint(checkpoint)
+    done = set(state.get(key, []))
+    months = [m for m in pd.period_range(start, end, freq='M') if force or str(m) not in done]
+    if not months:
+        return []
+    os.makedirs(cache_dir, exist_ok=True)
+    http = HttpClient(timeout=(3.05, 60), deadline=120)
+
+    def fetch(month):
+        load_path = download(http, nyiso_url(month, nyiso_base), os.path.join(cache_dir, f"pal-{month}.zip"))
+        weather_path = download(http, weather_url(month, weather_base, station),
+                                os.path.join(cache_dir, f"lcd-{station}-{month}.csv"))
+        return load_path, weather_path
+
+    written = []
+    with ThreadPoolExecutor(max_workers=workers) as downloads, \
+         ProcessPoolExecutor(max_workers=processes) as parsers:
+        pending = {downloads.submit(fetch, m): ('fetch', m) for m in months}
+        # Downloads feed parses and each parse is written and checkpointed as
+        # it finishes, so one failure (or an interruption) loses only its month
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                stage, m = pending.pop(fut)
+                try:
+                    if stage == 'fetch':
+                        pending[parsers.submit(parse_month, m, *fut.result(), zone)] = ('parse', m)
+                        continue
+                    df = merge_month(fut.result(), m, store_dir, base_dir=STORE_DIR)
+                    write_partitions(df, store_dir)
+                except Exception:
+                    logger.exception("Backfill of %s failed at %s; skipping it", m, stage)
+                    continue
+                written.append(str(m))
+                done.add(str(m))
+                state[key] = sorted(done)
+                save_checkpoint(state, checkpoint)
+                logger.info("Backfilled %s (%d rows)", m, len(df))
+    return sorted(written)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('start')
+    parser.add_argument('end')
+    parser.add_argument('--store', default=BACKFILL_STORE_DIR)
+    parser.add_argument('--zone', default='N.Y.C.')
+    parser.add_argument('--station', default=WEATHER_STATION)
+    parser.add_argument('--nyiso-url', default=os.environ.get('BACKFILL_NYISO_URL', NYISO_URL))
+    parser.add_argument('--weather-url', default=os.environ.get('BACKFILL_WEATHER_URL', WEATHER_URL))
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--checkpoint', default=CHECKPOINT)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    backfill(args.start, args.end, args.store, args.zone, args.station, args.nyiso_url,
+             args.weather_url, args.cache_dir, args.checkpoint, args.workers, args.processes, args.force)
+
+if __name__ == "__main__":
+    main()
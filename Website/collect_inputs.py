@@ -6,13 +6,18 @@ import requests
 import json
 from dateutil import tz
 import holidays
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense
-from tensorflow.keras.layers import Dropout
-from tensorflow.keras.layers import LSTM
-import tensorflow.keras.layers as ly
-from tensorflow.keras.utils import plot_model
-from tensorflow.keras.models import Model
+from single_flight import SingleFlight, resource_key
+from http_client import HttpClient, LastGoodStore
+from snapshots import SnapshotRecorder
+from model_bundle import BundleError, load_bundle
+
+# Clock for "today" and the upstream time buckets; replay.py swaps in a virtual one
+clock = datetime.now
+
+single_flight = SingleFlight()
+# RECORD_SNAPSHOTS=1 keeps every upstream response for replay.py
+http = HttpClient(transport=SnapshotRecorder() if os.environ.get('RECORD_SNAPSHOTS') else None)
+last_good = LastGoodStore()
 
 class WeatherRequest():
     """Request weather data from the NWS
@@ -237,8 +242,15 @@ class WeatherRequest():
         """
         header = {"User-Agent": "Capstone, emily.r.fernandes@berkeley.edu"}
 
-        response = requests.get(api_url, headers=header)
-        return response.json()
+        key = resource_key("nws", api_url)
+
+        def fetch():
+            return http.get_json(api_url, headers=header)
+
+        # Sessions asking for the same URL in the same 5 minutes share one
+        # request; a failure is not shared, so the last good value is served
+        # and the next caller retries upstream
+        return last_good.fetch(key, lambda: single_flight.do(key, fetch, now=clock()))
 
     def build_hourly_forecast_objects(self):
         """Iterates through the raw results and builds hourly objects for
@@ -357,26 +369,25 @@ class ObservationHour():
         aware = naive.astimezone(tz=local_zone)
         return aware
 
-def weather_dict():
-    W = WeatherRequest('J',True)
+def weather_dict(zone='J'):
+    W = WeatherRequest(zone,True)
     Historical_Weather = W.hourly_results
-    W = WeatherRequest('J',False)
+    W = WeatherRequest(zone,False)
     Forecast_Weather = W.hourly_results
     
-    keys = list(Historical_Weather.keys())+list(Forecast_Weather.keys())
+    # Observations are keyed "<hour> <station>": keep one station per hour,
+    # preferring the NYC stations in order, then any other; forecast hours
+    # are added after and take precedence
     Complete_Weather = {}; station_order=['KEWR','KJFK','KLGA','KNYC','KTEB']
-    for i,k in enumerate(keys):
-        try:   
-            k_hist = k[0:-5]
-            try:        Complete_Weather[k_hist]=Historical_Weather[f"{k_hist} {station_order[0]}"]
-            except:
-                try:    Complete_Weather[k_hist]=Historical_Weather[f"{k_hist} {station_order[1]}"]
-                except:
-                    try:    Complete_Weather[k_hist]=Historical_Weather[f"{k_hist} {station_order[2]}"]
-                    except:
-                        try:    Complete_Weather[k_hist]=Historical_Weather[f"{k_hist} {station_order[3]}"]
-                        except: Complete_Weather[k_hist]=Historical_Weather[f"{k_hist} {station_order[4]}"]
-        except:Complete_Weather[k]=Forecast_Weather[k]
+    rank = {}
+    for k in Historical_Weather.keys():
+        k_hist, station = k[0:-5], k[-4:]
+        r = station_order.index(station) if station in station_order else len(station_order)
+        if k_hist not in rank or r < rank[k_hist]:
+            rank[k_hist] = r
+            Complete_Weather[k_hist] = Historical_Weather[k]
+    for k in Forecast_Weather.keys():
+        Complete_Weather[k] = Forecast_Weather[k]
     return Complete_Weather
 def get_national_holidays(start_date, end_date, country):
     # Get the Bank Holidays for the given country
@@ -403,112 +414,182 @@ def enforce_5min(df,c_time=''):
     #df = df.bfill().ffill()
     return df
     
-#Collect last 90 Mins of NYISO Load (Collect Timestamps from here)
-def return_NYISO_Load():
-    #Request Today's Load 
-    str_dt = datetime.now().strftime('%Y%m%d')
-    url = f"http://mis.nyiso.com/public/csv/pal/{str_dt}pal.csv"
-    
-    #Format to DF
-    r = requests.get(url, stream=True)
-    if r.ok:        
-        v=''
-        for chunk in r.iter_content(chunk_size=1024 * 8): v=v+chunk.decode()
-        v_new = []
-        for ln in  v.split('\n'):
-            vv = ln.replace('"','').replace('\r','').split(',') 
-            if vv!=['']:v_new.append(vv)#;print(vv) 
+# Zones in the NYISO pal.csv, in NYISO's A-K order, and the NWS zone letter of each
+NYISO_ZONES = ['WEST', 'GENESE', 'CENTRL', 'NORTH', 'MHK VL', 'CAPITL',
+               'HUD VL', 'MILLWD', 'DUNWOD', 'N.Y.C.', 'LONGIL']
+NYISO_ZONE_LETTERS = dict(zip(NYISO_ZONES, 'ABCDEFGHIJK'))
+
+def parse_pal(text, zones=NYISO_ZONES):
+    """Pivots a NYISO pal.csv into a 5 minute time x zone load frame in one pass"""
+    v_new = []
+    for ln in text.split('\n'):
+        vv = ln.replace('"','').replace('\r','').split(',') 
+        if vv!=['']:v_new.append(vv)
 
     df = pd.DataFrame(v_new[1:],columns=v_new[0])
-    
-    #Collect only NYC and Enfore 5 Minute Freq and Interpolate
-    df = df[df['Name']=='N.Y.C.']
     df = df[df['Load'].astype(str)!='']
-    df = df[['Load', "Time Stamp"]]
     df["Load"] = df["Load"].astype(float)
     df['Time Stamp'] = pd.to_datetime(df['Time Stamp'],format="%m/%d/%Y %H:%M:%S")
-    df = enforce_5min(df, 'Time Stamp')   
-    
-    df = df.iloc[-18:]    
-    t = np.array(df.index)
-    load = df['Load'].astype(float).values
-    return t,load
+    df = df.drop_duplicates(subset=['Time Stamp', 'Name'], keep='last')
+    df = df.pivot(index='Time Stamp', columns='Name', values='Load').reindex(columns=list(zones))
+    return enforce_5min(df)
+
+def return_NYISO_zone_matrix(window=18):
+    """Last ``window`` intervals of real-time load for every NYISO zone
+
+    Returns
+    -------
+    np.ndarray, np.ndarray
+        Timestamps ``(window,)`` and loads ``(len(NYISO_ZONES), window)``
+    """
+    #Request Today's Load 
+    now = clock()
+    str_dt = now.strftime('%Y%m%d')
+    url = f"http://mis.nyiso.com/public/csv/pal/{str_dt}pal.csv"
+
+    def fetch():
+        return http.get(url).content.decode()
+
+    v = last_good.fetch("nyiso-pal", lambda: single_flight.do(f"nyiso-pal-{str_dt}", fetch, now=now))
+    df = parse_pal(v).iloc[-window:]
+    return np.array(df.index), df.to_numpy(dtype=float).T
+
+#Collect last 90 Mins of NYISO Load (Collect Timestamps from here)
+def return_NYISO_Load():
+    t, loads = return_NYISO_zone_matrix()
+    return t, loads[NYISO_ZONES.index('N.Y.C.')]
+
+SOLAR_CSV = "solar_data.csv"
+SOLAR_CACHE = "solar_dni.parquet"
+# solar_data.csv is a Sydney stand-in; shifting it lines its days up with NYC.
+# Real Solcast periods for the NYC site need no shift.
+SOLAR_SHIFT = pd.Timedelta(hours=5)
+
+# Static DNI profile served when the cache does not cover the requested window
+SOLAR_PROFILE = np.array([39.        ,  43.5       ,  48.        ,  52.5       , 57.        ,  61.5       ,  66.        ,  70.33333333, 74.66666667,  79.        ,  83.33333333,  87.66666667, 92.        ,  96.66666667, 101.33333333, 106.        , 110.66666667, 115.33333333])
+SOLAR_PROFILE_F = np.array([120.        , 121.        , 122.        , 123.        , 124.        , 125.        , 126.        , 119.66666667, 113.33333333, 107.        , 100.66666667,  94.33333333,  88.        ,  77.5       , 67.        ,  56.5       ,  46.        ,  35.5])
+
+_solar_series = None
+_solar_series_mtime = None
+
+def regrid_solar(df, shift=pd.Timedelta(0)):
+    """Converts raw Solcast periods into a 5 minute DNI series
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Solcast output with ``period_end`` (UTC, ISO 8601) and ``dni`` columns
+    shift: pd.Timedelta
+        Added to the Eastern time stamps; only the stand-in CSV uses one
+
+    Returns
+    -------
+    pd.Series
+        float32 DNI on a sorted, naive 5 minute index
+    """
+    t = pd.to_datetime(df["period_end"], utc=True).dt.tz_convert('US/Eastern') + shift
+    dni = pd.Series(df["dni"].astype(float).values, index=t.dt.tz_localize(None).values)
+    dni = dni[~dni.index.duplicated(keep='last')].sort_index()
+    dni = enforce_5min(dni.to_frame('dni'))['dni']
+    return dni.astype(np.float32)
+
+def build_solar_cache(csv_path=SOLAR_CSV, cache_path=SOLAR_CACHE):
+    """Parses the Solcast CSV once and writes the regridded series to Parquet"""
+    dni = regrid_solar(pd.read_csv(csv_path), shift=SOLAR_SHIFT)
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    dni.rename_axis('period_end').to_frame('dni').to_parquet(tmp)
+    os.replace(tmp, cache_path)
+    return dni
+
+def load_solar_series(csv_path=SOLAR_CSV, cache_path=SOLAR_CACHE):
+    """Returns the 5 minute DNI series, seeding the cache from the CSV when there is none
+
+    Once the cache exists it is only changed by ``solcast.merge_solar``; it
+    is never rebuilt from the stand-in CSV, which would overwrite the live
+    Solcast values merged into it. Delete the cache to reseed it.
+    """
+    global _solar_series, _solar_series_mtime
+    if not os.path.exists(cache_path):
+        # Only one worker process builds it; the others wait and reuse its output
+        with single_flight.file_lock("solar-cache"):
+            if not os.path.exists(cache_path):
+                build_solar_cache(csv_path, cache_path)
+
+    mtime = os.path.getmtime(cache_path)
+    if _solar_series is None or _solar_series_mtime != mtime:
+        _solar_series = pd.read_parquet(cache_path)['dni']
+        _solar_series_mtime = mtime
+    return _solar_series
+
+def solar_window(t, series=None):
+    """Slices the DNI values for the 5 minute timestamps in ``t``
+
+    The window is located with a binary search on the sorted index, so a
+    lookup is O(log n) regardless of how much history the cache holds.
+
+    Returns
+    -------
+    np.ndarray or None
+        DNI values aligned with ``t``, None when the cache does not cover it
+    """
+    if series is None:
+        series = load_solar_series()
+    t = pd.DatetimeIndex(t)
+    i = series.index.searchsorted(t[0])
+    window = series.iloc[i:i + len(t)]
+    if len(window) != len(t) or not window.index.equals(t):
+        return None
+    return window.values.astype(float)
 
 def return_solar_data(url_type):
     
-    # api_key = "rcJVj9RL-a6TKHOd07kMvAJGSWpmXYUA"
-    # #api_key = "FuPQMZl6ZqVlZ70Qug1i6X9oevjzxgND"
-    # #api_key = "wj4V2dP8klYCQVHvhUilFyT-9-d111xi"
-    
-    # lat = '40.712775'
-    # lon = '-74.005973'
-    # unmetered_lat = "-33.856784"
-    # unmetered_lon = "151.215297"
-    # lat = unmetered_lat
-    # lon = unmetered_lon
-    # hr = 168
-
-    # if url_type=='Actual':
-    #     #url = f"https://api.solcast.com.au/world_radiation/estimated_actuals?latitude={lat}&longitude={lon}&hours={hr}&output_parameters=air_temp,dni,ghi&format=json".format(lat=unmetered_lat, lon=unmetered_lon, hr=168)
-    #     url = f"https://api.solcast.com.au/data/live/radiation_and_weather?api_key={api_key}&latitude={lat}&longitude={lon}&output_parameters=air_temp,dni,ghi&format=json"
-    # else:
-    #     url = f"https://api.solcast.com.au/world_radiation/forecasts?api_key={api_key}&latitude={lat}&longitude={lon}&hours=168&output_parameters=air_temp,dni,ghi&format=json"
-    
-    # response = requests.get(url)
-    # data = json.loads(response.text)    
-    # df = pd.DataFrame(data['forecasts'])
-    df = pd.read_csv("solar_data.csv")
-    print(df)
-    #Create Datetime Index & enforce 5 Min Freq
-    df["period_end"] = pd.to_datetime(df["period_end"], utc=True).dt.tz_convert('US/Eastern')
-    df["period_end"] = df["period_end"].apply(lambda x: x + timedelta(hours=5))
-    df = df[['dni',"period_end"]]
-    print(df)
-    df = enforce_5min(df, 'period_end')
-    df.index = [ pd.to_datetime(str(e)[:-7]) for e in df.index ]
-    print(df)
+    # Solcast is not called per request: solcast.py refreshes the local
+    # cache on a quota-budgeted schedule and windows are sliced from it
+    return load_solar_series().to_frame('dni')
 
-    return df
 
+# Ramp windows the model flags: 'uw' early morning wake-up, 'ow' office
+# opening and closing
+UW_TIMES = ['04:00','04:05','04:10','04:15','04:20','04:25',
+            '04:30','04:35','04:40','04:45','04:50','04:55',
+            '05:00','05:05','05:10','05:15','05:20','05:25',
+            '05:30']
 
-def return_datetime_flags(t):
-    now_i = datetime.now()
-    td = timedelta(days=1)
-    holidays = get_national_holidays(now_i-td , now_i+td , 'US')
-    
-    uw = ['04:00','04:05','04:10','04:15','04:20','04:25',
-          '04:30','04:35','04:40','04:45','04:50','04:55',
-          '05:00','05:05','05:10','05:15','05:20','05:25',
-          '05:30']
-    
-    ow = ['06:15','06:20','06:25',
-          '06:30','06:35','06:40','06:45','06:50','06:55',
-          '07:00','07:05','07:10','07:15','07:20','07:25',
-          '07:30','07:35','07:40','07:45',
-          '16:30','16:35','16:40','16:45','16:50','16:55',
-          '17:00','17:05','17:10','17:15','17:20','17:25','17:30']
-    
-    uw_v=[]; ow_v=[]; holiday_weekend = []
-    for dt in t:
-        e = str(dt.hour).zfill(2)+":"+str(dt.minute).zfill(2)
+OW_TIMES = ['06:15','06:20','06:25',
+            '06:30','06:35','06:40','06:45','06:50','06:55',
+            '07:00','07:05','07:10','07:15','07:20','07:25',
+            '07:30','07:35','07:40','07:45',
+            '16:30','16:35','16:40','16:45','16:50','16:55',
+            '17:00','17:05','17:10','17:15','17:20','17:25','17:30']
 
-        if e in uw: uw_i=1
-        else:       uw_i=0
-        
-        if e in ow: ow_i=1
-        else:       ow_i=0
-        
-        if dt.weekday() in [5,6]:   we_h_v = 1
-        else:                       we_h_v = 0
-        
-        if str(dt)[0:10] in holidays: we_h_v = 1
-    
-        
-        uw_v.append(uw_i)
-        ow_v.append(ow_i)
-        holiday_weekend.append(we_h_v)
-    
-    return np.array(uw_v), np.array(ow_v), np.array(holiday_weekend)
+def _minute_of_day(times):
+    return [int(e[0:2]) * 60 + int(e[3:5]) for e in times]
+
+def datetime_flags(t, country='US'):
+    """Vectorized uw/ow/weekend-holiday flags for any range of timestamps
+
+    Parameters
+    ----------
+    t: array-like of datetime
+        Timestamps, e.g. a 5 minute DatetimeIndex spanning years of history
+
+    Returns
+    -------
+    tuple of np.ndarray
+        ``uw``, ``ow`` and ``weekend_holiday`` as 0/1 int arrays
+    """
+    t = pd.DatetimeIndex(t)
+    minute = np.asarray(t.hour * 60 + t.minute)
+    uw_v = np.isin(minute, _minute_of_day(UW_TIMES)).astype(int)
+    ow_v = np.isin(minute, _minute_of_day(OW_TIMES)).astype(int)
+
+    holiday_days = holidays.CountryHoliday(country, years=sorted(set(t.year)))
+    holiday_dates = pd.DatetimeIndex(list(holiday_days.keys()))
+    weekend_holiday = (np.asarray(t.dayofweek >= 5) | np.asarray(t.normalize().isin(holiday_dates))).astype(int)
+    return uw_v, ow_v, weekend_holiday
+
+def return_datetime_flags(t):
+    return datetime_flags(t)
 
 
 
@@ -534,17 +615,12 @@ def format_inputs():
     temp_f = np.array([list(e)[0] for e in temp_df[ temp_df.index.isin(t_f)].values])
     #print(temp)    print(temp_f)
     
-    #Call Solar API for Solar 
-    #df = return_solar_data('Actual?')
-    #except: df = pd.DataFrame()
-    #solar = np.array(list(df[df.index.isin(t)].values))
-    
-    #try:    df = return_solar_data('Forecast')
-    #except: df = pd.DataFrame()
-    #solar_f = np.array(list(df[df.index.isin(t_f)].values))
-    #print(solar);    print(solar_f)
-    solar =np.array([39.        ,  43.5       ,  48.        ,  52.5       , 57.        ,  61.5       ,  66.        ,  70.33333333, 74.66666667,  79.        ,  83.33333333,  87.66666667, 92.        ,  96.66666667, 101.33333333, 106.        , 110.66666667, 115.33333333])
-    solar_f=np.array([120.        , 121.        , 122.        , 123.        , 124.        , 125.        , 126.        , 119.66666667, 113.33333333, 107.        , 100.66666667,  94.33333333,  88.        ,  77.5       , 67.        ,  56.5       ,  46.        ,  35.5])
+    #Slice Solar from the local cache
+    series = load_solar_series()
+    solar = solar_window(t, series)
+    solar_f = solar_window(t_f, series)
+    if solar is None:   solar = SOLAR_PROFILE
+    if solar_f is None: solar_f = SOLAR_PROFILE_F
     ###########################
     #Create Time Flag & Weekend/Holiday Variables
     uw_v, ow_v,weekend_holiday = return_datetime_flags(t)
@@ -555,42 +631,49 @@ def format_inputs():
     print(input_list)
     return input_list
 
-def tranform_data(input_list):
-    m = 5574.113154123897;std = 1157.6820234795014
-    m_s = 176.74872041098973 ;std_s = 310.4973536354869
-    m_t = 56.030910041113;std_t = 16.507268780702415
-    m_d = 0;std_d=1
-    
-    m_list = [m,m_s,m_t,m_s,m_t,m_d,m_d,m_d,m_d]
-    std_list = [std,std_s,std_t,std_s,std_t,std_d,std_d,std_d,std_d]
+# Input rows of the (8, 18) window, in model order
+FEATURE_ORDER = ['load', 'dni', 'temp', 'dni_future', 'temp_future', 'uw', 'ow', 'weekend_holiday']
+# 5-minute steps the served model forecasts
+FORECAST_WINDOW = 18
 
-    input_list_xfr = [(ln-m_list[i])/std_list[i]  for i,ln in enumerate(input_list)]
-    return input_list_xfr
+# Standardization constants per input row, from the 2017-2022 training data
+SCALER_MEAN = np.array([5574.113154123897, 176.74872041098973, 56.030910041113,
+                        176.74872041098973, 56.030910041113, 0, 0, 0])
+SCALER_STD = np.array([1157.6820234795014, 310.4973536354869, 16.507268780702415,
+                       310.4973536354869, 16.507268780702415, 1, 1, 1])
 
-def untransform_prediction(load):
-    m = 5574.113154123897;std = 1157.6820234795014
-    return (load * std)+m
-
-def import_model(path):
+def tranform_data(input_list):
+    # Works on one (8, 18) window or a stacked (n, 8, 18) batch
+    return (np.asarray(input_list, dtype=float) - SCALER_MEAN[:, None]) / SCALER_STD[:, None]
 
-    def create_LSTM_model(LSTM_i = 4, dropout=0.3, recurrent_dropout=0,
-                        var_num = 8,
-                        hist_window=18,forecast_window=18):
+def untransform_prediction(load):
+    return (load * SCALER_STD[0]) + SCALER_MEAN[0]
+
+def create_LSTM_model(LSTM_i = 4, dropout=0.3, recurrent_dropout=0,
+                    var_num = 8,
+                    hist_window=18,forecast_window=18):
+    # TensorFlow is only needed to build or train; bundles are served without it
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Dropout, LSTM
+
+    model = Sequential()
+    model.add(LSTM(LSTM_i, input_shape=(var_num,hist_window),recurrent_dropout = recurrent_dropout))
+    model.add(Dense(100))
+    model.add(Dropout(dropout))
+    model.add(Dense(forecast_window))
+    model.compile(loss='mean_squared_error', optimizer='adam')
+    return model
 
-        model = Sequential()
-        model.add(LSTM(LSTM_i, input_shape=(var_num,hist_window),recurrent_dropout = recurrent_dropout))
-        model.add(Dense(100))
-        model.add(Dropout(dropout))
-        model.add(Dense(forecast_window))
-        model.compile(loss='mean_squared_error', optimizer='adam')
+def import_model(path="lstm_cv_final.h5"):
+    if os.path.isdir(path):
+        model = load_bundle(path, feature_order=FEATURE_ORDER, forecast_window=FORECAST_WINDOW)
+        if not (np.allclose(model.scaler_mean, SCALER_MEAN) and np.allclose(model.scaler_std, SCALER_STD)):
+            raise BundleError(f"{path} was trained with different scaler constants")
         return model
-
-    model_name = "lstm_cv_final.h5"
-
     model = create_LSTM_model(LSTM_i = 500, dropout=0.05, recurrent_dropout=0.1,
                       var_num = 8,
-                      hist_window=18,forecast_window=18)
-    model.load_weights(f"{model_name}") 
+                      hist_window=18,forecast_window=FORECAST_WINDOW)
+    model.load_weights(path) 
     #model.eval()
     return model
 
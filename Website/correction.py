@@ -0,0 +1,179 @@
+"""Online residual correction of the LSTM forecast
+
+Each forecast horizon has its own recursive-least-squares model of the
+residual ``actual - forecast`` on a few standardized features: the raw
+forecast for that horizon, the latest load, and the temperature and DNI
+expected at the target time. When a refresh brings new NYISO actuals,
+every earlier forecast whose target they cover updates its horizon's
+model once; that is 18 rank-one updates of a 5 x 5 matrix per interval,
+whatever the history length. A forgetting factor lets the correction
+follow regime shifts (heat waves, holidays, drift) without a retrain.
+
+State (coefficients, covariances, the forecasts still awaiting their
+actuals and the newest issue time) lives in ``correction_state.npz`` and is
+updated under a file lock. Only the first ``step`` for a given issue time
+learns and registers; any process repeating it gets the same correction
+without touching the state, so each residual is applied exactly once.
+"""
+import os
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+import collect_inputs as ci
+from collect_inputs import SCALER_MEAN, SCALER_STD
+
+STATE_PATH = "correction_state.npz"
+INTERVAL = timedelta(minutes=5)
+N_FEATURES = 5
+FORGETTING = 0.995          # ~200 intervals (17 hours) of effective memory
+PRIOR_VARIANCE = 1.0        # initial P; small so early corrections stay modest
+MIN_UPDATES = 12            # per horizon before corrections are applied
+
+def features(inputs, raw):
+    """``(horizon, N_FEATURES)`` standardized regressors for one forecast
+
+    Future DNI and temperature columns are shifted by the forecast horizon,
+    so column ``h`` is the weather at the target of horizon ``h``.
+    """
+    inputs = np.asarray(inputs, dtype=float)
+    raw = np.asarray(raw, dtype=float).reshape(-1)
+    H = len(raw)
+    z = lambda v, row: (v - SCALER_MEAN[row]) / SCALER_STD[row]
+    return np.stack([
+        np.ones(H),
+        z(raw, 0),
+        np.full(H, z(inputs[0, -1], 0)),
+        z(inputs[4, :H], 2),
+        z(inputs[3, :H], 1),
+    ], axis=1)
+
+class ResidualCorrector():
+    """Per-horizon RLS correction updated as actuals arrive
+
+    Parameters
+    ----------
+    horizon: int
+        Forecast steps (5 minute intervals)
+    forgetting: float
+        RLS forgetting factor in (0, 1]; lower adapts faster but is noisier
+    path: str
+        ``.npz`` state file shared by every process
+    """
+
+    def __init__(self, horizon=18, forgetting=FORGETTING, path=None, min_updates=MIN_UPDATES):
+        self.horizon = horizon
+        self.forgetting = forgetting
+        self.path = path or STATE_PATH
+        self.min_updates = min_updates
+        self.reset()
+
+    def reset(self):
+        self.theta = np.zeros((self.horizon, N_FEATURES))
+        self.P = np.tile(np.eye(N_FEATURES) * PRIOR_VARIANCE, (self.horizon, 1, 1))
+        self.n = np.zeros(self.horizon, dtype=np.int64)
+        # Forecasts awaiting actuals: issue time -> (features, horizons still open)
+        self.pending = {}
+        self.last_issued = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            self.reset()
+            return self
+        with np.load(self.path) as state:
+            if state['theta'].shape != (self.horizon, N_FEATURES):
+                self.reset()
+                return self
+            self.theta, self.P, self.n = state['theta'], state['P'], state['n']
+            self.pending = {pd.Timestamp(t): (phi, open_)
+                            for t, phi, open_ in zip(state['pending_times'], state['pending_phi'], state['pending_open'])}
+            last = state['last_issued'] if 'last_issued' in state.files else np.array([], dtype='datetime64[ns]')
+            self.last_issued = pd.Timestamp(last[0]) if len(last) else None
+        return self
+
+    def save(self):
+        times = list(self.pending)
+        tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, theta=self.theta, P=self.P, n=self.n,
+                 pending_times=np.array([t.value for t in times], dtype=np.int64).view('datetime64[ns]'),
+                 pending_phi=np.array([self.pending[t][0] for t in times]).reshape(-1, self.horizon, N_FEATURES),
+                 pending_open=np.array([self.pending[t][1] for t in times], dtype=bool).reshape(-1, self.horizon),
+                 last_issued=np.array([] if self.last_issued is None else [self.last_issued.value],
+                                      dtype=np.int64).view('datetime64[ns]'))
+        os.replace(tmp, self.path)
+
+    def _update(self, h, phi, residual):
+        """One RLS step for horizon ``h``: O(N_FEATURES ** 2)"""
+        P = self.P[h]
+        Pphi = P @ phi
+        gain = Pphi / (self.forgetting + phi @ Pphi)
+        self.theta[h] += gain * (residual - phi @ self.theta[h])
+        self.P[h] = (P - np.outer(gain, Pphi)) / self.forgetting
+        self.n[h] += 1
+
+    def observe(self, times, load):
+        """Updates every open (forecast, horizon) pair whose target is in ``times``
+
+        Returns
+        -------
+        int
+            Number of RLS updates made
+        """
+        actual = dict(zip(pd.DatetimeIndex(times), (np.asarray(load, dtype=float) - SCALER_MEAN[0]) / SCALER_STD[0]))
+        if not actual:
+            return 0
+        oldest = min(actual)
+        updates = 0
+        for issued in list(self.pending):
+            phi, open_ = self.pending[issued]
+            for h in np.flatnonzero(open_):
+                target = actual.get(issued + (h + 1) * INTERVAL)
+                if target is not None:
+                    # Residual of the raw forecast in standardized load units
+                    self._update(h, phi[h], target - phi[h, 1])
+                    open_[h] = False
+                    updates += 1
+            # Targets that fell out of the window without being seen are given up
+            if not open_.any() or issued + self.horizon * INTERVAL < oldest:
+                del self.pending[issued]
+        return updates
+
+    def correct(self, inputs, raw):
+        """Corrected forecast in MW and its regressors"""
+        raw = np.asarray(raw, dtype=float).reshape(-1)
+        phi = features(inputs, raw)
+        adjustment = np.einsum('hf,hf->h', phi, self.theta) * SCALER_STD[0]
+        adjustment[self.n < self.min_updates] = 0
+        return raw + adjustment, phi
+
+    def step(self, issued_at, times, load, inputs, raw):
+        """Learns from the latest actuals, then corrects and registers ``raw``
+
+        Parameters
+        ----------
+        issued_at: datetime
+            Time of the latest actual the forecast was made from
+        times, load:
+            Recent NYISO actuals (MW)
+        inputs: np.ndarray
+            The (8, 18) window the forecast was made from
+        raw: np.ndarray
+            Uncorrected forecast in MW
+
+        Returns
+        -------
+        np.ndarray
+            Corrected forecast in MW
+        """
+        issued_at = pd.Timestamp(issued_at)
+        with ci.single_flight.file_lock("correction"):
+            self.load()
+            if self.last_issued is not None and issued_at <= self.last_issued:
+                # Already learned from (by this or another process): correct only
+                corrected, _ = self.correct(inputs, raw)
+                return corrected.reshape(np.shape(raw))
+            self.observe(times, load)
+            corrected, phi = self.correct(inputs, raw)
+            self.pending[issued_at] = (phi, np.ones(self.horizon, dtype=bool))
+            self.last_issued = issued_at
+            self.save()
+        return corrected.reshape(np.shape(raw))
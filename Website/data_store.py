@@ -0,0 +1,127 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+STORE_DIR = "./pages/history"
+# Backfilled years live in their own store so The Data page, which is built
+# from data.csv, never changes underneath it
+BACKFILL_STORE_DIR = "./history_backfill"
+
+FLOAT_COLUMNS = ['Load', 'DNI', 'HourlyDryBulbTemperature']
+CALENDAR_COLUMNS = ['day', 'hour', 'minute', 'day of week']
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('year', pa.int16()), ('month', pa.int8())]), flavor='hive')
+
+def downcast(df):
+    """Derives the calendar fields from ``Timestamp`` and downcasts the frame
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Historical 5 minute data with at least a ``Timestamp`` column
+
+    Returns
+    -------
+    pd.DataFrame
+        float32 load/DNI/temperature, int8 calendar fields and int16/int8
+        ``year``/``month`` partition keys
+    """
+    df = df.copy()
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+    ts = df['Timestamp'].dt
+    df['year'] = ts.year.astype(np.int16)
+    df['month'] = ts.month.astype(np.int8)
+    df['day'] = ts.day.astype(np.int8)
+    df['hour'] = ts.hour.astype(np.int8)
+    df['minute'] = ts.minute.astype(np.int8)
+    df['day of week'] = ts.dayofweek.astype(np.int8)
+    for c in FLOAT_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].astype(np.float32)
+    keep = ['Timestamp'] + [c for c in FLOAT_COLUMNS if c in df.columns] + CALENDAR_COLUMNS + ['year', 'month']
+    return df[keep].sort_values('Timestamp').reset_index(drop=True)
+
+def write_partitions(df, store_dir=STORE_DIR):
+    """Writes ``df`` into the store, replacing the year/month partitions it covers
+
+    Rewriting whole partitions makes repeated writes of the same months
+    idempotent.
+    """
+    df = downcast(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(table, store_dir, format='parquet',
+                     partitioning=PARTITIONING,
+                     basename_template='part-{i}.parquet',
+                     existing_data_behavior='delete_matching')
+    return df
+
+def build_store(csv_path, store_dir=STORE_DIR):
+    """Converts a historical CSV (Timestamp, Load, DNI, HourlyDryBulbTemperature) to the store"""
+    return write_partitions(pd.read_csv(csv_path), store_dir)
+
+def _month_filter(start, end):
+    """Partition expression selecting the year/month directories between start and end"""
+    months = pd.period_range(start.to_period('M'), end.to_period('M'), freq='M')
+    expr = None
+    for p in months:
+        e = (ds.field('year') == p.year) & (ds.field('month') == p.month)
+        expr = e if expr is None else expr | e
+    return expr
+
+def load_history(store_dir=STORE_DIR, start=None, end=None, columns=None):
+    """Loads historical data from the store
+
+    Only the partitions overlapping ``[start, end)`` are opened, and within
+    them only the requested columns are read, so loading a month for a
+    chart touches a single file.
+
+    Parameters
+    ----------
+    store_dir: str
+        Root directory of the partitioned Parquet store
+    start, end: str or datetime, optional
+        Half-open time range to load; open-ended when omitted
+    columns: list of str, optional
+        Columns to project; ``Timestamp`` is always included
+
+    Returns
+    -------
+    pd.DataFrame
+        Rows sorted by ``Timestamp``
+    """
+    dataset = ds.dataset(store_dir, format='parquet', partitioning=PARTITIONING)
+
+    expr = None
+    if start is not None:
+        start = pd.Timestamp(start)
+        expr = ds.field('Timestamp') >= pa.scalar(start.to_datetime64(), pa.timestamp('ns'))
+    if end is not None:
+        end = pd.Timestamp(end)
+        e = ds.field('Timestamp') < pa.scalar(end.to_datetime64(), pa.timestamp('ns'))
+        expr = e if expr is None else expr & e
+    if start is not None and end is not None:
+        expr = expr & _month_filter(start, end - pd.Timedelta(1))
+
+    if columns is not None:
+        columns = ['Timestamp'] + [c for c in columns if c != 'Timestamp']
+
+    df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    return df.sort_values('Timestamp').reset_index(drop=True)
+
+def ensure_store(csv_path, store_dir=STORE_DIR):
+    """Builds the store from ``csv_path`` the first time it is needed
+
+    An existing directory without any partitions (e.g. left by an
+    interrupted build) is rebuilt too.
+    """
+    if not glob.glob(os.path.join(store_dir, '**', '*.parquet'), recursive=True):
+        build_store(csv_path, store_dir)
+    return store_dir
+
+if __name__ == "__main__":
+    import sys
+    build_store(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else STORE_DIR)
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# Default width of a full-page chart; Streamlit does not report the
+# rendered container width to the server
+CHART_WIDTH_PX = 1200
+
+def point_budget(width_px=CHART_WIDTH_PX, points_per_px=1):
+    """Number of points worth sending for a chart ``width_px`` pixels wide"""
+    return max(3, int(width_px * points_per_px))
+
+def _as_float(x):
+    x = np.asarray(x)
+    # tz-aware timestamps come out of pandas as an object array
+    if np.issubdtype(x.dtype, np.datetime64) or (x.dtype == object and len(x) and isinstance(x[0], datetime)):
+        return pd.to_datetime(x, utc=True).asi8.astype(float)
+    return x.astype(float)
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets indices of the points to keep
+
+    Parameters
+    ----------
+    x, y: array-like
+        Series sorted by ``x``; datetimes are supported for ``x``
+    n_out: int
+        Number of points to keep, including the first and last
+
+    Returns
+    -------
+    np.ndarray
+        Sorted integer indices into ``x``/``y``
+    """
+    x = _as_float(x); y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Interior points split into n_out - 2 buckets; averages of every bucket
+    # are computed up front so each step only scans its own bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes
+    avg_x = np.append(avg_x, x[-1]); avg_y = np.append(avg_y, y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0; out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area between the last kept point, each candidate
+        # and the average of the next bucket
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def minmax(y, n_out):
+    """Indices of the min and max of each of ``n_out // 2`` equal buckets"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_buckets < 1 or n <= n_out:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    # Extrema per bucket, then the first position in each bucket attaining them
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    lo = np.minimum.reduceat(y, starts)
+    hi = np.maximum.reduceat(y, starts)
+    is_lo = y == lo[bucket]
+    is_hi = y == hi[bucket]
+    first_lo = np.unique(bucket[is_lo], return_index=True)[1]
+    first_hi = np.unique(bucket[is_hi], return_index=True)[1]
+    return np.unique(np.concatenate([np.flatnonzero(is_lo)[first_lo], np.flatnonzero(is_hi)[first_hi]]))
+
+def _keep(frame, x, y, n_out, method):
+    """Indices to keep from a gap-free ``frame``"""
+    if len(frame) <= n_out:
+        return np.arange(len(frame))
+    if n_out < 3:
+        # Too short a share for the method; the endpoints still draw the span
+        return np.array([0, len(frame) - 1])
+    if method == 'lttb':
+        return lttb(frame[x].to_numpy(), frame[y].to_numpy(), n_out)
+    return minmax(frame[y].to_numpy(), n_out)
+
+def downsample(frame, x, y, width_px=CHART_WIDTH_PX, method='lttb'):
+    """Reduces ``frame`` to a point budget set by the chart width
+
+    Each run of rows with a value in ``y`` is downsampled on its own, with
+    a share of the budget proportional to its length, and the first missing
+    row of every gap is kept so the chart still breaks the line there.
+    Other columns (e.g. a color flag) are carried along with the kept rows.
+
+    Parameters
+    ----------
+    frame: pd.DataFrame
+        Data sorted by ``x``
+    x, y: str
+        Column names of the time axis and the plotted value
+    width_px: int
+        Chart width in pixels
+    method: str
+        ``'lttb'`` or ``'minmax'``
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    if method not in ('lttb', 'minmax'):
+        raise ValueError(f"Unknown downsampling method: {method}")
+    valid = frame[y].notna().to_numpy()
+    n_out = point_budget(width_px)
+    # Start and end of every run of valid rows
+    edges = np.flatnonzero(np.diff(np.r_[0, valid.astype(np.int8), 0]))
+    starts, ends = edges[::2], edges[1::2]
+    n_valid = max(1, int(valid.sum()))
+
+    keep = []
+    for start, end in zip(starts, ends):
+        share = int(round(n_out * (end - start) / n_valid))
+        keep.append(start + _keep(frame.iloc[start:end], x, y, share, method))
+        if end < len(frame):
+            keep.append([end])
+    if not keep:
+        return frame.iloc[:0].reset_index(drop=True)
+    # Missing rows before the first or after the last value draw nothing
+    idx = np.concatenate(keep).astype(np.int64)
+    idx = idx[(idx >= starts[0]) & (idx < ends[-1])]
+    return frame.iloc[idx].reset_index(drop=True)
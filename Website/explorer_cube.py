@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Bin layout matching the sliders on The Data page. Temperature has a bin
+# for each whole degree and one for the open interval above it, so an
+# inclusive [lo, hi] selection is exact for fractional readings. DNI bins
+# are right-closed, (j - 1) * DNI_BIN < DNI <= j * DNI_BIN, so "DNI <= s" is
+# exact when the slider moves in DNI_BIN steps.
+TEMP_MIN, TEMP_MAX = 0, 100
+DNI_MAX, DNI_BIN = 1000, 25
+
+N_HOURS = 24
+N_TEMP = 2 * (TEMP_MAX - TEMP_MIN) + 1
+N_DNI = DNI_MAX // DNI_BIN + 1
+
+def temp_bin(temp):
+    """``2k`` for a reading of exactly ``TEMP_MIN + k`` °F, ``2k + 1`` strictly between it and the next"""
+    offset = np.asarray(temp, dtype=float) - TEMP_MIN
+    whole = np.floor(offset)
+    return 2 * whole + (offset != whole)
+
+def dni_bin(dni):
+    """Right-closed DNI bin; zero and negative readings share bin 0"""
+    return np.maximum(np.ceil(np.asarray(dni, dtype=float) / DNI_BIN), 0)
+
+def build_cube(df):
+    """Bins the 5 minute history into an (hour x temperature x DNI) cube
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        History with ``hour``, ``HourlyDryBulbTemperature``, ``DNI`` and ``Load``
+
+    Returns
+    -------
+    dict of str to np.ndarray
+        ``count``, ``load_sum``, ``temp_sum`` and ``dni_sum``, each of shape
+        (24, N_TEMP, N_DNI) and cumulative along the DNI axis, so cell
+        ``[h, t, j]`` aggregates every row with DNI in bins ``0..j``
+    """
+    hour = df['hour'].to_numpy(dtype=np.int64)
+    temp_f = df['HourlyDryBulbTemperature'].to_numpy(dtype=float)
+    dni_f = df['DNI'].to_numpy(dtype=float)
+    temp = temp_bin(temp_f)
+    dni = dni_bin(dni_f)
+    load = df['Load'].to_numpy(dtype=float)
+
+    # Rows outside the slider domains can never be selected
+    keep = (temp >= 0) & (temp < N_TEMP) & (dni < N_DNI) & ~np.isnan(load)
+    flat = np.ravel_multi_index(
+        (hour[keep], temp[keep].astype(np.int64), dni[keep].astype(np.int64)),
+        (N_HOURS, N_TEMP, N_DNI))
+
+    shape = (N_HOURS, N_TEMP, N_DNI)
+    size = N_HOURS * N_TEMP * N_DNI
+    sums = lambda w: np.cumsum(np.bincount(flat, weights=w[keep], minlength=size).reshape(shape), axis=2)
+    count = np.bincount(flat, minlength=size).reshape(shape)
+
+    return {
+        'count': np.cumsum(count, axis=2).astype(np.int32),
+        'load_sum': sums(load),
+        'temp_sum': sums(temp_f),
+        'dni_sum': sums(dni_f),
+    }
+
+def query_cube(cube, temp_range, max_dni):
+    """Average load per hour and temperature bin for a slider selection
+
+    Runs in O(24 x temperature bins) independent of the history length and
+    returns at most that many points. Selects exactly the rows with
+    ``temp_range[0] <= temperature <= temp_range[1]`` and ``DNI <= max_dni``
+    for whole-degree bounds and ``max_dni`` a multiple of ``DNI_BIN``; other
+    values of ``max_dni`` are rounded down to one.
+
+    Parameters
+    ----------
+    cube: dict
+        Output of ``build_cube``
+    temp_range: tuple of (int, int)
+        Inclusive temperature range in °F
+    max_dni: float
+        Maximum solar irradiance
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns ``hour``, ``HourlyDryBulbTemperature``, ``DNI`` and ``Load``
+        (means) for every non-empty cell
+    """
+    lo = int(np.clip(2 * (np.ceil(temp_range[0]) - TEMP_MIN), 0, N_TEMP - 1))
+    hi = int(np.clip(2 * (np.floor(temp_range[1]) - TEMP_MIN), 0, N_TEMP - 1))
+    j = int(np.clip(max_dni // DNI_BIN, 0, N_DNI - 1))
+
+    count = cube['count'][:, lo:hi + 1, j]
+    hours, temps = np.nonzero(count)
+    n = count[hours, temps]
+    mean = lambda k: cube[k][:, lo:hi + 1, j][hours, temps] / n
+    return pd.DataFrame({
+        'hour': hours,
+        'HourlyDryBulbTemperature': mean('temp_sum'),
+        'DNI': mean('dni_sum'),
+        'Load': mean('load_sum'),
+    })
+
+def save_cube(cube, path):
+    np.savez(path, **cube)
+
+def load_cube(path):
+    with np.load(path) as f:
+        return {k: f[k] for k in f.files}
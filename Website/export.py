@@ -0,0 +1,133 @@
+import io
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from forecast_log import FORECAST_LOG_DIR
+
+EXPORT_PORT = 8502
+BATCH_ROWS = 64 * 1024
+
+CONTENT_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+def _scanner(start, end, log_dir=FORECAST_LOG_DIR, batch_rows=BATCH_ROWS):
+    """Scanner over forecasts issued in ``[start, end)``, pruned by date partition"""
+    start = pd.Timestamp(start); end = pd.Timestamp(end)
+    dataset = ds.dataset(log_dir, format='parquet',
+                         partitioning=ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive'))
+    expr = ((ds.field('date') >= f"{start:%Y-%m-%d}") & (ds.field('date') <= f"{end:%Y-%m-%d}")
+            & (ds.field('issued_at') >= pa.scalar(start.to_datetime64(), pa.timestamp('ns')))
+            & (ds.field('issued_at') < pa.scalar(end.to_datetime64(), pa.timestamp('ns'))))
+    columns = [f for f in dataset.schema.names if f != 'date']
+    return dataset.scanner(columns=columns, filter=expr, batch_size=batch_rows)
+
+class _Sink(io.RawIOBase):
+    """Write-only file object whose buffered bytes are drained by the caller"""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_export(start, end, fmt='csv', log_dir=FORECAST_LOG_DIR, batch_rows=BATCH_ROWS):
+    """Yields the logged forecasts and their inputs as CSV or Parquet bytes
+
+    Record batches are read and encoded one at a time, so memory use is
+    bounded by ``batch_rows`` whatever the length of the range.
+
+    Parameters
+    ----------
+    start, end: str or datetime
+        Half-open range of forecast issue times
+    fmt: str
+        ``'csv'`` or ``'parquet'``
+    """
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    scanner = _scanner(start, end, log_dir, batch_rows)
+    sink = _Sink()
+
+    if fmt == 'csv':
+        header = True
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+            pacsv.write_csv(pa.Table.from_batches([batch]), sink,
+                            pacsv.WriteOptions(include_header=header))
+            header = False
+            yield sink.drain()
+        if header:
+            yield (','.join(scanner.projected_schema.names) + '\n').encode()
+        return
+
+    with pq.ParquetWriter(sink, scanner.projected_schema) as writer:
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                writer.write_batch(batch)
+                yield sink.drain()
+    yield sink.drain()
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """``GET /export?start=...&end=...&format=csv|parquet`` with chunked transfer"""
+
+    protocol_version = 'HTTP/1.1'
+    log_dir = FORECAST_LOG_DIR
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/export':
+            self.send_error(404)
+            return
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        fmt = q.get('format', 'csv')
+        try:
+            chunks = iter_export(q['start'], q['end'], fmt, self.log_dir)
+            first = next(chunks, b'')
+        except KeyError as e:
+            self.send_error(400, f"Missing parameter {e}")
+            return
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        except FileNotFoundError:
+            self.send_error(404, "No forecasts have been logged")
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES[fmt])
+        self.send_header('Content-Disposition', f'attachment; filename="forecasts.{fmt}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in _chain(first, chunks):
+            if chunk:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        self.wfile.write(b'0\r\n\r\n')
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+def serve(port=EXPORT_PORT):
+    ThreadingHTTPServer(('', port), ExportHandler).serve_forever()
+
+if __name__ == "__main__":
+    import sys
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else EXPORT_PORT)
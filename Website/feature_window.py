@@ -0,0 +1,235 @@
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import collect_inputs as ci
+from http_client import UpstreamError
+from collect_inputs import (return_NYISO_Load, return_NYISO_zone_matrix, weather_dict, load_solar_series,
+                            solar_window, datetime_flags, SOLAR_PROFILE, SOLAR_PROFILE_F,
+                            FEATURE_ORDER, NYISO_ZONES, NYISO_ZONE_LETTERS)
+
+INTERVAL = pd.Timedelta(minutes=5)
+HORIZON = pd.Timedelta(minutes=90)
+# Gaps between NWS hours up to this long are interpolated; longer ones stay missing
+MAX_TEMPERATURE_GAP = pd.Timedelta(hours=2)
+# How far from a known temperature a 5 minute column may be and still use it
+TEMPERATURE_TOLERANCE = pd.Timedelta(hours=1)
+
+logger = logging.getLogger(__name__)
+
+# 5 minute NWS temperature per zone letter, shared by every window in the
+# process: zone letter -> (hour fetched, series). Each zone has its own lock
+# so a slow NWS request for one zone does not hold up the others;
+# ``_temperature_lock`` only guards creating those locks.
+_temperature = {}
+_temperature_lock = threading.Lock()
+_zone_locks = {}
+
+def _zone_lock(zone):
+    with _temperature_lock:
+        return _zone_locks.setdefault(zone, threading.Lock())
+
+def zone_temperature_series(zone='J', through=None):
+    """Hourly NWS temperature for a zone letter on a 5 minute grid
+
+    Fetched at most once per hour (or when ``through`` runs past the cached
+    forecast), however many windows read it, so the headline forecast and
+    the N.Y.C. zone share one pair of NWS requests. Only gaps up to
+    ``MAX_TEMPERATURE_GAP`` are interpolated; the series has no values
+    inside longer ones or past either end.
+    """
+    hour = pd.Timestamp(ci.clock()).floor('H')
+    with _zone_lock(zone):
+        cached = _temperature.get(zone)
+        if cached is None or cached[0] != hour or (through is not None and through > cached[1].index[-1]):
+            temp_dict = weather_dict(zone)
+            index = [pd.to_datetime(k, format='%m-%d-%Y HB%H') for k in temp_dict]
+            series = pd.Series(list(temp_dict.values()), index=index, dtype=float).sort_index()
+            series = series[~series.index.duplicated(keep='last')].asfreq('5T')
+            # Interpolate whole gaps only: a gap longer than the limit is left
+            # empty rather than partly filled from one side
+            gap = series.isna()
+            gap_length = gap.groupby((~gap).cumsum()).transform('sum')
+            series = series.interpolate(limit_area='inside')[~gap | (gap_length < MAX_TEMPERATURE_GAP / INTERVAL)].dropna()
+            cached = _temperature[zone] = (hour, series)
+        return cached[1]
+
+class FeatureWindow():
+    """Fixed-size ring buffer over the model's input rows
+
+    The buffer is time-major and every column is written twice, at ``head``
+    and ``head + length``, so the last ``length`` columns are always the
+    contiguous block ``buf[head:head + length]`` and no wrap-around copy is
+    needed.
+
+    Parameters
+    ----------
+    length: int
+        Number of 5 minute columns in the window
+    n_rows: int
+        Number of input rows, one per entry of ``FEATURE_ORDER``
+    """
+
+    def __init__(self, length=18, n_rows=len(FEATURE_ORDER)):
+        self.length = length
+        self._buf = np.zeros((2 * length, n_rows))
+        self._head = 0
+        self._count = 0
+        self.last_time = None
+
+    @property
+    def full(self):
+        return self._count >= self.length
+
+    def push(self, t, column):
+        """Appends one column for timestamp ``t``, evicting the oldest"""
+        self._buf[self._head] = column
+        self._buf[self._head + self.length] = column
+        self._head = (self._head + 1) % self.length
+        self._count += 1
+        self.last_time = pd.Timestamp(t)
+
+    def reset(self):
+        self._head = 0
+        self._count = 0
+        self.last_time = None
+
+    def view(self):
+        """Read-only contiguous ``(n_rows, length)`` view, oldest column first"""
+        window = self._buf[self._head:self._head + self.length].T
+        window.flags.writeable = False
+        return window
+
+class LiveFeatures():
+    """Keeps a ``FeatureWindow`` in step with the NYISO real-time intervals
+
+    The first call (or one after a gap) builds all columns at once, as
+    ``format_inputs`` does. After that each interval only computes the new
+    column: the latest load, temperature and DNI now and 90 minutes ahead,
+    and the time flags for one timestamp. The hourly NWS forecast is
+    regridded once per hour rather than on every refresh.
+
+    Parameters
+    ----------
+    length: int
+        Number of 5 minute columns in the window
+    horizon: pd.Timedelta
+        Offset of the future DNI and temperature rows
+    zone: str
+        NWS zone letter for the temperature rows
+    """
+
+    def __init__(self, length=18, horizon=HORIZON, zone='J'):
+        self.window = FeatureWindow(length)
+        self.horizon = horizon
+        self.zone = zone
+
+    def update(self, t=None, load=None):
+        """Advances the window to the latest published interval
+
+        Parameters
+        ----------
+        t, load: np.ndarray, optional
+            Recent timestamps and loads; the N.Y.C. series from NYISO by default
+
+        Returns
+        -------
+        np.ndarray
+            Read-only ``(8, length)`` view of the current inputs
+        """
+        if t is None:
+            t, load = return_NYISO_Load()
+        load = np.asarray(load, dtype=float)
+        times = pd.DatetimeIndex(t)
+        last = self.window.last_time
+        if last is None or not self.window.full or times[-1] - last > INTERVAL * self.window.length:
+            self._seed(times, load)
+        else:
+            new = times > last
+            if new.any():
+                self._append(times[new], load[new])
+        return self.window.view()
+
+    def _seed(self, times, load):
+        columns = self._columns(times, load)
+        solar = solar_window(times)
+        solar_f = solar_window(times + self.horizon)
+        columns[1] = SOLAR_PROFILE[-len(times):] if solar is None else solar
+        columns[3] = SOLAR_PROFILE_F[-len(times):] if solar_f is None else solar_f
+        self.window.reset()
+        for i, ts in enumerate(times):
+            self.window.push(ts, columns[:, i])
+
+    def _append(self, times, load):
+        columns = self._columns(times, load, carry=self.window.view()[:, -1])
+        # Carry DNI forward where the solar cache has no value
+        for row, offset in ((1, pd.Timedelta(0)), (3, self.horizon)):
+            dni = self._dni(times + offset)
+            columns[row] = np.where(np.isnan(dni), self.window.view()[row, -1], dni)
+        for i, ts in enumerate(times):
+            self.window.push(ts, columns[:, i])
+
+    def _columns(self, times, load, carry=None):
+        columns = np.zeros((len(FEATURE_ORDER), len(times)))
+        columns[0] = load
+        for row, offset in ((2, pd.Timedelta(0)), (4, self.horizon)):
+            columns[row] = self._temperature(times + offset, None if carry is None else carry[row])
+        columns[5:8] = datetime_flags(times)
+        return columns
+
+    def _dni(self, times):
+        series = load_solar_series()
+        return series.reindex(times).to_numpy(dtype=float)
+
+    def _temperature(self, times, carry=None):
+        """Temperature at ``times`` from NWS values within ``TEMPERATURE_TOLERANCE``
+
+        Columns with no NWS value that close take the previous column's
+        temperature (``carry`` for the first one) or, at the start of a seed,
+        the next known one, and a warning is logged. With no value at all
+        the update fails rather than invent a temperature.
+        """
+        temp = zone_temperature_series(self.zone, through=times[-1])
+        values = temp.reindex(times, method='nearest', tolerance=TEMPERATURE_TOLERANCE).to_numpy(dtype=float)
+        missing = np.isnan(values)
+        if not missing.any():
+            return values
+        if missing.all() and carry is None:
+            raise UpstreamError(f"No NWS temperature for zone {self.zone} within "
+                                f"{TEMPERATURE_TOLERANCE} of {times[0]} - {times[-1]}")
+        logger.warning("No NWS temperature for zone %s within %s of %d of %d intervals ending %s; "
+                       "carrying the nearest value", self.zone, TEMPERATURE_TOLERANCE,
+                       missing.sum(), len(times), times[-1])
+        head = np.nan if carry is None else carry
+        return pd.Series(np.r_[head, values]).ffill().bfill().to_numpy()[1:]
+
+class ZoneFeatures():
+    """One ``LiveFeatures`` window per NYISO zone, fed from a single pal.csv read
+
+    Each refresh pushes only the new intervals into every zone's window, and
+    zone temperatures come from the hourly shared cache, so the NWS is asked
+    at most once per zone per hour rather than twice per zone per refresh.
+
+    Parameters
+    ----------
+    zones: list of str
+        NYISO zone names, in ``NYISO_ZONES`` spelling
+    length: int
+        Number of 5 minute columns in each window
+    """
+
+    def __init__(self, zones=NYISO_ZONES, length=18):
+        self.zones = list(zones)
+        self.features = [LiveFeatures(length, zone=NYISO_ZONE_LETTERS[z]) for z in self.zones]
+
+    def update(self):
+        """Advances every zone window
+
+        Returns
+        -------
+        np.ndarray, np.ndarray
+            Timestamps ``(length,)`` and the ``(zones, 8, length)`` batch
+        """
+        t, loads = return_NYISO_zone_matrix()
+        batch = np.stack([f.update(t, loads[NYISO_ZONES.index(z)]) for z, f in zip(self.zones, self.features)])
+        return np.array(t), batch
@@ -0,0 +1,104 @@
+import os
+import pickle
+import logging
+import threading
+from datetime import datetime, timedelta
+
+CACHE_PATH = "forecast_cache.pkl"
+
+# NYISO publishes a real-time load value every 5 minutes; the file is
+# typically updated within a minute of the interval boundary
+PUBLISH_INTERVAL = timedelta(minutes=5)
+PUBLISH_LAG = timedelta(minutes=1)
+
+logger = logging.getLogger(__name__)
+
+def current_bucket(now=None):
+    """Start of the latest NYISO interval whose data should be published"""
+    now = (now or datetime.now()) - PUBLISH_LAG
+    return now - timedelta(minutes=now.minute % 5, seconds=now.second, microseconds=now.microsecond)
+
+class ForecastCache():
+    """Stale-while-revalidate cache for the dashboard forecast
+
+    Entries expire on NYISO publication boundaries. An expired entry is
+    still returned immediately while a single background thread computes
+    its replacement; only a process with nothing on disk blocks.
+
+    Parameters
+    ----------
+    compute: callable
+        Returns a dict (e.g. ``inputs`` and ``prediction``) for the current interval
+    path: str
+        Pickle file holding the last good entry across restarts
+    """
+
+    def __init__(self, compute, path=None):
+        self.compute = compute
+        self.path = path or CACHE_PATH
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._entry = self._load()
+
+    def get(self, now=None):
+        """Returns the newest entry, refreshing in the background if it is stale
+
+        Returns
+        -------
+        dict
+            The computed fields plus ``bucket`` and ``computed_at``
+        """
+        bucket = current_bucket(now)
+        entry = self._entry
+        if entry is None:
+            with self._lock:
+                if self._entry is None:
+                    self._refresh(bucket)
+            return self._entry
+        if entry["bucket"] < bucket:
+            self.refresh_async(bucket)
+        return entry
+
+    @property
+    def refreshing(self):
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+
+    def refresh_async(self, bucket=None):
+        """Starts a background refresh unless one is already running"""
+        bucket = bucket or current_bucket()
+        with self._lock:
+            if self.refreshing:
+                return
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_safe, args=(bucket,), daemon=True)
+            self._refresh_thread.start()
+
+    def _refresh_safe(self, bucket):
+        try:
+            self._refresh(bucket)
+        except Exception:
+            # Keep serving the last good entry; the next request retries
+            logger.exception("Forecast refresh failed")
+
+    def _refresh(self, bucket):
+        entry = dict(self.compute())
+        entry["bucket"] = bucket
+        entry["computed_at"] = datetime.now()
+        self._entry = entry
+        self._save(entry)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            logger.exception("Ignoring unreadable forecast cache %s", self.path)
+            return None
+
+    def _save(self, entry):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+FORECAST_LOG_DIR = "forecast_log"
+
+def forecast_frame(issued_at, inputs, prediction):
+    """One row per forecast horizon with the weather inputs it was made from
+
+    Parameters
+    ----------
+    issued_at: datetime
+        Timestamp of the latest NYISO load value in the input window
+    inputs: np.ndarray
+        (8, 18) ``format_inputs`` output
+    prediction: np.ndarray
+        Forecast load, 18 values (any leading batch axis is dropped)
+    """
+    prediction = np.asarray(prediction, dtype=np.float32).reshape(-1)
+    horizon = np.arange(1, len(prediction) + 1) * 5
+    return pd.DataFrame({
+        'issued_at': pd.Timestamp(issued_at),
+        'target_time': pd.Timestamp(issued_at) + pd.to_timedelta(horizon, unit='m'),
+        'horizon_min': horizon.astype(np.int16),
+        'forecast_load': prediction,
+        'last_load': np.float32(inputs[0][-1]),
+        'temperature': np.asarray(inputs[4], dtype=np.float32),
+        'dni': np.asarray(inputs[3], dtype=np.float32),
+    })
+
+def append_forecast(issued_at, inputs, prediction, log_dir=FORECAST_LOG_DIR):
+    """Writes one forecast to ``<log_dir>/date=YYYY-MM-DD/<issued>.parquet``
+
+    Files are named by issue time, so logging the same forecast twice
+    overwrites rather than duplicates it.
+    """
+    issued_at = pd.Timestamp(issued_at)
+    day_dir = os.path.join(log_dir, f"date={issued_at:%Y-%m-%d}")
+    os.makedirs(day_dir, exist_ok=True)
+    path = os.path.join(day_dir, f"{issued_at:%Y%m%dT%H%M}.parquet")
+    # Dot-prefixed so dataset scans never pick up a partially written file
+    tmp = os.path.join(day_dir, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    forecast_frame(issued_at, inputs, prediction).to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
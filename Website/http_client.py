@@ -0,0 +1,188 @@
+import os
+import time
+import pickle
+import random
+import logging
+import threading
+from urllib.parse import urlparse
+import requests
+
+LAST_GOOD_DIR = "last_good"
+
+logger = logging.getLogger(__name__)
+
+class UpstreamError(Exception):
+    """An upstream source could not provide a usable response"""
+
+class CircuitOpenError(UpstreamError):
+    """The circuit breaker for a host is open and the request was not sent"""
+
+class CircuitBreaker():
+    """Per-host circuit breaker
+
+    After ``failure_threshold`` consecutive failed requests the circuit
+    opens and calls fail immediately for ``reset_timeout`` seconds. The
+    first call after that is let through as a trial (half-open); its
+    outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self):
+        """Ends a half-open trial without counting it either way"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+class HttpClient():
+    """Shared HTTP client with timeouts, jittered retries and circuit breakers
+
+    Parameters
+    ----------
+    timeout: tuple of (float, float)
+        Connect and read timeouts in seconds
+    retries: int
+        Retries after the first attempt for connection errors, timeouts,
+        429 and 5xx responses. Only these count as circuit breaker failures;
+        other 4xx responses raise at once and leave the breaker as it was
+    backoff: float
+        Base delay in seconds; attempt ``n`` sleeps uniformly in
+        ``[0, min(max_backoff, backoff * 2**n)]``
+    deadline: float
+        Upper bound in seconds on one call, retries included; each attempt's
+        timeouts are capped at the time left
+    transport: callable, optional
+        Replaces ``session.get``, e.g. to record or replay upstream snapshots
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, timeout=(3.05, 10), retries=2, backoff=0.5, max_backoff=4.0,
+                 deadline=20.0, failure_threshold=3, reset_timeout=60.0, transport=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()
+        self.transport = transport or self.session.get
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def get(self, url, **kwargs):
+        """GET ``url`` and return the response, raising ``UpstreamError`` on failure"""
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}")
+
+        start = time.monotonic()
+        error = None
+        for attempt in range(self.retries + 1):
+            left = self.deadline - (time.monotonic() - start)
+            if left <= 0:
+                error = error or UpstreamError(f"{url} exceeded the {self.deadline}s deadline")
+                break
+            timeout = tuple(min(t, left) for t in self.timeout)
+            try:
+                response = self.transport(url, timeout=timeout, **kwargs)
+                if response.ok:
+                    breaker.record_success()
+                    return response
+                error = UpstreamError(f"{url} returned HTTP {response.status_code}")
+                if response.status_code not in self.RETRY_STATUS:
+                    if response.status_code < 500:
+                        # The host answered; a client error says nothing about its health
+                        breaker.release()
+                        raise error
+                    break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = UpstreamError(f"{url} failed: {e}")
+
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if attempt == self.retries or time.monotonic() - start + delay > self.deadline:
+                break
+            time.sleep(delay)
+
+        breaker.record_failure()
+        raise error
+
+    def get_json(self, url, **kwargs):
+        """GET ``url`` and decode its JSON body; a malformed body raises ``UpstreamError``"""
+        return json_body(self.get(url, **kwargs))
+
+def json_body(response):
+    """``response.json()`` with decode failures reported as ``UpstreamError``"""
+    try:
+        return response.json()
+    except ValueError as e:
+        raise UpstreamError(f"{getattr(response, 'url', 'response')} returned malformed JSON: {e}") from e
+
+class LastGoodStore():
+    """Keeps the last successful result per source to serve while it is down"""
+
+    def __init__(self, path=LAST_GOOD_DIR):
+        self.path = path
+
+    def fetch(self, name, fn):
+        """Returns ``fn()`` and records it, or the last recorded value on ``UpstreamError``"""
+        file = os.path.join(self.path, f"{name}.pkl")
+        try:
+            result = fn()
+        except UpstreamError:
+            if not os.path.exists(file):
+                raise
+            logger.warning("Serving last good %s after upstream failure", name, exc_info=True)
+            with open(file, "rb") as f:
+                return pickle.load(f)
+
+        os.makedirs(self.path, exist_ok=True)
+        tmp = f"{file}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(result, f)
+        os.replace(tmp, file)
+        return result
@@ -0,0 +1,201 @@
+import os
+import glob
+import time
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
+from collect_inputs import tranform_data, make_prediction
+from model_bundle import read_manifest
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing falls back to within one process
+    fcntl = None
+
+# Bounds on the on-disk tier; checked every EVICT_EVERY writes
+MAX_DISK_ENTRIES = 4096
+MAX_DISK_AGE = 24 * 3600
+EVICT_EVERY = 64
+# Cross-process misses lock one of this many stripes rather than a file per key
+LOCK_STRIPES = 64
+
+def model_version(path):
+    """Content hash of a weights file, used to invalidate cached forecasts"""
+    if os.path.isdir(path):
+        return read_manifest(path)['model_version']
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+class InferenceCache():
+    """Memoizes forecasts by model version and the exact input window
+
+    Parameters
+    ----------
+    model: keras.Model
+        Model passed to ``make_prediction``
+    version: str
+        Identifies the weights; part of every key
+    maxsize: int
+        Number of forecasts kept in the in-memory LRU
+    disk_dir: str, optional
+        Directory for a second-level on-disk cache shared across processes,
+        bounded by ``max_disk_entries`` files no older than ``max_disk_age``
+        seconds, created on the first write
+
+    Forecasts are returned read-only, since the same array is handed to
+    every caller that hits its window.
+
+    Concurrent misses on the same window are coalesced: within a process
+    the other callers wait for the first, and across processes a file lock
+    makes the second find the first's result on disk, so the model never
+    runs twice for one window.
+    """
+
+    def __init__(self, model, version, maxsize=256, disk_dir=None,
+                 max_disk_entries=MAX_DISK_ENTRIES, max_disk_age=MAX_DISK_AGE):
+        self.model = model
+        self.version = version
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_age = max_disk_age
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    def key(self, input_list):
+        """SHA-256 of the model version, shape and float64 bytes of the window"""
+        x = np.ascontiguousarray(input_list, dtype=np.float64)
+        h = hashlib.sha256(self.version.encode())
+        h.update(str(x.shape).encode())
+        h.update(x.tobytes())
+        return h.hexdigest()
+
+    def predict(self, input_list):
+        """Forecast for one untransformed (8, 18) input window"""
+        k = self.key(input_list)
+        with self._lock:
+            if k in self._lru:
+                self._lru.move_to_end(k)
+                self.hits += 1
+                return self._lru[k]
+            event = self._inflight.get(k)
+            leader = event is None
+            if leader:
+                event = self._inflight[k] = threading.Event()
+
+        if not leader:
+            # Another thread is computing this window; share its result
+            event.wait()
+            with self._lock:
+                if k in self._lru:
+                    self.hits += 1
+                    return self._lru[k]
+            return self.predict(input_list)
+
+        try:
+            with self._key_lock(k):
+                prediction = self._load(k)
+                if prediction is None:
+                    start = time.perf_counter()
+                    prediction = make_prediction(np.array([tranform_data(input_list)]), self.model)
+                    with self._lock:
+                        self.misses += 1
+                        self.miss_seconds += time.perf_counter() - start
+                    prediction = np.asarray(prediction)
+                    prediction.flags.writeable = False
+                    self._save(k, prediction)
+                else:
+                    prediction.flags.writeable = False
+                    with self._lock:
+                        self.hits += 1
+
+            with self._lock:
+                self._lru[k] = prediction
+                self._lru.move_to_end(k)
+                while len(self._lru) > self.maxsize:
+                    self._lru.popitem(last=False)
+            return prediction
+        finally:
+            with self._lock:
+                del self._inflight[k]
+            event.set()
+
+    def stats(self):
+        """Hit rate and the model time saved by hits, estimated from the mean miss latency"""
+        with self._lock:
+            total = self.hits + self.misses
+            mean_miss = self.miss_seconds / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "mean_miss_seconds": mean_miss,
+                "saved_seconds": self.hits * mean_miss,
+                "size": len(self._lru),
+            }
+
+    def _path(self, k):
+        return os.path.join(self.disk_dir, f"{k}.npy")
+
+    @contextmanager
+    def _key_lock(self, k):
+        """Serializes misses on ``k`` across processes sharing ``disk_dir``"""
+        if self.disk_dir is None or fcntl is None:
+            yield
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        with open(os.path.join(self.disk_dir, f"stripe-{int(k[:8], 16) % LOCK_STRIPES}.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def evict(self, now=None):
+        """Drops disk entries older than ``max_disk_age``, then the oldest beyond ``max_disk_entries``"""
+        now = now or time.time()
+        entries = []
+        for path in glob.glob(os.path.join(self.disk_dir, "*.npy")):
+            try:
+                mtime = os.path.getmtime(path)
+                if now - mtime > self.max_disk_age:
+                    os.remove(path)
+                else:
+                    entries.append((mtime, path))
+            except OSError:
+                pass
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_disk_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _load(self, k):
+        if self.disk_dir is None or not os.path.exists(self._path(k)):
+            return None
+        return np.load(self._path(k))
+
+    def _save(self, k, prediction):
+        if self.disk_dir is None:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        tmp = f"{self._path(k)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, prediction)
+        os.replace(tmp, self._path(k))
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
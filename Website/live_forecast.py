@@ -0,0 +1,72 @@
+"""The live forecast step shared by the dashboard and the push service
+
+``Home.py`` and ``push.py`` both call ``LiveForecaster.compute``: advance
+the input window, run the served model through the inference cache, then
+correct and log the forecast. The last part changes shared state (the
+residual corrector and ``forecast_log/``), so it runs once per NYISO
+timestamp across every process; the others receive its result.
+"""
+import logging
+import pandas as pd
+import collect_inputs as ci
+import forecast_log
+from correction import ResidualCorrector
+from feature_window import LiveFeatures
+from forecast_log import append_forecast
+from inference_cache import InferenceCache, model_version
+from model_bundle import served_model_path
+
+INFERENCE_CACHE_DIR = "inference_cache"
+
+logger = logging.getLogger(__name__)
+
+class LiveForecaster():
+    """Inputs, model, correction and logging for the live 90 minute forecast
+
+    Parameters
+    ----------
+    model_path: str, optional
+        Bundle or weights to serve; defaults to ``served_model_path()``
+    log_dir: str, optional
+        Where forecasts are appended for export; ``FORECAST_LOG_DIR`` by default
+    """
+
+    def __init__(self, model_path=None, log_dir=None, corrector=None, inference_cache_dir=None):
+        self.model_path = model_path or served_model_path()
+        self.cache = InferenceCache(ci.import_model(self.model_path), model_version(self.model_path),
+                                    disk_dir=inference_cache_dir or INFERENCE_CACHE_DIR)
+        self.live = LiveFeatures()
+        self.corrector = corrector or ResidualCorrector()
+        self.log_dir = log_dir or forecast_log.FORECAST_LOG_DIR
+
+    @property
+    def model(self):
+        return self.cache.model
+
+    def compute(self):
+        """Forecast for the newest NYISO interval
+
+        Returns
+        -------
+        dict
+            ``issued_at`` (time of the latest load in the window), ``inputs``,
+            the model's ``raw`` forecast and the served ``prediction``
+        """
+        inputs = self.live.update().copy()
+        issued_at = self.live.window.last_time
+        raw = self.cache.predict(inputs)
+        prediction = ci.single_flight.do(f"forecast-{issued_at:%Y%m%dT%H%M}", self._finish, issued_at, inputs, raw)
+        return {'issued_at': issued_at, 'inputs': inputs, 'raw': raw, 'prediction': prediction}
+
+    def _finish(self, issued_at, inputs, raw):
+        try:
+            # Learn from the actuals that just arrived, then adjust this forecast
+            times = pd.date_range(end=issued_at, periods=inputs.shape[1], freq='5T')
+            prediction = self.corrector.step(issued_at, times, inputs[0], inputs, raw)
+        except Exception:
+            logger.exception("Residual correction failed; serving the raw forecast")
+            prediction = raw
+        # Logged under the time of the latest load in the window, not the wall
+        # clock, so target times line up with NYISO actuals despite its lag
+        append_forecast(issued_at, inputs, prediction, self.log_dir)
+        return prediction
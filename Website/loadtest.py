@@ -0,0 +1,264 @@
+"""Concurrent-session load test for the dashboard and the forecast path
+
+Each simulated user is a Streamlit ``AppTest`` session running the real
+``Home.py`` and ``pages/1_The_Data.py`` scripts in this process, the same
+way the Streamlit server runs one script thread per session and shares
+``st.cache_*`` between them. NYISO and NWS are replaced by a stub transport
+that synthesizes their responses (with optional latency), and exports
+stream from a local ``export.py`` server. For every concurrency level the
+report gives throughput, p50/p95/p99 response time per action and the CPU
+and RSS of the process hosting the sessions.
+
+Every cache and log the sessions would write (upstream single-flight and
+last-good caches, ``forecast_cache.pkl``, ``inference_cache/``,
+``forecast_log/`` and the corrector state) is redirected to a scratch
+directory for the run, so fake upstream data never reaches the live ones.
+
+Run from the Website directory with the model next to ``Home.py``:
+
+    python loadtest.py --levels 1 4 16 32 --duration 60
+"""
+import os
+import json
+import time
+import shutil
+import random
+import resource
+import argparse
+import tempfile
+import threading
+import contextlib
+import numpy as np
+import pandas as pd
+import requests
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+import collect_inputs as ci
+import correction
+import forecast_cache
+import forecast_log
+import live_forecast
+from http_client import HttpClient, LastGoodStore
+from single_flight import SingleFlight
+from snapshots import SnapshotResponse
+
+ACTIONS = ['home_load', 'home_interact', 'data_load', 'data_interact', 'export']
+
+class StubUpstream():
+    """``HttpClient`` transport that fabricates NYISO and NWS responses for now
+
+    Parameters
+    ----------
+    latency: float
+        Seconds slept per request to mimic the network
+    """
+
+    def __init__(self, latency=0.0, clock=datetime.now):
+        self.latency = latency
+        self.clock = clock
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(t):
+        return 5500 + 1200 * np.sin((t.hour * 60 + t.minute - 540) / 1440 * 2 * np.pi)
+
+    def _pal(self, now):
+        rows = ['"Time Stamp","Time Zone","Name","PTID","Load"']
+        for ts in pd.date_range(pd.Timestamp(now).normalize(), pd.Timestamp(now).floor('5T'), freq='5T'):
+            for j, zone in enumerate(ci.NYISO_ZONES):
+                rows.append(f'"{ts:%m/%d/%Y %H:%M:%S}","EDT","{zone}","{61757 + j}","{self._load(ts) / (j + 1):.1f}"')
+        return ('\r\n'.join(rows) + '\r\n').encode()
+
+    def _observations(self, now):
+        hours = pd.date_range(pd.Timestamp(now).floor('H') - pd.Timedelta(hours=24), pd.Timestamp(now).floor('H'), freq='H')
+        features = [{'properties': {'timestamp': h.tz_localize('America/New_York').tz_convert('UTC').isoformat(),
+                                    'temperature': {'value': 12 + 6 * np.sin(h.hour / 24 * 2 * np.pi)},
+                                    'textDescription': 'Clear', 'station': 'https://api.weather.gov/stations/KNYC'}}
+                    for h in hours]
+        return json.dumps({'features': features}).encode()
+
+    def _forecast(self, now):
+        hours = pd.date_range(pd.Timestamp(now).floor('H') + pd.Timedelta(hours=1), periods=48, freq='H')
+        periods = [{'startTime': h.tz_localize('America/New_York').isoformat(),
+                    'temperature': round(54 + 11 * np.sin(h.hour / 24 * 2 * np.pi)), 'shortForecast': 'Sunny'}
+                   for h in hours]
+        return json.dumps({'properties': {'periods': periods}}).encode()
+
+    def __call__(self, url, **kwargs):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        now = self.clock()
+        if 'pal.csv' in url:
+            return SnapshotResponse(url, 200, self._pal(now))
+        if '/observations' in url:
+            return SnapshotResponse(url, 200, self._observations(now))
+        if '/forecast' in url:
+            return SnapshotResponse(url, 200, self._forecast(now))
+        return SnapshotResponse(url, 404, b'')
+
+@contextlib.contextmanager
+def isolated(transport):
+    """Points every upstream, cache and log path the dashboard writes at a scratch directory
+
+    Mirrors ``replay.replaying``; everything is restored and the scratch
+    directory removed on exit.
+    """
+    scratch = tempfile.mkdtemp(prefix="loadtest-")
+    saved = (ci.http, ci.single_flight, ci.last_good, forecast_cache.CACHE_PATH,
+             live_forecast.INFERENCE_CACHE_DIR, forecast_log.FORECAST_LOG_DIR, correction.STATE_PATH,
+             os.environ.pop('SOLCAST_API_KEY', None))
+    ci.http = HttpClient(transport=transport)
+    ci.single_flight = SingleFlight(os.path.join(scratch, "upstream_cache"))
+    ci.last_good = LastGoodStore(os.path.join(scratch, "last_good"))
+    forecast_cache.CACHE_PATH = os.path.join(scratch, "forecast_cache.pkl")
+    live_forecast.INFERENCE_CACHE_DIR = os.path.join(scratch, "inference_cache")
+    forecast_log.FORECAST_LOG_DIR = os.path.join(scratch, "forecast_log")
+    correction.STATE_PATH = os.path.join(scratch, "correction_state.npz")
+    try:
+        yield scratch
+    finally:
+        (ci.http, ci.single_flight, ci.last_good, forecast_cache.CACHE_PATH, live_forecast.INFERENCE_CACHE_DIR,
+         forecast_log.FORECAST_LOG_DIR, correction.STATE_PATH, api_key) = saved
+        if api_key is not None:
+            os.environ['SOLCAST_API_KEY'] = api_key
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def _rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak rather than current RSS where /proc is unavailable
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _session(export_url, deadline, timings, errors, samples, timeout, seed):
+    """One simulated user: load and interact with both pages, then export"""
+    from streamlit.testing.v1 import AppTest
+    rng = random.Random(seed)
+
+    def timed(action, fn):
+        start = time.perf_counter()
+        try:
+            result = fn()
+            if getattr(result, 'exception', None):
+                raise RuntimeError(result.exception[0].value)
+            timings[action].append(time.perf_counter() - start)
+            return result
+        except Exception as e:
+            errors[action] += 1
+            samples.setdefault(action, f"{type(e).__name__}: {e}")
+            return None
+
+    while time.monotonic() < deadline:
+        home = timed('home_load', lambda: AppTest.from_file('Home.py', default_timeout=timeout).run())
+        if home is not None and time.monotonic() < deadline:
+            lo = rng.randint(-10, 0)
+            timed('home_interact', lambda: home.slider[0].set_value((lo, lo + rng.randint(1, 10))).run())
+            timed('home_interact', lambda: home.radio[0].set_value(rng.choice(['csv', 'parquet'])).run())
+
+        data = timed('data_load', lambda: AppTest.from_file('pages/1_The_Data.py', default_timeout=timeout).run())
+        if data is not None and time.monotonic() < deadline:
+            timed('data_interact', lambda: data.radio[0].set_value(rng.choice(data.radio[0].options)).run())
+            lo = rng.randint(0, 80)
+            timed('data_interact', lambda: data.slider[0].set_value((lo, lo + 20)).run())
+            timed('data_interact', lambda: data.slider[1].set_value(rng.randrange(0, 1000, 50)).run())
+
+        if time.monotonic() < deadline:
+            end = datetime.now().date() + timedelta(days=1)
+            params = {'start': str(end - timedelta(days=7)), 'end': str(end), 'format': rng.choice(['csv', 'parquet'])}
+            def export():
+                with requests.get(export_url, params=params, stream=True, timeout=timeout) as r:
+                    if r.status_code not in (200, 404):
+                        r.raise_for_status()
+                    for _ in r.iter_content(64 * 1024):
+                        pass
+            timed('export', export)
+
+def run_level(users, duration, export_url, timeout=60):
+    """Runs ``users`` concurrent sessions for ``duration`` seconds"""
+    timings = {a: [] for a in ACTIONS}
+    errors = {a: 0 for a in ACTIONS}
+    samples = {}
+    deadline = time.monotonic() + duration
+    cpu0, wall0, rss_peak = time.process_time(), time.perf_counter(), _rss_mb()
+    threads = [threading.Thread(target=_session, args=(export_url, deadline, timings, errors, samples, timeout, i), daemon=True)
+               for i in range(users)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        rss_peak = max(rss_peak, _rss_mb())
+        time.sleep(0.5)
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+
+    every = np.concatenate([np.asarray(v) for v in timings.values()]) if any(timings.values()) else np.array([])
+    def stats(v):
+        v = np.asarray(v) * 1000
+        if not len(v):
+            return None
+        return {'count': int(len(v)), 'p50_ms': float(np.percentile(v, 50)),
+                'p95_ms': float(np.percentile(v, 95)), 'p99_ms': float(np.percentile(v, 99))}
+    return {
+        'users': users,
+        'wall_seconds': wall,
+        'throughput_per_s': len(every) / wall,
+        'overall': stats(every),
+        'actions': {a: stats(v) for a, v in timings.items()},
+        'errors': errors,
+        'error_samples': samples,
+        'cpu_percent': 100 * cpu / wall,
+        'cpu_cores_used': cpu / wall,
+        'rss_peak_mb': rss_peak,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--upstream-latency', type=float, default=0.2)
+    parser.add_argument('--export-port', type=int, default=8599)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output')
+    args = parser.parse_args(argv)
+
+    # Stubbed upstreams and scratch caches for every session in this process
+    stub = StubUpstream(args.upstream_latency)
+    with isolated(stub) as scratch:
+        from export import ExportHandler
+        handler = type('ScratchExportHandler', (ExportHandler,), {'log_dir': forecast_log.FORECAST_LOG_DIR})
+        server = ThreadingHTTPServer(('127.0.0.1', args.export_port), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        export_url = f"http://127.0.0.1:{args.export_port}/export"
+        # Home only offers the history export when it knows where export.py is
+        saved_export_url = os.environ.get('EXPORT_URL')
+        os.environ['EXPORT_URL'] = export_url
+
+        results = []
+        try:
+            for users in args.levels:
+                r = run_level(users, args.duration, export_url, args.timeout)
+                r['upstream_requests'] = stub.requests
+                results.append(r)
+                o = r['overall'] or {}
+                print(f"{users:>4} users  {r['throughput_per_s']:7.2f} actions/s  "
+                      f"p50 {o.get('p50_ms', float('nan')):8.1f} ms  p95 {o.get('p95_ms', float('nan')):8.1f} ms  "
+                      f"p99 {o.get('p99_ms', float('nan')):8.1f} ms  cpu {r['cpu_percent']:6.1f}%  "
+                      f"rss {r['rss_peak_mb']:7.1f} MB  errors {sum(r['errors'].values())}")
+        finally:
+            server.shutdown()
+            if saved_export_url is None:
+                os.environ.pop('EXPORT_URL', None)
+            else:
+                os.environ['EXPORT_URL'] = saved_export_url
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""Self-describing model bundles served without TensorFlow
+
+A bundle is a directory::
+
+    manifest.json       format, model version, layer specs, scaler, feature order
+    weights/*.npy       one raw array per weight tensor
+
+Loading memory-maps the ``.npy`` files and runs the forward pass in NumPy,
+so there is no Keras graph to rebuild or compile.
+
+    python model_bundle.py lstm_cv_final.h5 lstm_cv_final.bundle
+"""
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = "grid-load-forecast-bundle"
+BUNDLE_VERSION = 1
+
+# What the dashboard serves: $FORECAST_MODEL, else the current.bundle link
+# that deploys update, else the production LSTM
+SERVED_MODEL_ENV = "FORECAST_MODEL"
+CURRENT_BUNDLE = "current.bundle"
+DEFAULT_BUNDLE = "lstm_cv_final.bundle"
+DEFAULT_WEIGHTS = "lstm_cv_final.h5"
+
+class BundleError(ValueError):
+    """A bundle is missing, malformed or does not match what the caller expects"""
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+    'hard_sigmoid': lambda x: np.clip(0.2 * x + 0.5, 0, 1),
+}
+
+# Weight tensors each layer type must provide
+LAYER_WEIGHTS = {
+    'lstm': ['kernel', 'recurrent_kernel', 'bias'],
+    'gru': ['kernel', 'recurrent_kernel', 'bias'],
+    'dense': ['kernel', 'bias'],
+    'flatten': [],
+}
+# Kernel columns per unit: one block per gate
+GATES = {'lstm': 4, 'gru': 3, 'dense': 1}
+RECURRENT = ('lstm', 'gru')
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise BundleError(f"Unsupported activation: {name}")
+    return ACTIVATIONS[name]
+
+def _lstm(x, w, spec):
+    """Keras LSTM (gate order i, f, c, o) returning the last hidden state"""
+    units = spec['units']
+    act = _activation(spec['activation'])
+    rec = _activation(spec['recurrent_activation'])
+    kernel, recurrent, bias = w['kernel'], w['recurrent_kernel'], w['bias']
+    h = np.zeros((x.shape[0], units), dtype=np.float32)
+    c = np.zeros_like(h)
+    # Input projections for every time step in one matmul
+    z_x = x @ kernel + bias                                   # (batch, steps, 4 * units)
+    for t in range(x.shape[1]):
+        z = z_x[:, t] + h @ recurrent
+        i = rec(z[:, :units])
+        f = rec(z[:, units:2 * units])
+        g = act(z[:, 2 * units:3 * units])
+        o = rec(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * act(c)
+    return h
+
+def _gru(x, w, spec):
+    """Keras GRU (gate order z, r, h) returning the last hidden state
+
+    ``reset_after`` (the TF2 default) keeps separate input and recurrent
+    biases and applies the reset gate after the recurrent matmul.
+    """
+    units = spec['units']
+    act = _activation(spec['activation'])
+    rec = _activation(spec['recurrent_activation'])
+    kernel, recurrent, bias = w['kernel'], w['recurrent_kernel'], w['bias']
+    if spec.get('reset_after', True):
+        input_bias, recurrent_bias = bias[0], bias[1]
+    else:
+        input_bias, recurrent_bias = bias, None
+    h = np.zeros((x.shape[0], units), dtype=np.float32)
+    z_x = x @ kernel + input_bias                             # (batch, steps, 3 * units)
+    for t in range(x.shape[1]):
+        x_t = z_x[:, t]
+        if recurrent_bias is not None:
+            z_h = h @ recurrent + recurrent_bias
+            z = rec(x_t[:, :units] + z_h[:, :units])
+            r = rec(x_t[:, units:2 * units] + z_h[:, units:2 * units])
+            hh = act(x_t[:, 2 * units:] + r * z_h[:, 2 * units:])
+        else:
+            z_h = h @ recurrent[:, :2 * units]
+            z = rec(x_t[:, :units] + z_h[:, :units])
+            r = rec(x_t[:, units:2 * units] + z_h[:, units:])
+            hh = act(x_t[:, 2 * units:] + (r * h) @ recurrent[:, 2 * units:])
+        h = z * h + (1 - z) * hh
+    return h
+
+def _dense(x, w, spec):
+    return _activation(spec['activation'])(x @ w['kernel'] + w['bias'])
+
+def _flatten(x, w, spec):
+    return x.reshape(len(x), -1)
+
+FORWARD = {'lstm': _lstm, 'gru': _gru, 'dense': _dense, 'flatten': _flatten}
+
+class BundleModel():
+    """NumPy inference for a loaded bundle
+
+    ``predict`` mirrors ``keras.Model.predict`` so the model can be passed
+    to ``make_prediction`` unchanged.
+    """
+
+    def __init__(self, manifest, weights):
+        self.manifest = manifest
+        self.weights = weights
+        self.layers = manifest['layers']
+        self.input_shape = tuple(manifest['input_shape'])
+        self.feature_order = manifest['feature_order']
+        self.scaler_mean = np.asarray(manifest['scaler']['mean'], dtype=float)
+        self.scaler_std = np.asarray(manifest['scaler']['std'], dtype=float)
+        self.version = manifest['model_version']
+
+    def predict(self, x, batch_size=None, verbose=0):
+        x = np.asarray(x, dtype=np.float32)
+        if x.shape[1:] != self.input_shape:
+            raise BundleError(f"Expected input of shape (n, {self.input_shape[0]}, {self.input_shape[1]}), got {x.shape}")
+        for spec, w in zip(self.layers, self.weights):
+            x = FORWARD[spec['type']](x, w, spec)
+        return x
+
+    def __call__(self, x, training=False):
+        return self.predict(x)
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def save_bundle(model, path, feature_order, scaler_mean, scaler_std, model_version=None):
+    """Writes a Keras Sequential LSTM/GRU/Dense/Flatten model to a bundle directory
+
+    Dropout layers are inference no-ops and are skipped; any other layer
+    type raises ``BundleError`` rather than being silently dropped.
+    """
+    os.makedirs(os.path.join(path, 'weights'), exist_ok=True)
+    layers = []
+    for i, layer in enumerate(model.layers):
+        kind = type(layer).__name__.lower()
+        if kind == 'dropout':
+            continue
+        if kind not in LAYER_WEIGHTS:
+            raise BundleError(f"Cannot bundle layer {layer.name} of type {type(layer).__name__}")
+        config = layer.get_config()
+        if kind in RECURRENT and (config.get('return_sequences') or config.get('go_backwards')):
+            raise BundleError(f"Unsupported {type(layer).__name__} configuration in {layer.name}")
+        if kind == 'flatten':
+            layers.append({'type': kind, 'name': layer.name, 'weights': {}})
+            continue
+        spec = {'type': kind, 'name': layer.name, 'units': config['units'],
+                'activation': config['activation'], 'weights': {}}
+        if kind in RECURRENT:
+            spec['recurrent_activation'] = config['recurrent_activation']
+        if kind == 'gru':
+            spec['reset_after'] = config.get('reset_after', True)
+        for name, value in zip(LAYER_WEIGHTS[kind], layer.get_weights()):
+            file = f"{i}_{name}.npy"
+            arr = np.ascontiguousarray(value, dtype=np.float32)
+            np.save(os.path.join(path, 'weights', file), arr)
+            spec['weights'][name] = {'file': file, 'shape': list(arr.shape), 'dtype': 'float32',
+                                     'sha256': _sha256(os.path.join(path, 'weights', file))}
+        layers.append(spec)
+
+    if model_version is None:
+        digest = hashlib.sha256()
+        for spec in layers:
+            for w in spec['weights'].values():
+                digest.update(w['sha256'].encode())
+        model_version = digest.hexdigest()[:16]
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'format_version': BUNDLE_VERSION,
+        'model_version': model_version,
+        'input_shape': list(model.input_shape[1:]),
+        'output_shape': list(model.output_shape[1:]),
+        'feature_order': list(feature_order),
+        'scaler': {'mean': [float(v) for v in scaler_mean], 'std': [float(v) for v in scaler_std]},
+        'layers': layers,
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def read_manifest(path):
+    manifest_path = os.path.join(path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        raise BundleError(f"No manifest.json in {path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != BUNDLE_FORMAT or manifest.get('format_version') != BUNDLE_VERSION:
+        raise BundleError(f"{path} is not a version {BUNDLE_VERSION} {BUNDLE_FORMAT}")
+    return manifest
+
+def load_weights(path, manifest, mmap_mode='r', verify=False):
+    """Memory-maps every weight file and checks it against the manifest"""
+    weights = []
+    for spec in manifest['layers']:
+        if spec['type'] not in FORWARD:
+            raise BundleError(f"Unsupported layer type: {spec['type']}")
+        if set(spec['weights']) != set(LAYER_WEIGHTS[spec['type']]):
+            raise BundleError(f"Layer {spec['name']} needs weights {LAYER_WEIGHTS[spec['type']]}")
+        arrays = {}
+        for name, meta in spec['weights'].items():
+            file = os.path.join(path, 'weights', meta['file'])
+            if verify and _sha256(file) != meta['sha256']:
+                raise BundleError(f"Checksum mismatch for {meta['file']}")
+            arr = np.load(file, mmap_mode=mmap_mode)
+            if list(arr.shape) != meta['shape'] or str(arr.dtype) != meta['dtype']:
+                raise BundleError(f"{meta['file']} is {arr.dtype}{list(arr.shape)}, manifest says {meta['dtype']}{meta['shape']}")
+            arrays[name] = arr
+        weights.append(arrays)
+    return weights
+
+def weight_shapes(spec, width):
+    """Shape every weight of ``spec`` must have when fed inputs of ``width`` columns"""
+    units = spec['units']
+    cols = GATES[spec['type']] * units
+    shapes = {'kernel': (width, cols), 'bias': (cols,)}
+    if spec['type'] in RECURRENT:
+        shapes['recurrent_kernel'] = (units, cols)
+    if spec['type'] == 'gru' and spec.get('reset_after', True):
+        # Separate input and recurrent biases
+        shapes['bias'] = (2, cols)
+    return shapes
+
+def check_architecture(manifest, weights, forecast_window=None):
+    """Verifies every weight shape against the input shape and the output width
+
+    Parameters
+    ----------
+    manifest: dict
+        Bundle manifest
+    weights: list of dict
+        Arrays from ``load_weights``
+    forecast_window: int, optional
+        Forecast steps the caller expects; a different output width raises
+        ``BundleError``. The manifest's ``output_shape`` is checked either way.
+    """
+    shape = list(manifest['input_shape'])
+    for spec, w in zip(manifest['layers'], weights):
+        if spec['type'] == 'flatten':
+            shape = [int(np.prod(shape))]
+            continue
+        if spec['type'] in RECURRENT and len(shape) != 2:
+            raise BundleError(f"Layer {spec['name']} needs (steps, width) inputs, gets {tuple(shape)}")
+        for name, want in weight_shapes(spec, shape[-1]).items():
+            if w[name].shape != want:
+                raise BundleError(f"Layer {spec['name']} {name} is {w[name].shape}, expected {want}")
+        # Recurrent layers consume the time axis and return the last state
+        shape = [spec['units']] if spec['type'] in RECURRENT else shape[:-1] + [spec['units']]
+
+    if 'output_shape' in manifest and shape != list(manifest['output_shape']):
+        raise BundleError(f"Layers produce {tuple(shape)}, manifest says {tuple(manifest['output_shape'])}")
+    if forecast_window is not None and shape != [forecast_window]:
+        raise BundleError(f"Bundle forecasts {tuple(shape)}, caller expects ({forecast_window},)")
+
+def served_model_path(base_dir="."):
+    """Bundle directory or ``.h5`` weights the forecast services should load"""
+    if os.environ.get(SERVED_MODEL_ENV):
+        return os.environ[SERVED_MODEL_ENV]
+    for name in (CURRENT_BUNDLE, DEFAULT_BUNDLE):
+        path = os.path.join(base_dir, name)
+        if os.path.isdir(path):
+            return path
+    return os.path.join(base_dir, DEFAULT_WEIGHTS)
+
+def set_current(bundle, base_dir="."):
+    """Atomically points ``<base_dir>/current.bundle`` at ``bundle``
+
+    Services pick the new model up the next time they load one. Older
+    deployments copied the bundle to ``current.bundle`` instead of linking
+    it; such a directory is moved aside to ``current.bundle.<model version>``
+    first, since a link cannot replace it.
+    """
+    read_manifest(bundle)
+    link = os.path.join(base_dir, CURRENT_BUNDLE)
+    if os.path.isdir(link) and not os.path.islink(link):
+        if os.path.samefile(link, bundle):
+            raise BundleError(f"{bundle} is {link} itself; deploy it under another name first")
+        try:
+            version = read_manifest(link)['model_version']
+        except BundleError:
+            version = f"unknown-{os.getpid()}"
+        aside = f"{link}.{version}"
+        if os.path.lexists(aside):
+            raise BundleError(f"{link} is a directory and {aside} already exists; move one of them away")
+        os.rename(link, aside)
+        logger.warning("Moved the copied bundle at %s to %s", link, aside)
+    tmp = f"{link}.{os.getpid()}.tmp"
+    os.symlink(os.path.relpath(os.path.abspath(bundle), os.path.abspath(base_dir)), tmp)
+    os.replace(tmp, link)
+    return link
+
+def load_bundle(path, feature_order=None, forecast_window=None, verify=False):
+    """Loads a bundle for inference
+
+    Parameters
+    ----------
+    path: str
+        Bundle directory
+    feature_order: list of str, optional
+        Input rows the caller will supply; a mismatch raises ``BundleError``
+    forecast_window: int, optional
+        Forecast steps the caller expects; a mismatch raises ``BundleError``
+    verify: bool
+        Also check SHA-256 of every weight file (reads them fully)
+
+    Returns
+    -------
+    BundleModel
+    """
+    manifest = read_manifest(path)
+    if feature_order is not None and list(feature_order) != manifest['feature_order']:
+        raise BundleError(f"Bundle expects features {manifest['feature_order']}, caller provides {list(feature_order)}")
+    if len(manifest['scaler']['mean']) < manifest['input_shape'][0]:
+        raise BundleError("Scaler does not cover every input row")
+    weights = load_weights(path, manifest, verify=verify)
+    check_architecture(manifest, weights, forecast_window)
+    return BundleModel(manifest, weights)
+
+if __name__ == "__main__":
+    import sys
+    from collect_inputs import import_model, FEATURE_ORDER, SCALER_MEAN, SCALER_STD
+    src, dst = sys.argv[1], sys.argv[2]
+    manifest = save_bundle(import_model(src), dst, FEATURE_ORDER, SCALER_MEAN, SCALER_STD)
+    print(f"Wrote {dst} (model version {manifest['model_version']})")
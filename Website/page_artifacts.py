@@ -0,0 +1,249 @@
+import os
+import json
+import glob
+import shutil
+import hashlib
+import calendar
+import tempfile
+import numpy as np
+import pandas as pd
+import altair as alt
+from data_store import STORE_DIR, load_history
+from explorer_cube import build_cube, save_cube, load_cube
+from downsample import CHART_WIDTH_PX, downsample
+
+ARTIFACT_DIR = "./pages/artifacts"
+
+# Bump whenever the aggregates or chart definitions below change so stale
+# artifacts are not served for the same source data
+ARTIFACT_VERSION = 6
+
+# The page describes 2022; its event filters (the December cold snap, the
+# July heat wave) select by month and day, so other years must be excluded
+PAGE_START, PAGE_END = pd.Timestamp('2022-01-01'), pd.Timestamp('2023-01-01')
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+def source_hash(store_dir=STORE_DIR):
+    """SHA-256 over the relative paths and bytes of every file in the store"""
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(store_dir, '**', '*.parquet'), recursive=True)):
+        h.update(os.path.relpath(path, store_dir).encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    return h.hexdigest()
+
+def compute_aggregates(df):
+    """Computes every frame The Data page charts from the 5 minute history
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Output of ``load_history``
+
+    Returns
+    -------
+    dict of str to pd.DataFrame
+    """
+    # Weekly profile: map day of week onto the week of Mon 01/02/2023
+    weekly_load = df.groupby(['day of week', 'hour', 'minute'])['Load'].mean().reset_index()
+    weekly_load['updated_timestamp'] = (pd.Timestamp('2023-01-02')
+        + pd.to_timedelta(weekly_load['day of week'].astype(int), unit='D')
+        + pd.to_timedelta(weekly_load['hour'].astype(int), unit='h')
+        + pd.to_timedelta(weekly_load['minute'].astype(int), unit='m')).dt.tz_localize('Etc/GMT+9')
+
+    monthly_load = df.groupby('month')[['Load', 'HourlyDryBulbTemperature']].mean().reset_index()
+    monthly_load['Month'] = [calendar.month_abbr[int(m)] for m in monthly_load['month']]
+
+    cols = ['Timestamp', 'Load', 'HourlyDryBulbTemperature']
+    cold_snap = df.loc[(df['month'] == 12) & (df['day'] >= 18), cols + ['day']].copy()
+    cold_snap['cold_snap'] = np.where(cold_snap['day'].between(23, 26), 'Yes', 'No')
+
+    heat_wave = df.loc[(df['month'] == 7) & (df['day'] >= 13), cols + ['day']].copy()
+    heat_wave['heat_flag'] = np.where(heat_wave['day'].between(19, 25), 'Yes', 'No')
+
+    def hourly(month, day):
+        sel = df.loc[(df['month'] == month) & (df['day'] == day)]
+        return sel.groupby('hour')[['Load', 'DNI']].mean().reset_index()
+
+    return {
+        'weekly_load': weekly_load,
+        'monthly_load': monthly_load,
+        'cold_snap': cold_snap.drop(columns='day'),
+        'heat_wave': heat_wave.drop(columns='day'),
+        'sunny': hourly(10, 16),
+        'cloudy': hourly(10, 17),
+    }
+
+def _weekly_chart(weekly_load):
+    a = (alt.Chart(weekly_load)
+        .mark_line()
+        .encode(
+            alt.X('updated_timestamp', title = '', axis = alt.Axis(format = "%a %H:%M")),
+            alt.Y('Load', title = 'Avg Load [MWh]'),
+        )
+    )
+    hover = alt.selection_single(
+        fields=['updated_timestamp'],
+        nearest=True,
+        on="mouseover",
+        empty="none",
+    )
+    tooltips = (
+        alt.Chart(weekly_load)
+        .mark_rule()
+        .encode(
+            x = 'updated_timestamp',
+            y = 'Load',
+            opacity=alt.condition(hover, alt.value(0.3), alt.value(0)),
+            tooltip=[
+                alt.Tooltip('updated_timestamp:T', title = 'Time', format = "%a %H:%M"),
+                alt.Tooltip('Load', title = 'Avg Load [MWh]'),
+            ],
+        )
+        .add_selection(hover)
+    )
+    return (a + tooltips).interactive()
+
+def _monthly_chart(monthly_load):
+    a = (alt.Chart(monthly_load)
+        .mark_line(point = True)
+        .encode(
+            alt.X('Month:O', title = '', sort = MONTHS),
+            alt.Y('Load', title = 'Avg Load [MWh]'),
+        )
+    )
+    b = (alt.Chart(monthly_load)
+        .mark_line(point = True)
+        .encode(
+            alt.X('Month:O', title = '', sort = MONTHS),
+            alt.Y('HourlyDryBulbTemperature', title = 'Avg Temperature [°F]'),
+            color = alt.value("#FFAA00")
+        )
+    )
+    return alt.layer(a, b).resolve_scale(y='independent')
+
+def _event_chart(frame, flag, title, load_domain, temp_domain, width_px=CHART_WIDTH_PX):
+    # Each layer is downsampled on its own series so the payload is bounded
+    # by the chart width rather than the length of the date range
+    load_frame = downsample(frame[['Timestamp', 'Load', flag]], 'Timestamp', 'Load', width_px)
+    temp_frame = downsample(frame[['Timestamp', 'HourlyDryBulbTemperature']], 'Timestamp', 'HourlyDryBulbTemperature', width_px)
+
+    load = (alt.Chart(load_frame)
+        .mark_line()
+        .encode(
+            alt.X('Timestamp', title = '', axis = alt.Axis(format = "%m/%d/%Y")),
+            alt.Y('Load', impute=alt.ImputeParams(value=None), title = 'Load [MWh]', scale = alt.Scale(domain = load_domain)),
+            color = alt.Color(f'{flag}:O', title = title, legend = None, scale = alt.Scale(domain = ['No', 'Yes'], range = ['#ADD8E6', '#00008B']))
+        )
+    )
+    temp = (alt.Chart(temp_frame)
+        .mark_line(strokeDash=[5, 5])
+        .encode(
+            alt.X('Timestamp', title = '', axis = alt.Axis(format = "%m/%d/%Y")),
+            alt.Y('HourlyDryBulbTemperature', title = 'Temperature [°F]', scale = alt.Scale(domain = temp_domain)),
+            color = alt.value("#E32428")
+        )
+    )
+    return alt.layer(load, temp).resolve_scale(y='independent')
+
+def _solar_chart(frame):
+    load = (alt.Chart(frame)
+        .mark_line()
+        .encode(
+            alt.X('hour', title = 'Hour'),
+            alt.Y('Load', title = 'Avg Load [MWh]', scale = alt.Scale(domain = [3000, 6000]))
+        )
+    )
+    solar = (alt.Chart(frame)
+        .mark_line()
+        .encode(
+            alt.X('hour', title = 'Hour'),
+            alt.Y('DNI', title = 'Solar Irradiance [DNI]', scale = alt.Scale(domain = [0, 1000])),
+            color = alt.value("#FFAA00")
+        )
+    )
+    return alt.layer(load, solar).resolve_scale(y='independent')
+
+def build_charts(aggregates):
+    """Builds the Vega-Lite spec of every static chart on The Data page"""
+    charts = {
+        'weekly': _weekly_chart(aggregates['weekly_load']),
+        'monthly': _monthly_chart(aggregates['monthly_load']),
+        'cold_snap': _event_chart(aggregates['cold_snap'], 'cold_snap', 'Cold Snap', [4000, 7000], [0, 55]),
+        'heat_wave': _event_chart(aggregates['heat_wave'], 'heat_flag', 'Heat Wave', [5000, 10000], [65, 100]),
+        'sunny': _solar_chart(aggregates['sunny']),
+        'cloudy': _solar_chart(aggregates['cloudy']),
+    }
+    # Specs inline their data; every layer is downsampled to the chart width,
+    # well under Altair's 5000 row limit
+    return {k: c.to_dict() for k, c in charts.items()}
+
+def artifact_path(artifact_dir, digest, start, end):
+    """Artifacts are keyed by version, date range and source hash"""
+    return os.path.join(artifact_dir, f"v{ARTIFACT_VERSION}-{start:%Y%m%d}-{end:%Y%m%d}-{digest[:16]}")
+
+def build_artifacts(store_dir=STORE_DIR, artifact_dir=ARTIFACT_DIR, digest=None,
+                    start=PAGE_START, end=PAGE_END):
+    """Computes the aggregates and chart specs and writes them as one versioned artifact
+
+    The artifact is assembled in a temporary directory and renamed into
+    place, so readers never observe a partially written version.
+
+    Parameters
+    ----------
+    start, end: pd.Timestamp
+        Half-open range of the history the page describes
+    """
+    digest = digest or source_hash(store_dir)
+    target = artifact_path(artifact_dir, digest, start, end)
+    os.makedirs(artifact_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=artifact_dir)
+
+    try:
+        df = load_history(store_dir, start, end)
+        aggregates = compute_aggregates(df)
+        save_cube(build_cube(df), os.path.join(tmp, "explorer_cube.npz"))
+        for name, frame in aggregates.items():
+            frame.to_parquet(os.path.join(tmp, f"{name}.parquet"), index=False)
+        with open(os.path.join(tmp, "charts.json"), "w") as f:
+            json.dump(build_charts(aggregates), f)
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump({"version": ARTIFACT_VERSION, "source_hash": digest,
+                       "start": start.isoformat(), "end": end.isoformat(),
+                       "created": pd.Timestamp.now().isoformat()}, f)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Another process published the same version first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return target
+
+def ensure_artifacts(store_dir=STORE_DIR, artifact_dir=ARTIFACT_DIR, start=PAGE_START, end=PAGE_END):
+    """Returns the artifact directory for the current store and range, building it on a miss"""
+    digest = source_hash(store_dir)
+    target = artifact_path(artifact_dir, digest, start, end)
+    if not os.path.exists(os.path.join(target, "manifest.json")):
+        target = build_artifacts(store_dir, artifact_dir, digest, start, end)
+    return target
+
+def load_artifacts(store_dir=STORE_DIR, artifact_dir=ARTIFACT_DIR):
+    """Loads the prebuilt Vega-Lite specs keyed by chart name"""
+    with open(os.path.join(ensure_artifacts(store_dir, artifact_dir), "charts.json")) as f:
+        return json.load(f)
+
+def load_aggregate(name, store_dir=STORE_DIR, artifact_dir=ARTIFACT_DIR):
+    """Loads one materialized aggregate frame, e.g. ``'weekly_load'``"""
+    return pd.read_parquet(os.path.join(ensure_artifacts(store_dir, artifact_dir), f"{name}.parquet"))
+
+def load_explorer_cube(store_dir=STORE_DIR, artifact_dir=ARTIFACT_DIR):
+    """Loads the binned temperature/solar cube behind the slider explorer"""
+    return load_cube(os.path.join(ensure_artifacts(store_dir, artifact_dir), "explorer_cube.npz"))
+
+if __name__ == "__main__":
+    print(build_artifacts())
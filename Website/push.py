@@ -0,0 +1,150 @@
+"""Server-Sent Events push channel for new forecasts
+
+A single producer computes the forecast once per NYISO interval and
+publishes it to every subscriber of ``GET /forecasts``. Each client has a
+small bounded queue; a client that cannot keep up loses its oldest
+undelivered events rather than slowing the fan-out or growing memory. Idle
+connections cost one parked coroutine each, and keepalives are sent by one
+shared ticker instead of a timer per client.
+
+    python push.py 8503
+"""
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from forecast_cache import current_bucket, PUBLISH_INTERVAL, PUBLISH_LAG
+
+PUSH_PORT = 8503
+QUEUE_SIZE = 8
+KEEPALIVE_SECONDS = 15
+KEEPALIVE = b": keepalive\n\n"
+
+logger = logging.getLogger(__name__)
+
+def forecast_event(issued_at, inputs, prediction):
+    """SSE message for one forecast and the inputs it was made from"""
+    payload = {
+        'issued_at': issued_at.isoformat(),
+        'forecast': [float(v) for v in list(prediction.reshape(-1))],
+        'last_load': float(inputs[0][-1]),
+        'temperature': float(inputs[2][-1]),
+        'dni': float(inputs[1][-1]),
+        'temperature_future': [float(v) for v in inputs[4]],
+        'dni_future': [float(v) for v in inputs[3]],
+    }
+    return f"id: {payload['issued_at']}\nevent: forecast\ndata: {json.dumps(payload)}\n\n".encode()
+
+class Broker():
+    """Fans events out to subscriber queues with drop-oldest backpressure
+
+    Parameters
+    ----------
+    queue_size: int
+        Events buffered per client before the oldest is dropped
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.latest = None
+        self.dropped = 0
+
+    def subscribe(self):
+        queue = asyncio.Queue(self.queue_size)
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def _offer(self, queue, message):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(message)
+
+    def publish(self, message):
+        self.latest = message
+        for queue in self.subscribers:
+            self._offer(queue, message)
+
+    def keepalive(self):
+        # Only idle connections need one; busy ones are already sending data
+        for queue in self.subscribers:
+            if queue.empty():
+                queue.put_nowait(KEEPALIVE)
+
+async def _keepalive(broker, interval=KEEPALIVE_SECONDS):
+    while True:
+        await asyncio.sleep(interval)
+        broker.keepalive()
+
+async def _produce(broker, compute):
+    """Runs ``compute()`` now and after every NYISO interval boundary
+
+    A forecast is published only when its newest load timestamp has moved
+    forward, so a late NYISO file does not resend the previous forecast.
+    """
+    loop = asyncio.get_running_loop()
+    last_issued = None
+    while True:
+        try:
+            forecast = await loop.run_in_executor(None, compute)
+            if last_issued is None or forecast['issued_at'] > last_issued:
+                last_issued = forecast['issued_at']
+                broker.publish(forecast_event(forecast['issued_at'], forecast['inputs'], forecast['prediction']))
+        except Exception:
+            logger.exception("Forecast for push failed")
+        next_run = current_bucket() + PUBLISH_INTERVAL + PUBLISH_LAG
+        await asyncio.sleep(max(1.0, (next_run - datetime.now()).total_seconds()))
+
+async def _handle(broker, reader, writer):
+    try:
+        request = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request.decode('latin-1').split()
+        if len(parts) < 2 or parts[0] != 'GET' or parts[1].split('?')[0] != '/forecasts':
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n"
+                     b"Access-Control-Allow-Origin: *\r\n\r\nretry: 5000\n\n")
+        queue = broker.subscribe()
+        try:
+            while True:
+                writer.write(await queue.get())
+                await writer.drain()
+        finally:
+            broker.unsubscribe(queue)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def run(compute, port=PUSH_PORT, broker=None):
+    broker = broker or Broker()
+    server = await asyncio.start_server(lambda r, w: _handle(broker, r, w), '', port)
+    tasks = [asyncio.create_task(_produce(broker, compute)), asyncio.create_task(_keepalive(broker))]
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def default_compute():
+    """The dashboard's forecast step; correction and logging run once per interval across both"""
+    from live_forecast import LiveForecaster
+    return LiveForecaster().compute
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(default_compute(), int(sys.argv[1]) if len(sys.argv) > 1 else PUSH_PORT))
@@ -0,0 +1,174 @@
+"""Replay the live forecast pipeline over recorded upstream snapshots
+
+A virtual clock steps through the period one NYISO interval at a time. At
+each step the live path, ``LiveFeatures.update`` -> ``tranform_data`` ->
+``make_prediction``, runs against ``SnapshotReplay``, which serves the
+NYISO and NWS responses as they were when recorded (run the dashboard with
+``RECORD_SNAPSHOTS=1`` to collect them). Nothing sleeps, so a month of
+operation replays in minutes. The report gives per-stage latency, with
+upstream time taken from the recorded fetch durations, and the forecast
+error per horizon against the loads that arrived later in the replay.
+
+    python replay.py 2023-04-01 2023-05-01 --model lstm_cv_final.bundle
+"""
+import os
+import io
+import json
+import time
+import shutil
+import logging
+import tempfile
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+import collect_inputs as ci
+import feature_window
+from feature_window import LiveFeatures
+from http_client import HttpClient, LastGoodStore
+from single_flight import SingleFlight
+from snapshots import SNAPSHOT_DIR, SnapshotReplay
+from model_bundle import served_model_path
+
+STAGES = ['upstream', 'update_features', 'tranform_data', 'make_prediction', 'end_to_end']
+
+logger = logging.getLogger(__name__)
+
+class VirtualClock():
+    def __init__(self, start):
+        self.t = pd.Timestamp(start).to_pydatetime()
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, step):
+        self.t += step
+
+@contextlib.contextmanager
+def replaying(clock, snapshot_dir=SNAPSHOT_DIR):
+    """Points collect_inputs at the virtual clock and the snapshots
+
+    The single-flight and last-good caches go to a scratch directory, and
+    the hourly temperature cache starts empty, so the replay neither reads
+    nor disturbs the live ones.
+    """
+    transport = SnapshotReplay(clock, snapshot_dir)
+    scratch = tempfile.mkdtemp(prefix="replay-")
+    saved = ci.clock, ci.http, ci.single_flight, ci.last_good
+    saved_temperature = dict(feature_window._temperature)
+    ci.clock = clock
+    ci.http = HttpClient(transport=transport, retries=0)
+    ci.single_flight = SingleFlight(os.path.join(scratch, "upstream_cache"))
+    ci.last_good = LastGoodStore(os.path.join(scratch, "last_good"))
+    feature_window._temperature.clear()
+    try:
+        yield transport
+    finally:
+        ci.clock, ci.http, ci.single_flight, ci.last_good = saved
+        feature_window._temperature.clear()
+        feature_window._temperature.update(saved_temperature)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def replay(start, end, model, snapshot_dir=SNAPSHOT_DIR, step=timedelta(minutes=5)):
+    """Runs the pipeline at every ``step`` in ``[start, end)``
+
+    Returns
+    -------
+    dict
+        ``latency_ms`` percentiles per stage, ``rmse`` overall and per
+        horizon, counts, and the wall time of the replay
+    """
+    clock = VirtualClock(start)
+    end = pd.Timestamp(end).to_pydatetime()
+    timings = {s: [] for s in STAGES}
+    forecasts = {}
+    actuals = {}
+    failures = 0
+    wall = time.perf_counter()
+    live = LiveFeatures()
+
+    with replaying(clock, snapshot_dir) as transport:
+        while clock() < end:
+            transport.upstream_seconds = 0.0
+            try:
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    inputs = live.update()
+                t1 = time.perf_counter()
+                trans = ci.tranform_data(inputs)
+                t2 = time.perf_counter()
+                prediction = np.asarray(ci.make_prediction(np.array([trans]), model)).reshape(-1)
+                t3 = time.perf_counter()
+            except Exception:
+                logger.exception("Replay step at %s failed", clock())
+                failures += 1
+                clock.advance(step)
+                continue
+
+            upstream = transport.upstream_seconds
+            timings['upstream'].append(upstream)
+            timings['update_features'].append(t1 - t0)
+            timings['tranform_data'].append(t2 - t1)
+            timings['make_prediction'].append(t3 - t2)
+            timings['end_to_end'].append(upstream + t3 - t0)
+
+            issued = live.window.last_time
+            forecasts[issued] = prediction
+            times = pd.date_range(end=issued, periods=inputs.shape[1], freq='5T')
+            actuals.update(zip(times, inputs[0]))
+            clock.advance(step)
+
+    report = {
+        'steps': len(timings['end_to_end']) + failures,
+        'failures': failures,
+        'forecasts': len(forecasts),
+        'wall_seconds': time.perf_counter() - wall,
+        'latency_ms': {s: {'mean': float(np.mean(v) * 1000), 'p50': float(np.percentile(v, 50) * 1000),
+                           'p95': float(np.percentile(v, 95) * 1000)}
+                       for s, v in timings.items() if v},
+    }
+    report.update(forecast_error(forecasts, actuals))
+    return report
+
+def forecast_error(forecasts, actuals, interval=timedelta(minutes=5)):
+    """RMSE and MAPE per horizon of ``forecasts`` against the loads seen later"""
+    if not forecasts:
+        return {'rmse': None, 'rmse_by_horizon': {}, 'mape': None}
+    horizon = len(next(iter(forecasts.values())))
+    errors = [[] for _ in range(horizon)]
+    pct = []
+    for issued, prediction in forecasts.items():
+        for h in range(horizon):
+            actual = actuals.get(issued + (h + 1) * interval)
+            if actual is not None:
+                errors[h].append(prediction[h] - actual)
+                pct.append(abs(prediction[h] - actual) / actual)
+    flat = np.concatenate([np.asarray(e) for e in errors if e]) if any(errors) else np.array([])
+    return {
+        'rmse': float(np.sqrt(np.mean(flat ** 2))) if len(flat) else None,
+        'rmse_by_horizon': {(h + 1) * 5: float(np.sqrt(np.mean(np.square(e)))) for h, e in enumerate(errors) if e},
+        'mape': float(np.mean(pct) * 100) if pct else None,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('start')
+    parser.add_argument('end')
+    parser.add_argument('--model', default=served_model_path())
+    parser.add_argument('--snapshots', default=SNAPSHOT_DIR)
+    parser.add_argument('--step-minutes', type=int, default=5)
+    parser.add_argument('--output')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    report = replay(args.start, args.end, ci.import_model(args.model), args.snapshots,
+                    timedelta(minutes=args.step_minutes))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
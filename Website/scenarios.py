@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from collect_inputs import tranform_data, make_prediction, FEATURE_ORDER
+
+DNI_FUTURE = FEATURE_ORDER.index('dni_future')
+TEMP_FUTURE = FEATURE_ORDER.index('temp_future')
+
+# Default grid: NWS temperature off by up to +/-5 F, cloud cover cutting or raising DNI
+TEMP_OFFSETS = np.arange(-5, 6, 1.0)
+DNI_SCALES = np.array([0.0, 0.25, 0.5, 0.75, 1.0, 1.25])
+
+def build_scenarios(input_list, temp_offsets=TEMP_OFFSETS, dni_scales=DNI_SCALES):
+    """Every combination of forecast temperature offset and DNI scale as one batch
+
+    Parameters
+    ----------
+    input_list: np.ndarray
+        Current untransformed (8, 18) input window
+    temp_offsets: array-like
+        Degrees F added to ``temp_future``
+    dni_scales: array-like
+        Factors applied to ``dni_future``
+
+    Returns
+    -------
+    np.ndarray
+        ``(len(temp_offsets) * len(dni_scales), 8, 18)`` windows, temperature
+        offset varying slowest
+    """
+    x = np.asarray(input_list, dtype=float)
+    t = np.asarray(temp_offsets, dtype=float)
+    d = np.asarray(dni_scales, dtype=float)
+    batch = np.broadcast_to(x, (len(t), len(d)) + x.shape).copy()
+    batch[:, :, TEMP_FUTURE] += t[:, None, None]
+    batch[:, :, DNI_FUTURE] = np.maximum(batch[:, :, DNI_FUTURE] * d[None, :, None], 0)
+    return batch.reshape((-1,) + x.shape)
+
+def run_scenarios(input_list, model, temp_offsets=TEMP_OFFSETS, dni_scales=DNI_SCALES):
+    """Scores all scenarios in a single batched ``predict``
+
+    Returns
+    -------
+    pd.DataFrame
+        Forecast load in MW indexed by (temp_offset, dni_scale), one column
+        per forecast horizon in minutes
+    """
+    batch = build_scenarios(input_list, temp_offsets, dni_scales)
+    prediction = make_prediction(tranform_data(batch), model)
+    index = pd.MultiIndex.from_product([np.asarray(temp_offsets, dtype=float), np.asarray(dni_scales, dtype=float)],
+                                       names=['temp_offset', 'dni_scale'])
+    return pd.DataFrame(prediction, index=index, columns=list(range(5, 5 * prediction.shape[1] + 1, 5)))
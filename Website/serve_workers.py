@@ -0,0 +1,120 @@
+"""Multi-worker forecast serving over one shared copy of the model weights
+
+The parent loads the model once. A bundle directory is used as is; an
+``.h5`` file is converted to a bundle in shared memory (``/dev/shm`` where
+available). Workers are spawned without TensorFlow and memory-map the
+bundle read-only, so every worker maps the same physical pages and an extra
+worker costs only its interpreter. Workers accept on a socket bound by the
+parent.
+
+    python serve_workers.py lstm_cv_final.bundle --workers 4 --port 8504
+
+    POST /predict  {"inputs": [[...18 values] x 8]}   or a list of windows
+    GET  /health
+"""
+import os
+import json
+import shutil
+import socket
+import tempfile
+import argparse
+import numpy as np
+import multiprocessing as mp
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from model_bundle import load_bundle, read_manifest, served_model_path
+
+SERVE_PORT = 8504
+
+def share_model(model_path):
+    """Returns a bundle directory workers can map, converting ``.h5`` weights once
+
+    Returns
+    -------
+    str, bool
+        Bundle path and whether it is a temporary copy the caller must remove
+    """
+    if os.path.isdir(model_path):
+        read_manifest(model_path)
+        return model_path, False
+    from collect_inputs import import_model, FEATURE_ORDER, SCALER_MEAN, SCALER_STD
+    from model_bundle import save_bundle
+    from inference_cache import model_version
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    path = tempfile.mkdtemp(prefix="lstm-bundle-", dir=root)
+    save_bundle(import_model(model_path), path, FEATURE_ORDER, SCALER_MEAN, SCALER_STD,
+                model_version=model_version(model_path))
+    return path, True
+
+class PredictHandler(BaseHTTPRequestHandler):
+    model = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_error(404)
+            return
+        self._send_json(200, {'pid': os.getpid(), 'model_version': self.model.version})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.send_error(404)
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            x = np.asarray(json.loads(body)['inputs'], dtype=float)
+            single = x.ndim == 2
+            x = x[None] if single else x
+            m = self.model
+            trans = (x - m.scaler_mean[:, None]) / m.scaler_std[:, None]
+            forecast = m.predict(trans) * m.scaler_std[0] + m.scaler_mean[0]
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(200, {'forecast': (forecast[0] if single else forecast).tolist()})
+
+    def log_message(self, format, *args):
+        pass
+
+def worker(sock, bundle_path):
+    """Worker process entry point: map the shared weights and serve on ``sock``"""
+    PredictHandler.model = load_bundle(bundle_path)
+    server = HTTPServer(sock.getsockname(), PredictHandler, bind_and_activate=False)
+    server.socket = sock
+    server.serve_forever()
+
+def serve(model_path, workers=2, port=SERVE_PORT):
+    bundle_path, temporary = share_model(model_path)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('', port))
+    sock.listen(128)
+
+    # Spawned workers start from a fresh interpreter without TensorFlow
+    ctx = mp.get_context('spawn')
+    procs = [ctx.Process(target=worker, args=(sock, bundle_path), daemon=True) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    finally:
+        for p in procs:
+            p.terminate()
+        sock.close()
+        if temporary:
+            shutil.rmtree(bundle_path, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('model', nargs='?', default=served_model_path())
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--port', type=int, default=SERVE_PORT)
+    args = parser.parse_args()
+    serve(args.model, args.workers, args.port)
@@ -0,0 +1,135 @@
+import os
+import glob
+import pickle
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing falls back to within one process
+    fcntl = None
+
+CACHE_DIR = "upstream_cache"
+# Results of buckets older than this are deleted, whatever their resource
+RESULT_TTL = timedelta(hours=1)
+
+def time_bucket(interval=timedelta(minutes=5), now=None):
+    """Floors ``now`` to a multiple of ``interval`` since midnight"""
+    now = now or datetime.now()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + ((now - midnight) // interval) * interval
+
+def resource_key(prefix, text):
+    """Short filesystem-safe key for a resource such as a URL"""
+    return f"{prefix}-{hashlib.sha1(text.encode()).hexdigest()[:12]}"
+
+class _Call():
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight():
+    """Coalesces concurrent fetches of the same resource and time bucket
+
+    Within a process, callers that arrive while a fetch is in flight wait for
+    it and share its result. Across worker processes an exclusive file lock
+    serializes the fetch, and the result is written next to the lock so
+    every later caller in the same bucket reads it instead of calling
+    upstream. The upstream request rate is therefore one per resource per
+    bucket regardless of the number of sessions or workers. Only successful
+    results are written: when ``fn`` raises, the next caller tries again.
+
+    Parameters
+    ----------
+    cache_dir: str
+        Directory for the lock and result files
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, resource, fn, *args, interval=timedelta(minutes=5), now=None, **kwargs):
+        """Returns ``fn(*args, **kwargs)`` for the current bucket of ``resource``
+
+        Parameters
+        ----------
+        resource: str
+            Name of the upstream resource, e.g. ``'nyiso-pal'``
+        fn: callable
+            Performs the actual fetch; its result must be picklable
+        interval: timedelta
+            Width of the time bucket a result is valid for
+        """
+        bucket = time_bucket(interval, now)
+        key = f"{resource}@{bucket:%Y%m%d%H%M}"
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(resource, key, bucket, fn, args, kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.event.set()
+            with self._lock:
+                del self._calls[key]
+
+    def _do_shared(self, resource, key, bucket, fn, args, kwargs):
+        path = os.path.join(self.cache_dir, f"{key}.pkl")
+        # One lock file per resource rather than per bucket, so locks never
+        # need deleting while another worker might hold them
+        with self.file_lock(resource):
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    return pickle.load(f)
+            result = fn(*args, **kwargs)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f)
+            os.replace(tmp, path)
+        self._prune(bucket - RESULT_TTL)
+        return result
+
+    def _prune(self, before):
+        """Removes result files of every resource whose bucket started before ``before``
+
+        Resource names may embed a date (``nyiso-pal-YYYYmmdd``), so files are
+        aged by the bucket in their name rather than matched by resource.
+        """
+        for old in glob.glob(os.path.join(self.cache_dir, "*@*.pkl")):
+            stamp = os.path.basename(old)[:-len(".pkl")].rsplit("@", 1)[1]
+            try:
+                if datetime.strptime(stamp, "%Y%m%d%H%M") < before:
+                    os.remove(old)
+            except (ValueError, OSError):
+                pass
+
+    @contextmanager
+    def file_lock(self, name):
+        """Exclusive lock on ``<cache_dir>/<name>.lock`` shared by all processes"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.cache_dir, f"{name}.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
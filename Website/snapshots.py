@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import bisect
+import threading
+import requests
+from datetime import datetime
+from single_flight import resource_key
+
+SNAPSHOT_DIR = "snapshots"
+
+def _snapshot_dir(root, url):
+    return os.path.join(root, resource_key("url", url))
+
+class SnapshotResponse():
+    """The parts of ``requests.Response`` the pipeline uses, served from a snapshot"""
+
+    def __init__(self, url, status_code, content, elapsed=0.0):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.elapsed_seconds = elapsed
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+class SnapshotRecorder():
+    """``HttpClient`` transport that saves every successful upstream response
+
+    Files are named ``<snapshots>/<url key>/<YYYYmmddTHHMMSS>-<ms>.bin`` by
+    the clock time they were fetched and how long the fetch took, which is
+    what ``SnapshotReplay`` needs to reproduce both content and timing.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, clock=datetime.now):
+        self.root = root
+        self.clock = clock
+        self.session = requests.Session()
+
+    def __call__(self, url, **kwargs):
+        fetched_at = self.clock()
+        start = time.perf_counter()
+        response = self.session.get(url, **kwargs)
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+        if response.ok:
+            directory = _snapshot_dir(self.root, url)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "url.txt"), "w") as f:
+                f.write(url)
+            path = os.path.join(directory, f"{fetched_at:%Y%m%dT%H%M%S}-{elapsed_ms}.bin")
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(response.content)
+            os.replace(tmp, path)
+        return response
+
+class SnapshotReplay():
+    """``HttpClient`` transport answering from recorded snapshots
+
+    A request at virtual time ``t`` gets the latest snapshot of that URL
+    fetched at or before ``t``, so data arrives in replay exactly as late as
+    it did live. URLs without such a snapshot get a 404.
+    """
+
+    def __init__(self, clock, root=SNAPSHOT_DIR):
+        self.clock = clock
+        self.root = root
+        self._index = {}
+        self._lock = threading.Lock()
+        self.upstream_seconds = 0.0
+
+    def _snapshots(self, url):
+        with self._lock:
+            if url not in self._index:
+                directory = _snapshot_dir(self.root, url)
+                entries = []
+                if os.path.isdir(directory):
+                    for name in os.listdir(directory):
+                        if name.endswith(".bin"):
+                            stamp, elapsed = name[:-4].split("-")
+                            entries.append((datetime.strptime(stamp, "%Y%m%dT%H%M%S"), int(elapsed) / 1000, name))
+                entries.sort()
+                self._index[url] = entries
+            return self._index[url]
+
+    def __call__(self, url, **kwargs):
+        entries = self._snapshots(url)
+        i = bisect.bisect_right(entries, (self.clock(), float("inf"), "")) - 1
+        if i < 0:
+            return SnapshotResponse(url, 404, b"")
+        _, elapsed, name = entries[i]
+        with open(os.path.join(_snapshot_dir(self.root, url), name), "rb") as f:
+            content = f.read()
+        # Recorded fetch time stands in for the network latency we skip
+        self.upstream_seconds += elapsed
+        return SnapshotResponse(url, 200, content, elapsed)
@@ -0,0 +1,195 @@
+"""Quota-aware Solcast client feeding the local 5 minute DNI cache
+
+Solcast's week-long forecast and live estimates are fetched on a schedule
+that spreads the remaining daily API calls over the rest of the daylight
+hours, then regridded and merged into ``solar_dni.parquet``. Every
+``solar_window`` lookup is served from that file, so dashboard requests
+never spend quota.
+
+    SOLCAST_API_KEY=... python solcast.py
+"""
+import os
+import json
+import time
+import logging
+import threading
+import pandas as pd
+from dateutil import tz
+from datetime import datetime, timedelta, timezone
+from collect_inputs import regrid_solar, single_flight, SOLAR_CACHE
+from http_client import HttpClient, UpstreamError, json_body
+
+SOLCAST_URL = "https://api.solcast.com.au"
+LAT, LON = '40.712775', '-74.005973'
+QUOTA_PATH = "solcast_quota.json"
+DAILY_LIMIT = 10                        # Hobbyist tier; overridden by the rate-limit headers
+CALLS_PER_REFRESH = 2                   # forecast + live estimates
+MIN_INTERVAL = timedelta(minutes=30)
+# Hours at the NYC site worth spending calls on; DNI is zero outside them
+DAYLIGHT = (5, 21)
+SITE_TZ = tz.gettz("America/New_York")
+
+logger = logging.getLogger(__name__)
+
+# Every attempt is billed against the quota, so failures are not retried
+http = HttpClient(retries=0)
+
+# The key goes in the Authorization header so it never appears in logged URLs
+FORECAST_URL = (f"{SOLCAST_URL}/world_radiation/forecasts?latitude={LAT}&longitude={LON}"
+                f"&hours=168&output_parameters=air_temp,dni,ghi&format=json")
+LIVE_URL = (f"{SOLCAST_URL}/data/live/radiation_and_weather?latitude={LAT}&longitude={LON}"
+            f"&output_parameters=air_temp,dni,ghi&format=json")
+
+def _periods(payload):
+    for key in ('forecasts', 'estimated_actuals'):
+        if key in payload:
+            return pd.DataFrame(payload[key])
+    raise UpstreamError(f"Unexpected Solcast response keys: {list(payload)}")
+
+def merge_solar(*frames, cache_path=SOLAR_CACHE):
+    """Overlays regridded periods on the cached series; later frames win
+
+    Returns
+    -------
+    pd.Series
+        The merged 5 minute DNI series that was written
+    """
+    dni = pd.read_parquet(cache_path)['dni'] if os.path.exists(cache_path) else pd.Series(dtype='float32')
+    for df in frames:
+        # Live periods are already for the NYC site; no stand-in shift
+        new = regrid_solar(df, shift=pd.Timedelta(0))
+        dni = new.combine_first(dni) if len(dni) else new
+    dni = dni.astype('float32').sort_index()
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    dni.rename_axis('period_end').to_frame('dni').to_parquet(tmp)
+    os.replace(tmp, cache_path)
+    return dni
+
+class SolcastClient():
+    """Refreshes the DNI cache from Solcast without exceeding the daily quota
+
+    Parameters
+    ----------
+    api_key: str, optional
+        Defaults to the ``SOLCAST_API_KEY`` environment variable
+    quota_path: str
+        JSON file with the calls used today (UTC) and the last refresh,
+        shared by every process
+    """
+
+    def __init__(self, api_key=None, quota_path=QUOTA_PATH, cache_path=SOLAR_CACHE, daily_limit=DAILY_LIMIT):
+        self.api_key = api_key or os.environ.get('SOLCAST_API_KEY')
+        self.quota_path = quota_path
+        self.cache_path = cache_path
+        self.daily_limit = daily_limit
+        self._thread = None
+
+    def _state(self, now):
+        state = {}
+        if os.path.exists(self.quota_path):
+            with open(self.quota_path) as f:
+                state = json.load(f)
+        today = now.astimezone(timezone.utc).strftime('%Y-%m-%d')
+        if state.get('date') != today:
+            # Solcast quotas reset at midnight UTC
+            state.update({'date': today, 'used': 0, 'limit': state.get('limit', self.daily_limit)})
+        return state
+
+    def _save_state(self, state):
+        tmp = f"{self.quota_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.quota_path)
+
+    def interval(self, state, now):
+        """Spacing that spends the remaining calls evenly over the rest of today's daylight"""
+        local = now.astimezone(SITE_TZ)
+        start = local.replace(hour=DAYLIGHT[0], minute=0, second=0, microsecond=0)
+        end = local.replace(hour=DAYLIGHT[1], minute=0, second=0, microsecond=0)
+        if local >= end:
+            return None
+        refreshes = (state['limit'] - state['used']) // CALLS_PER_REFRESH
+        if refreshes <= 0:
+            return None
+        return max(MIN_INTERVAL, (end - max(local, start)) / refreshes)
+
+    def next_refresh(self, now=None):
+        """When the next refresh is due, or None when today's budget is spent"""
+        now = now or datetime.now(timezone.utc)
+        state = self._state(now)
+        interval = self.interval(state, now)
+        if interval is None:
+            return None
+        last = state.get('last_refresh')
+        if last is None:
+            return now
+        local = now.astimezone(SITE_TZ)
+        return max(datetime.fromisoformat(last) + interval,
+                   local.replace(hour=DAYLIGHT[0], minute=0, second=0, microsecond=0))
+
+    def _get(self, url, state):
+        # Counted before the request: Solcast bills calls that time out or fail
+        state['used'] += 1
+        response = http.get(url, headers={'Authorization': f'Bearer {self.api_key}'})
+        headers = getattr(response, 'headers', {})
+        limit, remaining = headers.get('x-rate-limit'), headers.get('x-rate-limit-remaining')
+        if limit is not None and remaining is not None:
+            state['limit'] = int(limit)
+            state['used'] = int(limit) - int(remaining)
+        return json_body(response)
+
+    def refresh(self, now=None, force=False):
+        """Fetches the forecast and live estimates if due and merges them into the cache
+
+        Returns
+        -------
+        bool
+            Whether a refresh happened
+        """
+        if not self.api_key:
+            return False
+        now = now or datetime.now(timezone.utc)
+        # One process refreshes; the others see the updated state and skip
+        with single_flight.file_lock("solcast"):
+            due = self.next_refresh(now)
+            if not force and (due is None or due > now):
+                return False
+            state = self._state(now)
+            try:
+                forecast = _periods(self._get(FORECAST_URL, state))
+                live = _periods(self._get(LIVE_URL, state))
+            except UpstreamError as e:
+                if '429' in str(e):
+                    state['used'] = state['limit']
+                logger.warning("Solcast refresh failed: %s", e)
+                self._save_state(state)
+                return False
+            except Exception:
+                # Any attempt already made still counts against the quota
+                self._save_state(state)
+                raise
+            with single_flight.file_lock("solar-cache"):
+                merge_solar(forecast, live, cache_path=self.cache_path)
+            state['last_refresh'] = now.isoformat()
+            self._save_state(state)
+            logger.info("Solcast refreshed; %d of %d calls used today", state['used'], state['limit'])
+            return True
+
+    def run_forever(self, poll=60):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Solcast refresh failed")
+            time.sleep(poll)
+
+    def start(self):
+        """Runs the refresh schedule in a daemon thread"""
+        if self.api_key and self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, daemon=True)
+            self._thread.start()
+        return self
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    SolcastClient().run_forever()
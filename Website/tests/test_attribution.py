@@ -0,0 +1,34 @@
+import numpy as np
+from attribution import occlusion, TRAINING_MEAN
+from collect_inputs import tranform_data, make_prediction
+
+class LinearModel():
+    """Flatten and Dense in NumPy; counts predict calls"""
+
+    def __init__(self, seed=0):
+        self.weights = np.random.default_rng(seed).normal(0, 0.1, (8 * 18, 18))
+        self.calls = 0
+
+    def predict(self, x):
+        self.calls += 1
+        return np.asarray(x).reshape(len(x), -1) @ self.weights
+
+def _window(seed=1):
+    return TRAINING_MEAN[:, None] + np.random.default_rng(seed).normal(0, 1, (8, 18)) * 10
+
+def test_linear_attributions_add_up_to_the_forecast_change():
+    model = LinearModel()
+    x = _window()
+    attribution = occlusion(x, model)
+    assert attribution.shape == (8, 18)
+    assert model.calls == 1
+    baseline = np.repeat(TRAINING_MEAN[:, None], 18, axis=1)
+    change = make_prediction(tranform_data(x[None]), model)[0] - make_prediction(tranform_data(baseline[None]), model)[0]
+    np.testing.assert_allclose(attribution.sum(axis=0), change, rtol=1e-6)
+
+def test_a_row_at_its_baseline_gets_no_attribution():
+    x = _window()
+    x[6] = TRAINING_MEAN[6]
+    attribution = occlusion(x, LinearModel())
+    np.testing.assert_allclose(attribution[6], 0, atol=1e-9)
+    assert np.abs(attribution[0]).max() > 0
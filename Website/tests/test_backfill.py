@@ -0,0 +1,74 @@
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+import pytest
+from backfill import backfill as run_backfill, merge_month, load_checkpoint, checkpoint_key, WEATHER_STATION
+from data_store import load_history, write_partitions
+
+def _write_month(cache_dir, month, zone='N.Y.C.', load=6000.0, corrupt=False):
+    """Cached pal archive and LCD CSV for ``month``, as download() leaves them"""
+    month = pd.Period(month, 'M')
+    pal = os.path.join(cache_dir, f"pal-{month}.zip")
+    if corrupt:
+        with open(pal, 'wb') as f:
+            f.write(b'not a zip')
+    else:
+        with zipfile.ZipFile(pal, 'w') as z:
+            for day in pd.date_range(month.start_time, month.end_time, freq='D'):
+                rows = ['"Time Stamp","Time Zone","Name","PTID","Load"']
+                for t in pd.date_range(day, periods=288, freq='5T'):
+                    rows.append(f'"{t:%m/%d/%Y %H:%M:%S}","EST","{zone}","1","{load}"')
+                z.writestr(f"{day:%Y%m%d}pal.csv", '\n'.join(rows))
+    hours = pd.date_range(month.start_time, month.end_time, freq='H')
+    pd.DataFrame({'DATE': hours.strftime('%Y-%m-%dT%H:%M:%S'), 'HourlyDryBulbTemperature': '50'}).to_csv(
+        os.path.join(cache_dir, f"lcd-{WEATHER_STATION}-{month}.csv"), index=False)
+
+@pytest.fixture
+def workdir(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('cache')
+    return tmp_path
+
+def _run(**kwargs):
+    args = dict(store_dir='store', cache_dir='cache', checkpoint='checkpoint.json', workers=2, processes=2)
+    args.update(kwargs)
+    return run_backfill('2023-01', '2023-03', **args)
+
+def test_failed_month_is_skipped_and_retried(workdir):
+    _write_month('cache', '2023-01')
+    _write_month('cache', '2023-02', corrupt=True)
+    _write_month('cache', '2023-03')
+    assert _run() == ['2023-01', '2023-03']
+    assert load_checkpoint('checkpoint.json')[checkpoint_key('store', 'N.Y.C.', WEATHER_STATION)] == ['2023-01', '2023-03']
+    assert len(load_history('store')) == (31 + 31) * 288
+
+    # The next run only does the month that failed
+    _write_month('cache', '2023-02')
+    assert _run() == ['2023-02']
+    assert _run() == []
+    history = load_history('store')
+    assert len(history) == (31 + 28 + 31) * 288
+    assert (history['Load'] == 6000).all()
+
+def test_checkpoint_is_per_zone(workdir):
+    for m in ('2023-01', '2023-02', '2023-03'):
+        _write_month('cache', m)
+    assert len(_run()) == 3
+    # Another zone is its own run, even with the same cache and checkpoint file
+    for m in ('2023-01', '2023-02', '2023-03'):
+        _write_month('cache', m, zone='WEST', load=1500.0)
+    assert _run(zone='WEST', store_dir='west') == ['2023-01', '2023-02', '2023-03']
+    assert (load_history('west')['Load'] == 1500).all()
+
+def test_merge_keeps_dni_from_the_base_store(workdir):
+    month = pd.Period('2023-01', 'M')
+    index = pd.date_range(month.start_time, periods=10, freq='5T')
+    write_partitions(pd.DataFrame({'Timestamp': index, 'Load': 1.0, 'DNI': 200.0,
+                                   'HourlyDryBulbTemperature': 30.0}), 'base')
+    fresh = pd.DataFrame({'Timestamp': index, 'Load': 5000.0, 'HourlyDryBulbTemperature': np.nan})
+    merged = merge_month(fresh, month, 'store', base_dir='base')
+    assert (merged['Load'] == 5000).all()
+    assert (merged['DNI'] == 200).all()
+    # Missing backfilled values fall back to what was stored
+    assert (merged['HourlyDryBulbTemperature'] == 30).all()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+import collect_inputs as ci
+from single_flight import SingleFlight
+from correction import ResidualCorrector, N_FEATURES, INTERVAL
+from collect_inputs import SCALER_MEAN, SCALER_STD
+
+@pytest.fixture
+def corrector(monkeypatch, tmp_path):
+    monkeypatch.setattr(ci, 'single_flight', SingleFlight(str(tmp_path / 'locks')))
+    return ResidualCorrector(path=str(tmp_path / 'state.npz'), forgetting=1.0)
+
+def test_rls_recovers_a_linear_residual(corrector):
+    rng = np.random.default_rng(0)
+    theta = rng.normal(0, 0.5, N_FEATURES)
+    for _ in range(200):
+        phi = np.r_[1.0, rng.normal(0, 1, N_FEATURES - 1)]
+        corrector._update(0, phi, phi @ theta)
+    np.testing.assert_allclose(corrector.theta[0], theta, atol=1e-2)
+    assert corrector.n[0] == 200 and corrector.n[1:].sum() == 0
+
+def _forecast(issued, rng, horizon=18):
+    inputs = np.tile(SCALER_MEAN[:, None], (1, horizon)) + rng.normal(0, 1, (8, horizon)) * SCALER_STD[:, None]
+    raw = SCALER_MEAN[0] + rng.normal(0, 1, horizon) * SCALER_STD[0]
+    times = pd.date_range(end=issued, periods=horizon, freq='5T')
+    return times, inputs, raw
+
+def test_actuals_update_each_horizon_once(corrector):
+    rng = np.random.default_rng(1)
+    t0 = pd.Timestamp('2023-04-01 12:00')
+    times, inputs, raw = _forecast(t0, rng)
+    corrector.step(t0, times, inputs[0], inputs, raw)
+
+    # Three new actuals cover horizons 1-3 of the forecast issued at t0
+    later = pd.date_range(t0 + INTERVAL, periods=3, freq='5T')
+    corrector.load()
+    assert corrector.observe(later, [6000.0] * 3) == 3
+    assert corrector.observe(later, [6000.0] * 3) == 0
+    np.testing.assert_array_equal(corrector.n[:3], 1)
+    assert corrector.n[3:].sum() == 0
+
+def test_repeated_step_only_corrects(corrector):
+    rng = np.random.default_rng(2)
+    t = pd.Timestamp('2023-04-01 12:00')
+    for _ in range(30):
+        times, inputs, raw = _forecast(t, rng)
+        corrector.step(t, times, inputs[0] + 300, inputs, raw)
+        t += INTERVAL
+    with open(corrector.path, 'rb') as f:
+        before = f.read()
+
+    t -= INTERVAL
+    again = ResidualCorrector(path=corrector.path, forgetting=1.0)
+    first = corrector.step(t, times, inputs[0] + 300, inputs, raw)
+    second = again.step(t, times, inputs[0] + 300, inputs, raw)
+    np.testing.assert_allclose(first, second)
+    with open(corrector.path, 'rb') as f:
+        assert f.read() == before
+
+def test_corrections_wait_for_min_updates(corrector):
+    rng = np.random.default_rng(3)
+    corrector.theta[:] = 1.0
+    corrector.n[:] = corrector.min_updates - 1
+    corrector.n[0] = corrector.min_updates
+    _, inputs, raw = _forecast(pd.Timestamp('2023-04-01'), rng)
+    corrected, _ = corrector.correct(inputs, raw)
+    assert corrected[0] != raw[0]
+    np.testing.assert_array_equal(corrected[1:], raw[1:])
+
+def test_state_round_trip(corrector):
+    rng = np.random.default_rng(4)
+    t = pd.Timestamp('2023-04-01 12:00')
+    times, inputs, raw = _forecast(t, rng)
+    corrector.step(t, times, inputs[0], inputs, raw)
+    loaded = ResidualCorrector(path=corrector.path).load()
+    assert loaded.last_issued == t
+    assert list(loaded.pending) == [t]
+    np.testing.assert_array_equal(loaded.P, corrector.P)
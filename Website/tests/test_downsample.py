@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from downsample import lttb, minmax, downsample, point_budget
+
+def _series(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = pd.date_range('2022-07-01', periods=n, freq='5T')
+    y = np.sin(np.arange(n) / 200) * 1000 + rng.normal(0, 50, n) + 6000
+    return x, y
+
+def test_lttb_keeps_endpoints_and_budget():
+    x, y = _series()
+    idx = lttb(x, y, 300)
+    assert len(idx) == 300
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+def test_lttb_keeps_a_spike():
+    x, y = _series()
+    y[2345] = 20000
+    assert 2345 in lttb(x, y, 100)
+
+def test_lttb_short_series_unchanged():
+    x, y = _series(50)
+    np.testing.assert_array_equal(lttb(x, y, 100), np.arange(50))
+
+def test_minmax_keeps_every_bucket_extreme():
+    _, y = _series()
+    idx = minmax(y, 200)
+    assert len(idx) <= 200
+    assert np.all(np.diff(idx) > 0)
+    for bucket in np.array_split(np.arange(len(y)), 100):
+        assert bucket[np.argmin(y[bucket])] in idx
+        assert bucket[np.argmax(y[bucket])] in idx
+
+def test_downsample_tz_aware_matches_naive():
+    x, y = _series()
+    aware = pd.DataFrame({'Timestamp': x.tz_localize('America/New_York'), 'Load': y})
+    naive = pd.DataFrame({'Timestamp': x, 'Load': y})
+    a = downsample(aware, 'Timestamp', 'Load', width_px=400)
+    b = downsample(naive, 'Timestamp', 'Load', width_px=400)
+    assert len(a) == 400
+    np.testing.assert_array_equal(a['Load'].to_numpy(), b['Load'].to_numpy())
+
+def test_downsample_keeps_gaps():
+    x, y = _series(10000)
+    y[4000:4500] = np.nan
+    out = downsample(pd.DataFrame({'Timestamp': x, 'Load': y}), 'Timestamp', 'Load', width_px=100)
+    missing = out.index[out['Load'].isna()]
+    # One missing row marks the gap, between the last value before it and the first after
+    assert list(missing) == [out['Timestamp'].searchsorted(x[4000])]
+    assert out['Timestamp'].iloc[missing[0] - 1] == x[3999]
+    assert out['Timestamp'].iloc[missing[0] + 1] == x[4500]
+    assert len(out) <= point_budget(100) + 2
+
+def test_downsample_trims_leading_and_trailing_missing_values():
+    x, y = _series(1000)
+    y[:10] = np.nan
+    y[-10:] = np.nan
+    out = downsample(pd.DataFrame({'Timestamp': x, 'Load': y}), 'Timestamp', 'Load', width_px=100)
+    assert out['Load'].notna().all()
+    assert out['Timestamp'].iloc[0] == x[10] and out['Timestamp'].iloc[-1] == x[-11]
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from explorer_cube import build_cube, query_cube, save_cube, load_cube, temp_bin, DNI_BIN
+
+def _history(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'hour': rng.integers(0, 24, n),
+        'HourlyDryBulbTemperature': np.round(rng.uniform(-10, 110, n), 1),
+        'DNI': np.round(rng.uniform(-5, 1100, n), 1),
+        'Load': rng.uniform(3000, 9000, n),
+    })
+    # Readings exactly on the slider values are where off-by-one binning shows
+    df.loc[::10, 'HourlyDryBulbTemperature'] = np.round(df.loc[::10, 'HourlyDryBulbTemperature'])
+    df.loc[::7, 'DNI'] = DNI_BIN * np.round(df.loc[::7, 'DNI'] / DNI_BIN)
+    return df
+
+def _row_filter(df, temp_range, max_dni):
+    # The filter the page applied to the raw rows before the cube
+    return df[(df['HourlyDryBulbTemperature'] >= temp_range[0]) & (df['HourlyDryBulbTemperature'] <= temp_range[1])
+              & (df['DNI'] <= max_dni)]
+
+def test_query_selects_exactly_the_filtered_rows():
+    df = _history()
+    cube = build_cube(df)
+    for temp_range, max_dni in [((0, 100), 1000), ((40, 60), 300), ((75, 75), 500), ((85, 95), 0), ((0, 0), 25)]:
+        got = query_cube(cube, temp_range, max_dni)
+        sel = _row_filter(df, temp_range, max_dni)
+        want = (sel.assign(bin=temp_bin(sel['HourlyDryBulbTemperature']))
+                .groupby(['hour', 'bin'])[['HourlyDryBulbTemperature', 'DNI', 'Load']].mean().reset_index())
+        got = got.sort_values(['hour', 'HourlyDryBulbTemperature']).reset_index(drop=True)
+        want = want.sort_values(['hour', 'HourlyDryBulbTemperature']).reset_index(drop=True)
+        assert len(got) == len(want)
+        np.testing.assert_array_equal(got['hour'], want['hour'])
+        for column in ('HourlyDryBulbTemperature', 'DNI', 'Load'):
+            np.testing.assert_allclose(got[column], want[column])
+
+def test_bounds_are_inclusive_and_exact():
+    df = pd.DataFrame({'hour': [1] * 5, 'HourlyDryBulbTemperature': [74.9, 75.0, 75.5, 75.0, 75.0],
+                       'DNI': [100.0, 100.0, 100.0, 500.0, 500.1], 'Load': [1.0, 2.0, 3.0, 4.0, 5.0]})
+    got = query_cube(build_cube(df), (75, 75), 500)
+    assert got['Load'].tolist() == [3.0]     # the two rows at exactly 75 °F and DNI <= 500
+
+def test_rows_outside_the_sliders_are_dropped():
+    df = pd.DataFrame({'hour': [1, 1, 1], 'HourlyDryBulbTemperature': [-5.0, 120.0, 50.0],
+                       'DNI': [100.0, 100.0, 100.0], 'Load': [1.0, 2.0, 3.0]})
+    cube = build_cube(df)
+    assert cube['count'][:, :, -1].sum() == 1
+    assert query_cube(cube, (0, 100), 1000)['Load'].tolist() == [3.0]
+
+def test_save_and_load_round_trip(tmp_path):
+    cube = build_cube(_history(500))
+    path = str(tmp_path / 'cube.npz')
+    save_cube(cube, path)
+    loaded = load_cube(path)
+    for k in cube:
+        np.testing.assert_array_equal(loaded[k], cube[k])
@@ -0,0 +1,48 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from forecast_log import append_forecast
+from export import iter_export
+
+def _inputs(k):
+    return np.full((8, 18), float(k))
+
+@pytest.fixture
+def log_dir(tmp_path):
+    # Three forecasts a day for two days, issued around midnight
+    for k, t in enumerate(pd.date_range('2023-04-01 23:50', periods=6, freq='5T')):
+        append_forecast(t, _inputs(k), np.arange(18.0) + 100 * k, str(tmp_path))
+    return str(tmp_path)
+
+def test_logging_a_forecast_twice_overwrites_it(log_dir):
+    t = pd.Timestamp('2023-04-02 00:05')
+    append_forecast(t, _inputs(9), np.zeros(18), log_dir)
+    files = os.listdir(os.path.join(log_dir, 'date=2023-04-02'))
+    assert sorted(files) == ['20230402T0000.parquet', '20230402T0005.parquet', '20230402T0010.parquet',
+                             '20230402T0015.parquet']
+
+def test_csv_export_covers_the_half_open_range_in_chunks(log_dir):
+    chunks = list(iter_export('2023-04-01 23:55', '2023-04-02 00:10', 'csv', log_dir, batch_rows=10))
+    assert len(chunks) > 1
+    frame = pd.read_csv(io.BytesIO(b''.join(chunks)), parse_dates=['issued_at', 'target_time'])
+    assert sorted(frame['issued_at'].unique()) == list(pd.date_range('2023-04-01 23:55', periods=3, freq='5T'))
+    assert len(frame) == 3 * 18
+    first = frame[frame['issued_at'] == pd.Timestamp('2023-04-02 00:00')].sort_values('horizon_min')
+    np.testing.assert_array_equal(first['forecast_load'], np.arange(18.0) + 200)
+    assert first['target_time'].iloc[0] == pd.Timestamp('2023-04-02 00:05')
+
+def test_parquet_export_round_trips(log_dir):
+    data = b''.join(iter_export('2023-04-01', '2023-04-03', 'parquet', log_dir, batch_rows=10))
+    frame = pd.read_parquet(io.BytesIO(data))
+    assert len(frame) == 6 * 18
+    assert 'date' not in frame.columns
+
+def test_empty_range_still_has_a_header(log_dir):
+    data = b''.join(iter_export('2023-05-01', '2023-05-02', 'csv', log_dir))
+    assert data.decode().startswith('issued_at,target_time')
+
+def test_unknown_format_is_rejected(log_dir):
+    with pytest.raises(ValueError):
+        next(iter_export('2023-04-01', '2023-04-02', 'xlsx', log_dir))
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from feature_window import FeatureWindow
+
+def _column(k, n_rows=8):
+    return np.full(n_rows, float(k))
+
+def test_view_is_oldest_first_after_wrapping():
+    window = FeatureWindow(length=5)
+    times = pd.date_range('2023-04-01', periods=13, freq='5T')
+    for k, t in enumerate(times):
+        window.push(t, _column(k))
+        if k >= 4:
+            np.testing.assert_array_equal(window.view()[0], np.arange(k - 4, k + 1))
+    assert window.full
+    assert window.last_time == times[-1]
+    assert window.view().shape == (8, 5)
+
+def test_partial_window_is_not_full():
+    window = FeatureWindow(length=18)
+    for k in range(17):
+        window.push(pd.Timestamp('2023-04-01') + k * pd.Timedelta(minutes=5), _column(k))
+    assert not window.full
+
+def test_view_is_read_only():
+    window = FeatureWindow(length=3)
+    for k in range(3):
+        window.push(pd.Timestamp('2023-04-01'), _column(k))
+    with pytest.raises(ValueError):
+        window.view()[0, 0] = 1.0
+
+def test_reset_forgets_columns():
+    window = FeatureWindow(length=3)
+    for k in range(4):
+        window.push(pd.Timestamp('2023-04-01'), _column(k))
+    window.reset()
+    assert not window.full and window.last_time is None
+    for k in range(10, 13):
+        window.push(pd.Timestamp('2023-04-01'), _column(k))
+    np.testing.assert_array_equal(window.view()[0], [10, 11, 12])
+
+@pytest.fixture
+def live_source(monkeypatch, tmp_path):
+    """LiveFeatures inputs: 18 loads ending at ``end`` and hourly NWS values
+
+    DNI falls back to the static profile; only temperature is under test.
+    """
+    import collect_inputs as ci
+    import feature_window
+    monkeypatch.chdir(tmp_path)
+    now = pd.Timestamp('2023-04-01 12:00')
+    source = {'end': now, 'hours': {}}
+    monkeypatch.setattr(ci, 'clock', lambda: now.to_pydatetime())
+    monkeypatch.setattr(feature_window, '_temperature', {})
+    monkeypatch.setattr(feature_window, 'solar_window', lambda times: None)
+    monkeypatch.setattr(feature_window, 'weather_dict',
+                        lambda zone='J': {h.strftime('%m-%d-%Y HB%H'): v for h, v in source['hours'].items()})
+    monkeypatch.setattr(feature_window, 'return_NYISO_Load',
+                        lambda: (np.array(pd.date_range(end=source['end'], periods=18, freq='5T')), np.arange(18.0)))
+    return source
+
+def test_temperature_past_the_forecast_carries_the_last_value(live_source):
+    from feature_window import LiveFeatures
+    now = live_source['end']
+    live_source['hours'] = {now + pd.Timedelta(hours=h): 50.0 + h for h in range(-3, 1)}
+    inputs = LiveFeatures().update()
+    # Targets 90 minutes out run past 13:00, the last NWS hour plus the tolerance
+    np.testing.assert_array_equal(inputs[4, -6:], 50.0)
+    assert inputs[2, -1] == 50.0
+
+def test_no_temperature_near_the_window_fails(live_source):
+    from feature_window import LiveFeatures
+    from http_client import UpstreamError
+    live_source['hours'] = {live_source['end'] - pd.Timedelta(hours=h): 40.0 for h in (10, 11)}
+    with pytest.raises(UpstreamError):
+        LiveFeatures().update()
+
+def test_a_slow_zone_does_not_block_the_others(live_source, monkeypatch):
+    import threading
+    import feature_window
+    now = live_source['end']
+    hours = {(now + pd.Timedelta(hours=h)).strftime('%m-%d-%Y HB%H'): 50.0 for h in range(-3, 3)}
+    started, released, calls = threading.Event(), threading.Event(), []
+    def weather(zone='J'):
+        calls.append(zone)
+        if zone == 'K':
+            started.set()
+            assert released.wait(5)
+        return hours
+    monkeypatch.setattr(feature_window, 'weather_dict', weather)
+    slow = [threading.Thread(target=feature_window.zone_temperature_series, args=('K',)) for _ in range(2)]
+    for t in slow:
+        t.start()
+    assert started.wait(5)
+    # Zone J is served while the K request is still outstanding
+    assert feature_window.zone_temperature_series('J').iloc[0] == 50.0
+    released.set()
+    for t in slow:
+        t.join()
+    assert sorted(calls) == ['J', 'K']
@@ -0,0 +1,39 @@
+import threading
+from datetime import datetime
+from forecast_cache import ForecastCache, current_bucket
+
+def test_bucket_waits_for_the_publication_lag():
+    assert current_bucket(datetime(2023, 4, 1, 12, 5, 30)) == datetime(2023, 4, 1, 12, 0)
+    assert current_bucket(datetime(2023, 4, 1, 12, 6, 0)) == datetime(2023, 4, 1, 12, 5)
+
+def test_stale_entry_is_served_while_one_refresh_runs(tmp_path):
+    release = threading.Event()
+    calls = []
+    def compute():
+        calls.append(1)
+        if len(calls) > 1:
+            assert release.wait(5)
+        return {'prediction': len(calls)}
+    cache = ForecastCache(compute, str(tmp_path / 'cache.pkl'))
+    # Nothing on disk: the first request computes in the foreground
+    assert cache.get(datetime(2023, 4, 1, 12, 3))['prediction'] == 1
+
+    later = datetime(2023, 4, 1, 12, 8)
+    assert cache.get(later)['prediction'] == 1
+    assert cache.get(later)['prediction'] == 1
+    assert cache.refreshing
+    release.set()
+    cache._refresh_thread.join(5)
+    assert calls == [1, 1]
+    assert cache.get(later)['prediction'] == 2
+
+def test_last_good_entry_survives_a_restart_and_a_failed_refresh(tmp_path):
+    path = str(tmp_path / 'cache.pkl')
+    ForecastCache(lambda: {'prediction': 'old'}, path).get(datetime(2023, 4, 1, 12, 3))
+    def fail():
+        raise RuntimeError("NYISO down")
+    cache = ForecastCache(fail, path)
+    later = datetime(2023, 4, 1, 12, 8)
+    assert cache.get(later)['prediction'] == 'old'
+    cache._refresh_thread.join(5)
+    assert cache.get(later)['prediction'] == 'old'
@@ -0,0 +1,107 @@
+import pytest
+import http_client
+from http_client import CircuitBreaker, CircuitOpenError, HttpClient, LastGoodStore, UpstreamError
+from snapshots import SnapshotResponse
+
+class FakeClock():
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(http_client.time, 'monotonic', fake)
+    monkeypatch.setattr(http_client.time, 'sleep', lambda s: setattr(fake, 't', fake.t + s))
+    return fake
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+def test_breaker_lets_one_trial_through_when_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.t += 60
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.t += 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow() and breaker.allow()
+
+def _client(responses, **kwargs):
+    calls = []
+    def transport(url, timeout=None, **kw):
+        calls.append(timeout)
+        return responses.pop(0)
+    return HttpClient(transport=transport, **kwargs), calls
+
+def test_retries_server_errors_then_succeeds(clock):
+    client, calls = _client([SnapshotResponse('u', 503, b''), SnapshotResponse('u', 200, b'ok')])
+    assert client.get('http://example.test/a').content == b'ok'
+    assert len(calls) == 2
+
+def test_client_errors_are_not_retried(clock):
+    client, calls = _client([SnapshotResponse('u', 404, b'')] * 3)
+    with pytest.raises(UpstreamError):
+        client.get('http://example.test/a')
+    assert len(calls) == 1
+
+def test_open_circuit_skips_the_request(clock):
+    client, calls = _client([SnapshotResponse('u', 503, b'')] * 5, retries=0, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            client.get('http://example.test/a')
+    with pytest.raises(CircuitOpenError):
+        client.get('http://example.test/b')
+    assert len(calls) == 2
+
+def test_client_errors_do_not_open_the_circuit(clock):
+    client, calls = _client([SnapshotResponse('u', 404, b'')] * 5, failure_threshold=2)
+    for _ in range(5):
+        with pytest.raises(UpstreamError) as raised:
+            client.get('http://example.test/a')
+        assert not isinstance(raised.value, CircuitOpenError)
+    assert len(calls) == 5
+    assert client.breaker('http://example.test/a').state == "closed"
+
+def test_client_error_on_a_half_open_trial_frees_the_next_one(clock):
+    client, calls = _client([SnapshotResponse('u', 503, b''), SnapshotResponse('u', 404, b''),
+                             SnapshotResponse('u', 200, b'ok')], retries=0, failure_threshold=1)
+    with pytest.raises(UpstreamError):
+        client.get('http://example.test/a')
+    clock.t += 60
+    with pytest.raises(UpstreamError):
+        client.get('http://example.test/missing')
+    assert client.get('http://example.test/a').content == b'ok'
+    assert client.breaker('http://example.test/a').state == "closed"
+
+def test_timeouts_are_capped_by_the_deadline(clock):
+    client, calls = _client([SnapshotResponse('u', 200, b'ok')], timeout=(3.05, 10), deadline=4.0)
+    client.get('http://example.test/a')
+    assert calls == [(3.05, 4.0)]
+
+def test_malformed_json_is_an_upstream_error(clock):
+    client, _ = _client([SnapshotResponse('u', 200, b'<html>')])
+    with pytest.raises(UpstreamError):
+        client.get_json('http://example.test/a')
+
+def test_last_good_serves_the_previous_value(tmp_path):
+    store = LastGoodStore(str(tmp_path))
+    assert store.fetch('src', lambda: {'v': 1}) == {'v': 1}
+    def down():
+        raise UpstreamError('down')
+    assert store.fetch('src', down) == {'v': 1}
+    with pytest.raises(UpstreamError):
+        store.fetch('other', down)
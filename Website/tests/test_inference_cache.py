@@ -0,0 +1,54 @@
+import os
+import threading
+import numpy as np
+import pytest
+import inference_cache
+from inference_cache import InferenceCache
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    def fake_prediction(x, model):
+        calls.append(x)
+        return x.reshape(-1)[:18] * 2
+    monkeypatch.setattr(inference_cache, 'tranform_data', lambda inputs: np.asarray(inputs, dtype=float))
+    monkeypatch.setattr(inference_cache, 'make_prediction', fake_prediction)
+    return calls
+
+def _window(seed=0):
+    return np.random.default_rng(seed).normal(size=(8, 18))
+
+def test_disk_dir_created_on_first_write(tmp_path, calls):
+    disk_dir = str(tmp_path / "cache")
+    cache = InferenceCache(None, "v1", disk_dir=disk_dir)
+    assert not os.path.exists(disk_dir)
+    cache.predict(_window())
+    assert len([p for p in os.listdir(disk_dir) if p.endswith(".npy")]) == 1
+
+def test_hits_are_read_only(tmp_path, calls):
+    cache = InferenceCache(None, "v1", disk_dir=str(tmp_path))
+    first = cache.predict(_window())
+    with pytest.raises(ValueError):
+        first[0] = 0
+    second = cache.predict(_window())
+    np.testing.assert_array_equal(first, second)
+    assert len(calls) == 1
+    # A second process finds the forecast on disk, also read-only
+    loaded = InferenceCache(None, "v1", disk_dir=str(tmp_path)).predict(_window())
+    assert not loaded.flags.writeable
+    assert len(calls) == 1
+
+def test_concurrent_misses_run_the_model_once(calls):
+    cache = InferenceCache(None, "v1")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.predict(_window()))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+def test_version_is_part_of_the_key():
+    a, b = InferenceCache(None, "v1"), InferenceCache(None, "v2")
+    assert a.key(_window()) != b.key(_window())
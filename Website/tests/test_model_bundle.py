@@ -0,0 +1,179 @@
+import os
+import json
+import numpy as np
+import pytest
+from model_bundle import (BundleError, BUNDLE_FORMAT, BUNDLE_VERSION, CURRENT_BUNDLE, load_bundle,
+                          set_current, served_model_path, _sha256)
+
+# The (8, 18) input window is fed as 8 steps of 18 values, as in create_LSTM_model
+STEPS, FEATURES = 8, 18
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+def reference_lstm(x, kernel, recurrent, bias):
+    """Textbook LSTM, one sample and one gate at a time (Keras gate order i, f, c, o)"""
+    units = recurrent.shape[0]
+    W = np.split(kernel, 4, axis=1); U = np.split(recurrent, 4, axis=1); b = np.split(bias, 4)
+    out = []
+    for sample in x:
+        h = np.zeros(units); c = np.zeros(units)
+        for x_t in sample:
+            i = _sigmoid(x_t @ W[0] + h @ U[0] + b[0])
+            f = _sigmoid(x_t @ W[1] + h @ U[1] + b[1])
+            g = np.tanh(x_t @ W[2] + h @ U[2] + b[2])
+            o = _sigmoid(x_t @ W[3] + h @ U[3] + b[3])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+        out.append(h)
+    return np.array(out)
+
+def write_bundle(path, layers, input_shape=(STEPS, FEATURES)):
+    """Bundle directory from ``(spec, {name: array})`` pairs, as save_bundle lays it out"""
+    os.makedirs(os.path.join(path, 'weights'))
+    specs = []
+    for i, (spec, weights) in enumerate(layers):
+        spec = dict(spec, name=f"{spec['type']}_{i}", weights={})
+        for name, value in weights.items():
+            file = f"{i}_{name}.npy"
+            np.save(os.path.join(path, 'weights', file), value.astype(np.float32))
+            spec['weights'][name] = {'file': file, 'shape': list(value.shape), 'dtype': 'float32',
+                                     'sha256': _sha256(os.path.join(path, 'weights', file))}
+        specs.append(spec)
+    manifest = {'format': BUNDLE_FORMAT, 'format_version': BUNDLE_VERSION, 'model_version': 'test',
+                'input_shape': list(input_shape), 'feature_order': [f'f{i}' for i in range(STEPS)],
+                'scaler': {'mean': [0.0] * STEPS, 'std': [1.0] * STEPS}, 'layers': specs}
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+    return path
+
+def _lstm_weights(rng, units=16):
+    return {'kernel': rng.normal(0, 0.3, (FEATURES, 4 * units)),
+            'recurrent_kernel': rng.normal(0, 0.3, (units, 4 * units)),
+            'bias': rng.normal(0, 0.1, 4 * units)}
+
+LSTM_SPEC = {'type': 'lstm', 'units': 16, 'activation': 'tanh', 'recurrent_activation': 'sigmoid'}
+DENSE_SPEC = {'type': 'dense', 'units': 18, 'activation': 'linear'}
+
+def test_lstm_dense_matches_reference(tmp_path):
+    rng = np.random.default_rng(0)
+    lstm = _lstm_weights(rng)
+    dense = {'kernel': rng.normal(0, 0.3, (16, 18)), 'bias': rng.normal(0, 0.1, 18)}
+    model = load_bundle(write_bundle(str(tmp_path / 'm.bundle'), [(LSTM_SPEC, lstm), (DENSE_SPEC, dense)]), verify=True)
+
+    x = rng.normal(0, 1, (5, STEPS, FEATURES)).astype(np.float32)
+    f32 = {k: v.astype(np.float32) for k, v in lstm.items()}
+    h = reference_lstm(x, f32['kernel'], f32['recurrent_kernel'], f32['bias'])
+    want = h @ dense['kernel'].astype(np.float32) + dense['bias'].astype(np.float32)
+    np.testing.assert_allclose(model.predict(x), want, rtol=1e-4, atol=1e-5)
+
+def test_batch_rows_are_independent(tmp_path):
+    rng = np.random.default_rng(1)
+    model = load_bundle(write_bundle(str(tmp_path / 'm.bundle'), [(LSTM_SPEC, _lstm_weights(rng))]))
+    x = rng.normal(0, 1, (4, STEPS, FEATURES))
+    batched = model.predict(x)
+    for i in range(len(x)):
+        np.testing.assert_allclose(model.predict(x[i:i + 1])[0], batched[i], rtol=1e-5, atol=1e-6)
+
+def test_wrong_input_shape_is_rejected(tmp_path):
+    model = load_bundle(write_bundle(str(tmp_path / 'm.bundle'), [(LSTM_SPEC, _lstm_weights(np.random.default_rng(2)))]))
+    with pytest.raises(BundleError):
+        model.predict(np.zeros((1, STEPS, FEATURES - 1)))
+
+def test_mismatched_layers_are_rejected(tmp_path):
+    rng = np.random.default_rng(3)
+    dense = {'kernel': rng.normal(0, 0.3, (32, 18)), 'bias': np.zeros(18)}
+    path = write_bundle(str(tmp_path / 'm.bundle'), [(LSTM_SPEC, _lstm_weights(rng)), (DENSE_SPEC, dense)])
+    with pytest.raises(BundleError):
+        load_bundle(path)
+
+@pytest.mark.parametrize('name, shape', [('recurrent_kernel', (16, 32)), ('bias', (60,))])
+def test_wrong_recurrent_weights_are_rejected(tmp_path, name, shape):
+    lstm = _lstm_weights(np.random.default_rng(3))
+    lstm[name] = np.zeros(shape)
+    with pytest.raises(BundleError, match=name):
+        load_bundle(write_bundle(str(tmp_path / 'm.bundle'), [(LSTM_SPEC, lstm)]))
+
+def test_output_width_must_match_the_forecast_window(tmp_path):
+    rng = np.random.default_rng(3)
+    dense = {'kernel': rng.normal(0, 0.3, (16, 12)), 'bias': np.zeros(12)}
+    path = write_bundle(str(tmp_path / 'm.bundle'), [(LSTM_SPEC, _lstm_weights(rng)), (dict(DENSE_SPEC, units=12), dense)])
+    load_bundle(path, forecast_window=12)
+    with pytest.raises(BundleError):
+        load_bundle(path, forecast_window=18)
+
+def test_corrupt_weights_fail_verification(tmp_path):
+    path = write_bundle(str(tmp_path / 'm.bundle'), [(LSTM_SPEC, _lstm_weights(np.random.default_rng(4)))])
+    np.save(os.path.join(path, 'weights', '0_bias.npy'), np.ones(64, dtype=np.float32))
+    load_bundle(path)
+    with pytest.raises(BundleError):
+        load_bundle(path, verify=True)
+
+def reference_gru(x, kernel, recurrent, bias, reset_after=True):
+    """Textbook GRU, one sample at a time (Keras gate order z, r, h)"""
+    units = recurrent.shape[0]
+    W = np.split(kernel, 3, axis=1); U = np.split(recurrent, 3, axis=1)
+    b_in, b_rec = (np.split(bias[0], 3), np.split(bias[1], 3)) if reset_after else (np.split(bias, 3), [0, 0, 0])
+    out = []
+    for sample in x:
+        h = np.zeros(units)
+        for x_t in sample:
+            z = _sigmoid(x_t @ W[0] + b_in[0] + h @ U[0] + b_rec[0])
+            r = _sigmoid(x_t @ W[1] + b_in[1] + h @ U[1] + b_rec[1])
+            if reset_after:
+                hh = np.tanh(x_t @ W[2] + b_in[2] + r * (h @ U[2] + b_rec[2]))
+            else:
+                hh = np.tanh(x_t @ W[2] + b_in[2] + (r * h) @ U[2])
+            h = z * h + (1 - z) * hh
+        out.append(h)
+    return np.array(out)
+
+@pytest.mark.parametrize('reset_after', [True, False])
+def test_gru_matches_reference(tmp_path, reset_after):
+    rng = np.random.default_rng(5)
+    units = 12
+    gru = {'kernel': rng.normal(0, 0.3, (FEATURES, 3 * units)),
+           'recurrent_kernel': rng.normal(0, 0.3, (units, 3 * units)),
+           'bias': rng.normal(0, 0.1, (2, 3 * units) if reset_after else 3 * units)}
+    spec = {'type': 'gru', 'units': units, 'activation': 'tanh', 'recurrent_activation': 'sigmoid',
+            'reset_after': reset_after}
+    model = load_bundle(write_bundle(str(tmp_path / 'm.bundle'), [(spec, gru)]))
+
+    x = rng.normal(0, 1, (5, STEPS, FEATURES)).astype(np.float32)
+    f32 = {k: v.astype(np.float32) for k, v in gru.items()}
+    want = reference_gru(x, f32['kernel'], f32['recurrent_kernel'], f32['bias'], reset_after)
+    np.testing.assert_allclose(model.predict(x), want, rtol=1e-4, atol=1e-5)
+
+def test_gru_bias_must_match_reset_after(tmp_path):
+    rng = np.random.default_rng(5)
+    gru = {'kernel': rng.normal(0, 0.3, (FEATURES, 36)), 'recurrent_kernel': rng.normal(0, 0.3, (12, 36)),
+           'bias': rng.normal(0, 0.1, 36)}
+    spec = {'type': 'gru', 'units': 12, 'activation': 'tanh', 'recurrent_activation': 'sigmoid',
+            'reset_after': True}
+    with pytest.raises(BundleError, match='bias'):
+        load_bundle(write_bundle(str(tmp_path / 'm.bundle'), [(spec, gru)]))
+
+def test_flatten_dense_student(tmp_path):
+    rng = np.random.default_rng(6)
+    dense = {'kernel': rng.normal(0, 0.1, (STEPS * FEATURES, 18)), 'bias': rng.normal(0, 0.1, 18)}
+    model = load_bundle(write_bundle(str(tmp_path / 'm.bundle'), [({'type': 'flatten'}, {}), (DENSE_SPEC, dense)]))
+    x = rng.normal(0, 1, (3, STEPS, FEATURES)).astype(np.float32)
+    want = x.reshape(3, -1) @ dense['kernel'].astype(np.float32) + dense['bias'].astype(np.float32)
+    np.testing.assert_allclose(model.predict(x), want, rtol=1e-4, atol=1e-5)
+
+def test_set_current_swaps_the_link(tmp_path):
+    lstm = _lstm_weights(np.random.default_rng(7))
+    old = write_bundle(str(tmp_path / 'old.bundle'), [(LSTM_SPEC, lstm)])
+    new = write_bundle(str(tmp_path / 'new.bundle'), [(LSTM_SPEC, lstm)])
+    set_current(old, str(tmp_path))
+    set_current(new, str(tmp_path))
+    assert os.path.realpath(served_model_path(str(tmp_path))) == os.path.realpath(new)
+
+def test_set_current_moves_a_copied_bundle_aside(tmp_path):
+    lstm = _lstm_weights(np.random.default_rng(7))
+    # Older deployments copied the bundle into place
+    copied = write_bundle(str(tmp_path / CURRENT_BUNDLE), [(LSTM_SPEC, lstm)])
+    new = write_bundle(str(tmp_path / 'new.bundle'), [(LSTM_SPEC, lstm)])
+    link = set_current(new, str(tmp_path))
+    assert os.path.islink(link) and os.path.realpath(link) == os.path.realpath(new)
+    assert os.path.isfile(os.path.join(f"{copied}.test", 'manifest.json'))
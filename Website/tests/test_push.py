@@ -0,0 +1,64 @@
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import push
+from push import Broker, KEEPALIVE, forecast_event
+
+def _forecast(minute):
+    issued_at = pd.Timestamp('2023-04-01 12:00') + pd.Timedelta(minutes=minute)
+    return {'issued_at': issued_at, 'inputs': np.full((8, 18), float(minute)), 'prediction': np.arange(18.0)}
+
+def _event(minute):
+    f = _forecast(minute)
+    return forecast_event(f['issued_at'], f['inputs'], f['prediction'])
+
+def _data(message):
+    return json.loads(message.decode().split('data: ', 1)[1])
+
+def test_slow_subscriber_loses_its_oldest_events():
+    async def go():
+        broker = Broker(queue_size=2)
+        queue = broker.subscribe()
+        for minute in (0, 5, 10):
+            broker.publish(_event(minute))
+        return broker, [_data(queue.get_nowait())['issued_at'] for _ in range(queue.qsize())]
+    broker, received = asyncio.run(go())
+    assert received == ['2023-04-01T12:05:00', '2023-04-01T12:10:00']
+    assert broker.dropped == 1
+
+def test_new_subscriber_gets_the_latest_event_and_idle_ones_a_keepalive():
+    async def go():
+        broker = Broker()
+        broker.publish(_event(0))
+        late = broker.subscribe()
+        idle = broker.subscribe()
+        idle.get_nowait()
+        broker.keepalive()
+        return late.get_nowait(), late.empty(), idle.get_nowait()
+    latest, drained, keepalive = asyncio.run(go())
+    assert _data(latest)['issued_at'] == '2023-04-01T12:00:00'
+    assert drained and keepalive == KEEPALIVE
+
+class _Stop(Exception):
+    pass
+
+def test_producer_publishes_each_issue_time_once(monkeypatch):
+    # NYISO's file was late at 12:05, so that step sees 12:00 again
+    issued = iter([0, 0, 5, 5, 10])
+    calls = []
+    def compute():
+        calls.append(1)
+        return _forecast(next(issued))
+    async def sleep(seconds):
+        if len(calls) == 5:
+            raise _Stop
+    monkeypatch.setattr(push.asyncio, 'sleep', sleep)
+
+    broker = Broker()
+    published = []
+    broker.publish = lambda message: published.append(_data(message)['issued_at'])
+    with pytest.raises(_Stop):
+        asyncio.run(push._produce(broker, compute))
+    assert published == ['2023-04-01T12:00:00', '2023-04-01T12:05:00', '2023-04-01T12:10:00']
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+import collect_inputs as ci
+import feature_window
+from replay import VirtualClock, forecast_error, replaying
+
+def test_forecast_error_by_horizon():
+    issued = pd.Timestamp('2023-04-01 12:00')
+    forecasts = {issued: np.array([110.0, 220.0, 300.0])}
+    # No actual has arrived yet for the third step
+    actuals = {issued + timedelta(minutes=5): 100.0, issued + timedelta(minutes=10): 200.0}
+    report = forecast_error(forecasts, actuals)
+    assert report['rmse_by_horizon'] == {5: 10.0, 10: 20.0}
+    assert report['rmse'] == pytest.approx(np.sqrt((10 ** 2 + 20 ** 2) / 2))
+    assert report['mape'] == pytest.approx(10.0)
+
+def test_no_forecasts_gives_empty_errors():
+    assert forecast_error({}, {}) == {'rmse': None, 'rmse_by_horizon': {}, 'mape': None}
+
+def test_replaying_restores_the_live_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(feature_window, '_temperature', {'J': ('live', None)})
+    saved = ci.clock, ci.http, ci.single_flight, ci.last_good
+    clock = VirtualClock('2023-04-01 12:00')
+    with replaying(clock, str(tmp_path)):
+        assert ci.clock() == datetime(2023, 4, 1, 12, 0)
+        assert feature_window._temperature == {}
+        feature_window._temperature['J'] = ('replay', None)
+        clock.advance(timedelta(minutes=5))
+        assert ci.clock() == datetime(2023, 4, 1, 12, 5)
+    assert (ci.clock, ci.http, ci.single_flight, ci.last_good) == saved
+    assert feature_window._temperature == {'J': ('live', None)}
@@ -0,0 +1,36 @@
+import numpy as np
+from scenarios import build_scenarios, run_scenarios, DNI_FUTURE, TEMP_FUTURE
+
+class CountingModel():
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, x):
+        self.calls += 1
+        # Standardized future temperature plus DNI, one value per horizon
+        return x[:, TEMP_FUTURE, :] + x[:, DNI_FUTURE, :]
+
+def _window():
+    x = np.zeros((8, 18))
+    x[TEMP_FUTURE] = 60.0
+    x[DNI_FUTURE] = np.linspace(0, 500, 18)
+    return x
+
+def test_grid_varies_only_the_forecast_rows():
+    x = _window()
+    batch = build_scenarios(x, [-2.0, 0.0, 3.0], [0.0, 0.5])
+    assert batch.shape == (6, 8, 18)
+    # Temperature offset varies slowest
+    np.testing.assert_array_equal(batch[:, TEMP_FUTURE, 0], [58, 58, 60, 60, 63, 63])
+    np.testing.assert_array_equal(batch[1, DNI_FUTURE], x[DNI_FUTURE] * 0.5)
+    others = [r for r in range(8) if r not in (TEMP_FUTURE, DNI_FUTURE)]
+    np.testing.assert_array_equal(batch[:, others], np.broadcast_to(x[others], (6, len(others), 18)))
+
+def test_all_scenarios_are_scored_in_one_call():
+    model = CountingModel()
+    frame = run_scenarios(_window(), model, [-1.0, 1.0], [0.5, 1.0])
+    assert model.calls == 1
+    assert list(frame.index) == [(-1.0, 0.5), (-1.0, 1.0), (1.0, 0.5), (1.0, 1.0)]
+    assert list(frame.columns) == list(range(5, 95, 5))
+    # Warmer forecasts and more sun both raise this model's output
+    assert frame.loc[(1.0, 1.0), 90] > frame.loc[(-1.0, 1.0), 90] > frame.loc[(-1.0, 0.5), 90]
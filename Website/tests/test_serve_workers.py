@@ -0,0 +1,50 @@
+import json
+import threading
+import urllib.request
+import urllib.error
+from http.server import HTTPServer
+import numpy as np
+import pytest
+from model_bundle import load_bundle
+from serve_workers import PredictHandler, share_model
+from test_model_bundle import DENSE_SPEC, FEATURES, STEPS, write_bundle
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    dense = {'kernel': rng.normal(0, 0.1, (STEPS * FEATURES, 18)), 'bias': rng.normal(0, 0.1, 18)}
+    path = write_bundle(str(tmp_path / 'm.bundle'), [({'type': 'flatten'}, {}), (DENSE_SPEC, dense)])
+    bundle, temporary = share_model(path)
+    assert (bundle, temporary) == (path, False)
+    model = load_bundle(bundle)
+    monkeypatch.setattr(PredictHandler, 'model', model)
+    httpd = HTTPServer(('127.0.0.1', 0), PredictHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", model
+    httpd.shutdown()
+    httpd.server_close()
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), method='POST')
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.load(response)
+
+def test_predict_single_and_batched_windows(server):
+    url, model = server
+    x = np.random.default_rng(1).normal(0, 1, (3, STEPS, FEATURES))
+    want = model.predict(x) * model.scaler_std[0] + model.scaler_mean[0]
+    batched = _post(f"{url}/predict", {'inputs': x.tolist()})['forecast']
+    np.testing.assert_allclose(batched, want, rtol=1e-5, atol=1e-5)
+    single = _post(f"{url}/predict", {'inputs': x[0].tolist()})['forecast']
+    np.testing.assert_allclose(single, want[0], rtol=1e-5, atol=1e-5)
+
+def test_bad_requests(server):
+    url, model = server
+    with pytest.raises(urllib.error.HTTPError) as raised:
+        _post(f"{url}/predict", {'window': []})
+    assert raised.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as raised:
+        _post(f"{url}/predict", {'inputs': np.zeros((STEPS, FEATURES - 1)).tolist()})
+    assert raised.value.code == 400
+    with urllib.request.urlopen(f"{url}/health", timeout=5) as response:
+        assert json.load(response)['model_version'] == model.version
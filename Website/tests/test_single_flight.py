@@ -0,0 +1,55 @@
+import os
+import threading
+from datetime import datetime, timedelta
+import pytest
+from single_flight import SingleFlight, time_bucket
+
+NOW = datetime(2023, 4, 1, 12, 3)
+
+def test_time_bucket_floors_to_the_interval():
+    assert time_bucket(timedelta(minutes=5), NOW) == datetime(2023, 4, 1, 12, 0)
+    assert time_bucket(timedelta(hours=1), datetime(2023, 4, 1, 12, 59)) == datetime(2023, 4, 1, 12, 0)
+
+def test_concurrent_callers_share_one_fetch(tmp_path):
+    flight = SingleFlight(str(tmp_path))
+    calls, release = [], threading.Event()
+    def fetch():
+        calls.append(1)
+        assert release.wait(5)
+        return {'load': 6000}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('nyiso-pal', fetch, now=NOW)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert results == [{'load': 6000}] * 8
+
+def test_result_is_reused_within_the_bucket_only(tmp_path):
+    calls = []
+    def fetch():
+        calls.append(1)
+        return len(calls)
+    # A second worker process sees the first's result on disk
+    assert SingleFlight(str(tmp_path)).do('nyiso-pal', fetch, now=NOW) == 1
+    assert SingleFlight(str(tmp_path)).do('nyiso-pal', fetch, now=NOW + timedelta(minutes=1)) == 1
+    assert SingleFlight(str(tmp_path)).do('nyiso-pal', fetch, now=NOW + timedelta(minutes=5)) == 2
+    assert SingleFlight(str(tmp_path)).do('nws-J', fetch, now=NOW) == 3
+
+def test_failures_are_not_cached(tmp_path):
+    flight = SingleFlight(str(tmp_path))
+    def fail():
+        raise RuntimeError("upstream down")
+    with pytest.raises(RuntimeError):
+        flight.do('nyiso-pal', fail, now=NOW)
+    assert flight.do('nyiso-pal', lambda: 'ok', now=NOW) == 'ok'
+
+def test_old_buckets_are_pruned(tmp_path):
+    flight = SingleFlight(str(tmp_path))
+    flight.do('nyiso-pal-20230401', lambda: 1, now=NOW)
+    flight.do('nws-J', lambda: 2, now=NOW + timedelta(hours=2))
+    results = sorted(p for p in os.listdir(tmp_path) if p.endswith('.pkl'))
+    assert results == ['nws-J@202304011400.pkl']
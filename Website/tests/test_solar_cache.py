@@ -0,0 +1,30 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import collect_inputs as ci
+from single_flight import SingleFlight
+
+@pytest.fixture
+def paths(monkeypatch, tmp_path):
+    monkeypatch.setattr(ci, 'single_flight', SingleFlight(str(tmp_path / 'locks')))
+    csv = str(tmp_path / 'solar.csv')
+    periods = pd.date_range('2023-06-01 12:00', periods=12, freq='30T', tz='UTC')
+    pd.DataFrame({'period_end': periods.strftime('%Y-%m-%dT%H:%M:%SZ'), 'dni': 100.0}).to_csv(csv, index=False)
+    return csv, str(tmp_path / 'dni.parquet')
+
+def test_cache_is_seeded_from_the_csv(paths):
+    csv, cache = paths
+    series = ci.load_solar_series(csv, cache)
+    assert os.path.exists(cache)
+    assert (series == 100).all()
+
+def test_newer_csv_does_not_overwrite_merged_values(paths):
+    csv, cache = paths
+    series = ci.load_solar_series(csv, cache).copy()
+    # Live data merged in by solcast.py, then the stand-in CSV is touched
+    series[:] = 700.0
+    series.rename_axis('period_end').to_frame('dni').to_parquet(cache)
+    later = os.path.getmtime(cache) + 60
+    os.utime(csv, (later, later))
+    assert (ci.load_solar_series(csv, cache) == 700).all()
@@ -0,0 +1,71 @@
+import json
+import time
+import requests
+import pytest
+from datetime import datetime, timezone, timedelta
+import solcast
+from http_client import HttpClient
+from single_flight import SingleFlight
+from snapshots import SnapshotResponse
+from solcast import SolcastClient, MIN_INTERVAL
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    # A UTC server, where local hours are 4-5 hours off New York's
+    monkeypatch.setenv('TZ', 'UTC')
+    time.tzset()
+    monkeypatch.setattr(solcast, 'single_flight', SingleFlight(str(tmp_path / 'locks')))
+    yield SolcastClient(api_key='test', quota_path=str(tmp_path / 'quota.json'),
+                        cache_path=str(tmp_path / 'dni.parquet'), daily_limit=10)
+    monkeypatch.undo()
+    time.tzset()
+
+def _transport(monkeypatch, fn):
+    monkeypatch.setattr(solcast, 'http', HttpClient(retries=0, transport=fn))
+
+def test_interval_spreads_calls_over_new_york_daylight(client):
+    state = {'limit': 10, 'used': 0}
+    # 10:00 UTC is 06:00 EDT: 15 daylight hours left for 5 refreshes
+    assert client.interval(state, utc(2023, 6, 1, 10)) == timedelta(hours=3)
+    # 23:00 UTC is 19:00 EDT, still daylight, but never closer than MIN_INTERVAL
+    assert client.interval(state, utc(2023, 6, 1, 23)) == MIN_INTERVAL
+    # 01:30 UTC is 21:30 EDT: today's window is over
+    assert client.interval(state, utc(2023, 6, 2, 1, 30)) is None
+    assert client.interval({'limit': 10, 'used': 9}, utc(2023, 6, 1, 10)) is None
+
+def test_next_refresh_waits_for_new_york_morning(client):
+    with open(client.quota_path, 'w') as f:
+        json.dump({'date': '2023-06-01', 'used': 2, 'limit': 10,
+                   'last_refresh': utc(2023, 6, 1, 1).isoformat()}, f)
+    # 07:00 UTC is 03:00 EDT; the first refresh is due at 05:00 EDT (09:00 UTC)
+    assert client.next_refresh(utc(2023, 6, 1, 7)) == utc(2023, 6, 1, 9)
+
+def test_a_failed_call_still_counts_against_the_quota(client, monkeypatch):
+    def timeout(url, **kwargs):
+        raise requests.Timeout("read timed out")
+    _transport(monkeypatch, timeout)
+    now = utc(2023, 6, 1, 15)
+    assert client.refresh(now) is False
+    with open(client.quota_path) as f:
+        state = json.load(f)
+    assert state['used'] == 1 and 'last_refresh' not in state
+
+def test_rate_limit_headers_set_the_count(client, monkeypatch):
+    body = json.dumps({'forecasts': [{'period_end': '2023-06-01T15:30:00.0000000Z', 'dni': 500.0}]}).encode()
+    def ok(url, **kwargs):
+        response = SnapshotResponse(url, 200, body)
+        response.headers = {'x-rate-limit': '50', 'x-rate-limit-remaining': '40'}
+        return response
+    _transport(monkeypatch, ok)
+    assert client.refresh(utc(2023, 6, 1, 15)) is True
+    with open(client.quota_path) as f:
+        state = json.load(f)
+    assert (state['used'], state['limit']) == (10, 50)
+
+def test_429_spends_the_rest_of_the_day(client, monkeypatch):
+    _transport(monkeypatch, lambda url, **kwargs: SnapshotResponse(url, 429, b''))
+    assert client.refresh(utc(2023, 6, 1, 15)) is False
+    assert client.next_refresh(utc(2023, 6, 1, 16)) is None
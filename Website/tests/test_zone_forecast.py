@@ -0,0 +1,48 @@
+import json
+import numpy as np
+import zone_forecast
+from collect_inputs import NYISO_ZONES, SCALER_MEAN, SCALER_STD
+from zone_forecast import ZoneForecaster
+
+class EchoModel():
+    """Forecasts the last standardized load for every step and records its batches"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, x):
+        self.batches.append(len(x))
+        return np.repeat(x[:, 0, -1:], 18, axis=1)
+
+def _batch(loads):
+    batch = np.tile(SCALER_MEAN[:, None], (len(loads), 1, 18))
+    batch[:, 0, :] = np.asarray(loads, dtype=float)[:, None]
+    return batch
+
+def test_uncalibrated_zones_share_one_call(tmp_path):
+    model = EchoModel()
+    forecaster = ZoneForecaster(model, str(tmp_path / 'missing.json'))
+    loads = np.linspace(1000, 11000, len(NYISO_ZONES))
+    out = forecaster.predict(_batch(loads))
+    assert model.batches == [len(NYISO_ZONES)]
+    np.testing.assert_allclose(out, np.repeat(loads[:, None], 18, axis=1))
+    assert forecaster.calibrated() == []
+
+def test_zones_use_their_own_model_and_scaler(tmp_path, monkeypatch):
+    default, west = EchoModel(), EchoModel()
+    monkeypatch.setattr(zone_forecast, 'import_model', lambda path: west)
+    config = tmp_path / 'zones.json'
+    config.write_text(json.dumps({'WEST': {'model': 'west.bundle', 'load_mean': 1720.0, 'load_std': 240.0},
+                                  'LONGIL': {'load_mean': 2500.0, 'load_std': 500.0}}))
+    forecaster = ZoneForecaster(default, str(config))
+    assert forecaster.calibrated() == ['WEST', 'LONGIL']
+
+    loads = np.full(len(NYISO_ZONES), 2000.0)
+    out = forecaster.predict(_batch(loads))
+    assert west.batches == [1] and default.batches == [len(NYISO_ZONES) - 1]
+    # The echo round-trips through each zone's own scaler
+    np.testing.assert_allclose(out[:, 0], loads)
+    mean, std = forecaster.scalers(NYISO_ZONES)
+    assert (mean[0, 0], std[0, 0]) == (1720.0, 240.0)
+    assert (mean[-1, 0], std[-1, 0]) == (2500.0, 500.0)
+    assert (mean[1, 0], std[1, 0]) == (SCALER_MEAN[0], SCALER_STD[0])
@@ -0,0 +1,88 @@
+import os
+import json
+import numpy as np
+from collect_inputs import import_model, NYISO_ZONES, SCALER_MEAN, SCALER_STD
+
+ZONE_CONFIG = "zone_models.json"
+
+class ZoneForecaster():
+    """Scores the (zones, 8, 18) batch from ``ZoneFeatures.update``
+
+    Each zone may name its own model and load scaler in ``zone_models.json``::
+
+        {"WEST": {"model": "west.bundle", "load_mean": 1720.0, "load_std": 240.0}}
+
+    Zones without an entry use the default model and the N.Y.C. scaler
+    constants. Zones sharing a model are transformed with their own scalers
+    and scored together, so with a single model all of NYCA is one
+    ``predict`` call.
+
+    Parameters
+    ----------
+    default_model: keras.Model or BundleModel
+        Model used for zones without their own
+    config_path: str
+        JSON file with per-zone overrides; optional
+    """
+
+    def __init__(self, default_model, config_path=ZONE_CONFIG):
+        self.default_model = default_model
+        self.config = {}
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                self.config = json.load(f)
+        self._models = {}
+
+    def calibrated(self, zones=NYISO_ZONES):
+        """Zones with their own entry in ``zone_models.json``
+
+        The others are scored with the N.Y.C. model and scalers, which only
+        gives their shape, not their level.
+        """
+        return [z for z in zones if z in self.config]
+
+    def model(self, zone):
+        path = self.config.get(zone, {}).get('model')
+        if path is None:
+            return None, self.default_model
+        if path not in self._models:
+            self._models[path] = import_model(path)
+        return path, self._models[path]
+
+    def scalers(self, zones):
+        """Per-zone ``(zones, 8)`` mean and std arrays"""
+        mean = np.tile(SCALER_MEAN, (len(zones), 1))
+        std = np.tile(SCALER_STD, (len(zones), 1))
+        for i, zone in enumerate(zones):
+            mean[i, 0] = self.config.get(zone, {}).get('load_mean', mean[i, 0])
+            std[i, 0] = self.config.get(zone, {}).get('load_std', std[i, 0])
+        return mean, std
+
+    def predict(self, batch, zones=NYISO_ZONES):
+        """Forecast load in MW for every zone
+
+        Parameters
+        ----------
+        batch: np.ndarray
+            Untransformed inputs of shape ``(len(zones), 8, 18)``
+
+        Returns
+        -------
+        np.ndarray
+            ``(len(zones), forecast_window)`` forecasts
+        """
+        mean, std = self.scalers(zones)
+        x = (np.asarray(batch, dtype=float) - mean[:, :, None]) / std[:, :, None]
+
+        groups = {}
+        for i, zone in enumerate(zones):
+            key, model = self.model(zone)
+            groups.setdefault(key, (model, []))[1].append(i)
+
+        out = None
+        for model, idx in groups.values():
+            pred = np.asarray(model.predict(x[idx]))
+            if out is None:
+                out = np.empty((len(zones), pred.shape[1]))
+            out[idx] = pred * std[idx, :1] + mean[idx, :1]
+        return out